@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of command dispatch and default error handling.
+
+Usage: python -m benchmarks.bench_dispatch [-n NUMBER]
+"""
+import argparse
+import logging
+import tempfile
+import timeit
+
+from src.cmd_types.commands import ExecutableCommand
+from src.cmd_types.meta import CommandMetadata
+from src.cmd_types.output import CommandOutput
+from src.cmd_types.registry import CommandRegistry
+from src.command_line_session import CommandLineSession
+from src.decorators import commands_register as cmd_register
+from src.decorators import handlers
+
+
+@cmd_register.command("bench-noop")
+class NoopCommand(ExecutableCommand):
+    def _parse_args(self):
+        return None
+
+    def execute(self):
+        return CommandOutput()
+
+
+@cmd_register.command("bench-handled")
+class HandledCommand(ExecutableCommand):
+    """Calls handled nested functions like ls and grep do for every file"""
+    number = 1
+    fail = False
+
+    def _parse_args(self):
+        return None
+
+    def execute(self):
+        @handlers.handle_all_default
+        def ok(i: int):
+            return i
+
+        @handlers.handle_all_default
+        def fail(i: int):
+            raise FileNotFoundError(2, "File not found", str(i))
+
+        func = fail if self.fail else ok
+        for i in range(self.number):
+            func(i)
+        return CommandOutput()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_dispatch")
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = CommandLineSession(default_wd=tmp)
+        session.cmd_map = CommandRegistry({
+            "bench-noop": CommandMetadata("bench-noop", "bench", "bench", "0", NoopCommand),
+        })
+        dispatch = timeit.timeit(lambda: session.execute_command("bench-noop"), number=args.number)
+
+        HandledCommand.number = args.number
+        handled = timeit.timeit(lambda: HandledCommand([], session.cwd).execute(), number=1)
+        HandledCommand.fail = True
+        error = timeit.timeit(lambda: HandledCommand([], session.cwd).execute(), number=1)
+
+    print(f"dispatch of command: {dispatch / args.number * 1e6:8.2f} us/call")
+    print(f"handled call:        {handled / args.number * 1e6:8.2f} us/call")
+    print(f"handled error:       {error / args.number * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,5 +8,7 @@ Submodules:
  - plugins: Definition of plugins with commands that will be automatically loaded when running emulator
  - command_line_session: Definition of CommandLineSession class. Command IO handled here
  - constants: Constants
+ - daemon: Resident daemon serving commands over Unix socket
+ - client: Thin client of daemon
  - main: Entry point for application
 """
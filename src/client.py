@@ -0,0 +1,62 @@
+"""
+Thin client of src.daemon. Sends a command to the daemon and streams back its output.
+
+Usage: python -m src.client ls -l | python -m src.client -c "cd dir && ls"
+"""
+import json
+import os
+import socket
+import sys
+
+import src.constants as cst
+
+
+def run(request: dict, socket_path: str = str(cst.DAEMON_SOCKET)) -> int:
+    """
+    Sends request to the daemon and writes its output to stdout and stderr
+    :param request: {"argv": list[str]} or {"line": str}
+    :param socket_path: path to Unix socket of daemon
+    :return: errcode of the command
+    """
+    request = {"cwd": os.getcwd(), **request}
+    # streams are bound once: daemon running in the same process(e.g. in tests) redirects them while it serves
+    stdout, stderr = sys.stdout, sys.stderr
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as rfile:
+            for raw in rfile:
+                frame = json.loads(raw)
+                if "stdout" in frame:
+                    stdout.write(frame["stdout"])
+                elif "stderr" in frame:
+                    stdout.flush()
+                    stderr.write(frame["stderr"])
+                else:
+                    stdout.flush()
+                    return frame["errcode"]
+    return 1
+
+
+def main(argv: list[str] | None = None):
+    """
+    Entry point for client
+    :param argv: arguments(sys.argv[1:] by default)
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 2 and argv[0] == "-c":
+        request: dict[str, object] = {"line": argv[1]}
+    elif argv:
+        request = {"argv": argv}
+    else:
+        print("usage: python -m src.client command [args...] | -c line", file=sys.stderr)
+        sys.exit(2)
+    try:
+        sys.exit(run(request))
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("daemon is not running: start it with 'python -m src.main --daemon'", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
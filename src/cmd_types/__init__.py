@@ -2,9 +2,12 @@
 Module to define types.
 
 Submodules:
+ - arguments: Definition of declarative arguments parser of commands
  - commands: Definition of commands abstract classes
+ - context: Definition of command execution context
  - formats: Definition of formatted strings dataclasses
  - meta: Definition of metadata dataclasses
  - output: Definition of command output dataclass
  - plugins: Definition of plugins dataclasses
+ - registry: Definition of commands registry with precomputed capabilities
 """
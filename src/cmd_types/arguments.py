@@ -0,0 +1,240 @@
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Literal
+
+
+class ArgumentsError(Exception):
+    """
+    Raised when arguments of command can not be parsed
+
+    :param message: description of error
+    """
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+@dataclass(frozen=True)
+class Option:
+    """
+    Option of command. Flag if type is None, otherwise takes a value('-n 5', '-n5', '--lines 5', '--lines=5')
+    """
+    short: str | None = None
+    """Short name with '-' in front(e.g. '-r')"""
+
+    long: str | None = None
+    """Long name with '--' in front(e.g. '--recursive')"""
+
+    type: Callable[[str], Any] | None = None
+    """Converter of value. None for flags"""
+
+    default: Any = None
+    """Value if option was not given(False for flags, [] for multiple options)"""
+
+    multiple: bool = False
+    """Option can be given many times, values are collected to list"""
+
+    dest: str | None = None
+    """Name of parsed value. By default, long name(or short name) without dashes"""
+
+    help: str = ""
+
+    @property
+    def key(self) -> str:
+        """Name of option as it was declared(long name if short is not given)"""
+        return self.short or self.long or ""
+
+    @property
+    def target(self) -> str:
+        return self.dest or (self.long or self.short or "").lstrip("-").replace("-", "_")
+
+    @property
+    def initial(self) -> Any:
+        if self.multiple:
+            return list(self.default or [])
+        if self.type is None:
+            return bool(self.default)
+        return self.default
+
+
+@dataclass(frozen=True)
+class Positional:
+    """
+    Positional argument of command
+    """
+    name: str
+
+    type: Callable[[str], Any] = str
+    """Converter of value"""
+
+    nargs: Literal[1, "?", "*", "+"] = 1
+    """Number of values: exactly one, optional one, any number, at least one"""
+
+    default: Any = None
+    """Value if optional argument was not given"""
+
+    @property
+    def min_count(self) -> int:
+        return 1 if self.nargs in (1, "+") else 0
+
+
+@dataclass
+class CompiledParser:
+    """
+    Parser of command arguments compiled from declared options once per command class.
+    Tokenizes argv in one pass: combined short flags('-ir'), valued options, long options, '--' and '--help' are supported.
+    Options may follow positional arguments
+
+    :param options: declared options
+    :param positionals: declared positional arguments. If None, positional arguments are not checked
+    """
+    options: tuple[Option, ...] = ()
+    positionals: tuple[Positional, ...] | None = None
+    short: dict[str, Option] = field(default_factory=dict, init=False)
+    long: dict[str, Option] = field(default_factory=dict, init=False)
+
+    def __post_init__(self):
+        for option in self.options:
+            if option.short:
+                if len(option.short) != 2 or option.short[0] != "-":
+                    raise ValueError(f"short option must be a dash and one character: {option.short}")
+                self.short[option.short[1]] = option
+            if option.long:
+                self.long[option.long] = option
+
+    @classmethod
+    def from_flags(cls, flags: Iterable[str] | None, options: Iterable[Option] = (),
+                   positionals: Iterable[Positional] | None = None) -> "CompiledParser":
+        """
+        Compiles parser from flags declared in old style(list of names) and options
+        :param flags: names of boolean flags(e.g. '-r' or '--recursive')
+        :param options: declared options
+        :param positionals: declared positional arguments
+        """
+        declared = list(options)
+        for flag in flags or []:
+            if flag.startswith("--"):
+                declared.append(Option(long=flag, dest=flag))
+            elif len(flag) == 2:
+                declared.append(Option(flag, dest=flag))
+        return cls(tuple(declared), None if positionals is None else tuple(positionals))
+
+    def _set(self, values: dict[str, Any], option: Option, raw: str | None):
+        if option.type is None:
+            values[option.target] = True
+            return
+        try:
+            value = option.type(raw)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            raise ArgumentsError(f"invalid value for {option.long or option.short}: '{raw}'")
+        if option.multiple:
+            values[option.target].append(value)
+        else:
+            values[option.target] = value
+
+    def _is_number(self, token: str) -> bool:
+        return token[1:].isdigit() and token[1] not in self.short
+
+    def parse(self, argv: list[str]) -> argparse.Namespace:
+        """
+        Parses arguments
+        :param argv: arguments of command
+        :raise ArgumentsError: if option is unknown, value is missing or invalid, or positional arguments do not match
+        :return: namespace with values of options, named positional arguments, 'positionals'(all positional arguments)
+            and 'help'(whether '--help' was given)
+        """
+        values: dict[str, Any] = {option.target: option.initial for option in self.options}
+        values["help"] = False
+        rest: list[str] = []
+        tokens = iter(argv)
+        for token in tokens:
+            if token == "--":
+                rest.extend(tokens)
+                break
+            if token.startswith("--"):
+                name, eq, raw = token.partition("=")
+                option = self.long.get(name)
+                if option is None:
+                    if name == "--help":
+                        values["help"] = True
+                        continue
+                    raise ArgumentsError(f"unrecognized option '{name}'")
+                if option.type is None:
+                    if eq:
+                        raise ArgumentsError(f"option '{name}' doesn't allow an argument")
+                    self._set(values, option, None)
+                    continue
+                if not eq:
+                    raw = next(tokens, None)  # type: ignore[assignment]
+                    if raw is None:
+                        raise ArgumentsError(f"option '{name}' requires an argument")
+                self._set(values, option, raw)
+            elif token.startswith("-") and len(token) > 1 and not self._is_number(token):
+                for i, char in enumerate(token[1:], 1):
+                    option = self.short.get(char)
+                    if option is None:
+                        raise ArgumentsError(f"invalid option -- '{char}'")
+                    if option.type is None:
+                        self._set(values, option, None)
+                        continue
+                    raw = token[i + 1:] or next(tokens, None)  # type: ignore[assignment]
+                    if raw is None:
+                        raise ArgumentsError(f"option requires an argument -- '{char}'")
+                    self._set(values, option, raw)
+                    break
+            else:
+                rest.append(token)
+        values["positionals"] = rest
+        if self.positionals is not None:
+            values.update(self._match_positionals(rest))
+        return argparse.Namespace(**values)
+
+    def _match_positionals(self, rest: list[str]) -> dict[str, Any]:
+        assert self.positionals is not None
+        values: dict[str, Any] = {}
+        pos = 0
+        for i, spec in enumerate(self.positionals):
+            needed_after = sum(p.min_count for p in self.positionals[i + 1:])
+            available = len(rest) - pos - needed_after
+            if spec.nargs == 1:
+                if pos >= len(rest):
+                    raise ArgumentsError(f"missing argument: {spec.name}")
+                values[spec.name] = self._convert(spec, rest[pos])
+                pos += 1
+            elif spec.nargs == "?":
+                if available > 0:
+                    values[spec.name] = self._convert(spec, rest[pos])
+                    pos += 1
+                else:
+                    values[spec.name] = spec.default
+            else:
+                count = max(available, spec.min_count)
+                if pos + count > len(rest):
+                    raise ArgumentsError(f"missing argument: {spec.name}")
+                values[spec.name] = [self._convert(spec, raw) for raw in rest[pos:pos + count]]
+                pos += count
+        if pos < len(rest):
+            raise ArgumentsError(f"too many arguments: {rest[pos]}")
+        return values
+
+    @staticmethod
+    def _convert(spec: Positional, raw: str) -> Any:
+        try:
+            return spec.type(raw)
+        except (TypeError, ValueError):
+            raise ArgumentsError(f"invalid value for {spec.name}: '{raw}'")
+
+    def usage(self) -> str:
+        """
+        :return: table of options with their help
+        """
+        rows = []
+        for option in self.options:
+            names = ", ".join(filter(None, (option.short, option.long)))
+            if option.type is not None:
+                names += f" {option.target.upper()}"
+            rows.append((names, option.help))
+        if not rows:
+            return ""
+        width = max(len(names) for names, _ in rows)
+        return "".join(f"{names.ljust(width)}\t\t{doc}\n" for names, doc in rows)
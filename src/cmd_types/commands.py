@@ -1,12 +1,17 @@
 """Commands abstract classes defined here. You may register your own(see plugins.plugin_archives)"""
 
-import inspect
+import argparse
 import logging
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator
 
+from src.cmd_types.arguments import CompiledParser, Option, Positional
+from src.cmd_types.context import CommandContext
 from src.cmd_types.output import CommandOutput
 from src.decorators import handlers
 from src.extra import utils
+from src.extra.journal import Transaction, get_journal
 import src.decorators.commands_register as cmd_register
 
 
@@ -15,6 +20,12 @@ class ExecutableCommand(ABC):
     Abstract class for executable commands(has no undo method)
     :param args: list of arguments passed to the command
     :type args: list[str]
+
+    :param cwd: working directory of the command. If None, working directory of context is used
+    :type cwd: Path | None
+
+    :param ctx: context of execution. If None, context without session in process working directory is created
+    :type ctx: CommandContext | None
     """
 
     logger: logging.Logger
@@ -25,10 +36,52 @@ class ExecutableCommand(ABC):
     flags: list | None
     """Flags names to parse(with '-' in front)"""
 
-    def __init__(self, args: list[str]):
+    read_only: bool = False
+    """Command does not change files"""
+
+    options: tuple[Option, ...] = ()
+    """Options of the command. Flags are added to them as boolean options"""
+
+    positionals: tuple[Positional, ...] | None = None
+    """Positional arguments of the command. If None, they are not checked"""
+
+    stdin: Iterator[str] | None = None
+    """Stdout of the previous command in pipeline. None if command is not piped"""
+
+    def __init__(self, args: list[str], cwd: Path | None = None, ctx: CommandContext | None = None):
         self.args = args
         """List of arguments passed to the command"""
 
+        self.ctx = ctx or CommandContext(logger=getattr(self, "logger", None) or logging.getLogger(__name__))
+        """Context of execution"""
+
+        if cwd is not None:
+            self.ctx.cwd = cwd
+
+    @property
+    def cwd(self) -> Path:
+        """Working directory of the command. Session adopts it after command finishes(see cd)"""
+        return self.ctx.cwd
+
+    @cwd.setter
+    def cwd(self, value: Path):
+        self.ctx.cwd = value
+
+    def create_path_obj(self, path: str, must_exist = True) -> Path:
+        """
+        Creates path object resolved against working directory of the command
+        :param path: path to create object from
+        :param must_exist: if set to True, will raise exception if path doesn't exist
+        :return: pathlib.Path object
+        """
+        return utils.create_path_obj(path, must_exist, cwd=self.cwd)
+
+    def display(self, path: Path) -> str:
+        """
+        Makes path relative to working directory of the command for display
+        :param path: path to display
+        """
+        return utils.display_path(path, self.cwd)
 
     def _log_error(self, msg):
         """
@@ -38,20 +91,51 @@ class ExecutableCommand(ABC):
         """
         utils.log_error(self.name+": "+msg, logger=self.logger)
 
+    @classmethod
+    def arg_parser(cls) -> CompiledParser:
+        """
+        Gets arguments parser of the command. It is compiled by cmd_register.command once, commands without it compile it on first call
+        """
+        parser = cls.__dict__.get("__parser__")
+        if parser is None:
+            parser = CompiledParser.from_flags(getattr(cls, "flags", None), cls.options, cls.positionals)
+            setattr(cls, "__parser__", parser)
+        return parser
+
+    def parse_args(self) -> argparse.Namespace:
+        """
+        Parses arguments with compiled parser of the command. Positional arguments of type Path are resolved against working directory
+        :raise ArgumentsError: if arguments do not match declared options and positional arguments
+        :return: namespace with values of options and positional arguments(see CompiledParser.parse)
+        """
+        parsed = self.arg_parser().parse(self.args)
+        for spec in self.positionals or ():
+            value = getattr(parsed, spec.name)
+            if spec.type is Path and value is not None:
+                if isinstance(value, list):
+                    value = [self.create_path_obj(str(v), must_exist=False) for v in value]
+                else:
+                    value = self.create_path_obj(str(value), must_exist=False)
+                setattr(parsed, spec.name, value)
+        return parsed
+
     def parse_flags(self) -> dict[str, bool]:
         """
-        Parse the flags passed in the args
+        Parse the flags passed in the args. Flags are removed from self.args
+        :raise ArgumentsError: if unknown option was given
         :return: dict of {flag: True/False}
         :rtype: dict[str, bool]
         """
-        parsed_flags = {}
-        if self.flags:
-            for flag in self.flags:
-                no_flag = utils.remove_arg(flag, self.args)
-                parsed_flags[flag] = (len(self.args) != len(no_flag))
-                self.args = no_flag
+        parsed = self.parse_args()
+        self.args = parsed.positionals
+        return {option.key: getattr(parsed, option.target) for option in self.arg_parser().options}
 
-        return parsed_flags
+    def get_session(self):
+        """
+        Gets session that executes the command
+        :return: session(CommandLineSession) or None if command is executed outside of session
+        """
+        return self.ctx.session
 
     def exec(self, line: str):
         """
@@ -59,15 +143,9 @@ class ExecutableCommand(ABC):
         :param line: line to execute
         :type line: str
         """
-        cur_frame = inspect.currentframe()
-        f_back = cur_frame.f_back #type: ignore
-        while not getattr(f_back.f_locals["self"], 'execute_command', None): #type: ignore
-
-            f_back = f_back.f_back #type: ignore
-            if not f_back:
-                break
-        if f_back:
-            return f_back.f_locals["self"].execute_command(line) #type: ignore
+        session = self.get_session()
+        if session:
+            return session.execute_command(line)
         return None
 
     @abstractmethod
@@ -83,20 +161,18 @@ class ExecutableCommand(ABC):
 
         """Display this message"""
 
-        outs: list[tuple[str, str]] = []
-        for name, obj in inspect.getmembers(self):
-            if inspect.ismethod(obj) and not name.startswith("__"):
-                if getattr(obj, "__display_help__", False):
-                    name_to_append = getattr(obj, "__help_name__", None) or name
-                    doc = getattr(obj, "__doc__", "")
-                    outs.append((name_to_append, doc))
-        output = ""
-        max_len_tup = max(outs, key=lambda x: len(x[0]))
-        max_len = len(max_len_tup[0])
-        for out in outs:
-            output += out[0] + " " * (max_len - len(out[0])) + 2 * "\t" + out[1] + "\n"
-
-        return CommandOutput(stdout = output)
+        return CommandOutput(stdout = self.help_table() + self.arg_parser().usage())
+
+    @classmethod
+    def help_table(cls) -> str:
+        """
+        Gets help table of the command. It is built by cmd_register.command once, commands without it build it on first call
+        """
+        table = cls.__dict__.get("__help_table__")
+        if table is None:
+            table = cmd_register.build_help_table(cls)
+            setattr(cls, "__help_table__", table)
+        return table
 
     @handlers.handle_all_default
     def handled_run(self) -> CommandOutput:
@@ -109,6 +185,18 @@ class ExecutableCommand(ABC):
         """
         return self.execute()
 
+    def stream(self) -> Iterator[str | CommandOutput]:
+        """
+        Runs a command lazily, so it can be piped to the next one.
+        Yields stdout chunks and CommandOutput objects(errors, codes). By default runs command with handled_run.
+        Override it in commands that can produce output chunk by chunk
+
+        :return: iterator over output chunks
+        """
+        res = self.handled_run()
+        if res:
+            yield res
+
     def history(self):
         """
         Writes command to history file
@@ -120,9 +208,26 @@ class ExecutableCommand(ABC):
 class UndoableCommand(ExecutableCommand, ABC):
 
     """
-    Abstract class for undoable commands(fields of ExecutableCommand are included)
+    Abstract class for undoable commands(fields of ExecutableCommand are included).
+    Command records moves it performs to self.transaction, which is committed to journal after execution(see extra.journal)
     """
 
-    @abstractmethod
+    transaction: Transaction
+    """Operations performed by the command"""
+
+    def handled_run(self) -> CommandOutput:
+        """
+        Runs a command with exception handlers and commits its transaction to journal, even if command failed partially
+        """
+        self.transaction = Transaction(' '.join([self.name]+self.args))
+        try:
+            return super().handled_run()
+        finally:
+            get_journal().commit(self.transaction)
+
     def undo(self):
-        """Undoes command"""
+        """
+        Undoes command by reverting its transaction
+        :raise JournalError: if transaction can not be undone
+        """
+        self.transaction.undo()
@@ -0,0 +1,31 @@
+import logging
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from src.command_line_session import CommandLineSession
+
+
+@dataclass
+class CommandContext:
+    """
+    Context that command is executed in. Session creates it for every command, so commands never need to look for their caller
+    """
+    session: "CommandLineSession | None" = None
+    """Session that executes the command. None if command is executed outside of session"""
+
+    cwd: Path = field(default_factory=Path.cwd)
+    """Working directory of the command. Session adopts it after command finishes(see cd)"""
+
+    logger: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    """Logger of the command"""
+
+    output: TextIO | None = None
+    """Stream that output of the session is written to. None means sys.stdout at the moment of writing"""
+
+    @property
+    def stdout(self) -> TextIO:
+        """Stream to write output to"""
+        return self.output or sys.stdout
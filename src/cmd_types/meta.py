@@ -1,3 +1,5 @@
+import importlib
+import inspect
 from dataclasses import dataclass
 
 from src.cmd_types.commands import ExecutableCommand
@@ -10,3 +12,58 @@ class CommandMetadata:
     plugin_author: str | None
     plugin_version: str | None
     cmd: type[ExecutableCommand]
+
+
+class LazyCommandMetadata(CommandMetadata):
+    """
+    Metadata of command that was found in plugins manifest. Module of the command is imported on first access to cmd
+
+    :param module: full name of module that defines the command
+    :param cls_name: name of the command class in module
+    :param flags: flags of the command found in manifest
+    :param read_only: whether command was registered as read-only
+    """
+    def __init__(self, name: str, plugin_name: str, plugin_author, plugin_version, module: str, cls_name: str,
+                 flags: list[str] | None = None, read_only: bool = False):
+        self.module = module
+        self.cls_name = cls_name
+        self.flags = flags or []
+        self.read_only = read_only
+        self._cmd: type[ExecutableCommand] | None = None
+        super().__init__(name, plugin_name, plugin_author, plugin_version, None)  # type: ignore[arg-type]
+
+    @property  # type: ignore[override]
+    def cmd(self) -> type[ExecutableCommand]:
+        """
+        Command class. Imports module of the command on first access
+        :raise ImportError: if module can not be imported or it does not define the command
+        """
+        if self._cmd is None:
+            self._cmd = self._import()
+        return self._cmd
+
+    @cmd.setter
+    def cmd(self, value: type[ExecutableCommand] | None):
+        self._cmd = value
+
+    @property
+    def loaded(self) -> bool:
+        """Whether command class was already imported"""
+        return self._cmd is not None
+
+    def __repr__(self):
+        return f"LazyCommandMetadata(name={self.name!r}, module={self.module!r}, loaded={self.loaded})"
+
+    def _import(self) -> type[ExecutableCommand]:
+        try:
+            module = importlib.import_module(self.module)
+        except ImportError:
+            raise
+        except Exception as e:
+            raise ImportError(f"failed to load module {self.module}: {e}", name=self.module) from e
+        candidates = [getattr(module, self.cls_name, None)]
+        candidates += [obj for _, obj in inspect.getmembers(module, inspect.isclass)]
+        for obj in candidates:
+            if inspect.isclass(obj) and issubclass(obj, ExecutableCommand) and getattr(obj, "name", None) == self.name:
+                return obj
+        raise ImportError(f"command {self.name} is not defined in module {self.module}", name=self.module)
@@ -1,30 +1,194 @@
 """
 Module to define command output
 """
+import codecs
+import os
 from dataclasses import dataclass
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
 
 @dataclass
+class FileRegion:
+    """
+    Region of open file that command streams instead of text(see cat). Consumer that writes to file descriptor
+    may send it as is without copying(see CommandOutput.consume), others get it decoded.
+    Regions of one file share decoder, so they must be decoded in order and only once
+    """
+    file: BinaryIO
+    """File opened in binary mode. It must stay open until region is consumed"""
+
+    offset: int
+
+    count: int
+
+    decoder: codecs.IncrementalDecoder
+    """Decoder of the file"""
+
+    final: bool = False
+    """Region is the last one of the file"""
+
+    def read(self) -> bytes:
+        """Reads bytes of region without moving position of file"""
+        return os.pread(self.file.fileno(), self.count, self.offset)
+
+    def decode(self) -> str:
+        return self.decoder.decode(self.read(), final=self.final)
+
+    def write_to(self, stream: TextIO) -> str:
+        """
+        Writes region to stream. If stream has file descriptor, bytes are sent with os.sendfile(or written from memoryview
+        if sendfile is not supported), so they are not decoded nor copied to Python. Otherwise, region is decoded
+        :param stream: stream to write to
+        :return: the last character written("" if region is empty)
+        """
+        try:
+            fd = stream.fileno()
+        except (OSError, ValueError):
+            text = self.decode()
+            stream.write(text)
+            return text[-1:]
+        if not self.count:
+            return ""
+        stream.flush()
+        offset, end = self.offset, self.offset + self.count
+        try:
+            while offset < end:
+                sent = os.sendfile(fd, self.file.fileno(), offset, end - offset)
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            data = memoryview(os.pread(self.file.fileno(), end - offset, offset))
+            while data:
+                data = data[os.write(fd, data):]
+        last = os.pread(self.file.fileno(), 1, end - 1)
+        return "\n" if last == b"\n" else last.decode("latin-1")
+
+
 class CommandOutput:
-    stdout: str = ""
-    stderr: str = ""
-    errcode: int = 0
+    """
+    Output of a command. Stdout and stderr are kept as append-only lists of chunks, so appending is O(1).
+    Output may be lazy(see from_stream): then chunks are produced only when output is consumed
+
+    :param stdout: stdout(1 stream of command)
+    :param stderr: stderr(2 stream of command)
+    :param errcode: error code
+    """
+
+    def __init__(self, stdout: str = "", stderr: str = "", errcode: int = 0):
+        self._stdout: list[str] = [stdout] if stdout else []
+        self._stderr: list[str] = [stderr] if stderr else []
+        self._errcode = errcode
+        self._stream: Iterator["str | FileRegion | CommandOutput"] | None = None
+
+    @classmethod
+    def from_stream(cls, chunks: Iterable["str | FileRegion | CommandOutput"]) -> "CommandOutput":
+        """
+        Creates lazy output from ExecutableCommand.stream. Chunks are not produced until output is consumed
+        :param chunks: stdout chunks and CommandOutput objects
+        :return: lazy output
+        """
+        out = cls()
+        out._stream = iter(chunks)
+        return out
+
+    @property
+    def stdout(self) -> str:
+        self._materialize()
+        if len(self._stdout) > 1:
+            self._stdout = ["".join(self._stdout)]
+        return self._stdout[0] if self._stdout else ""
+
+    @stdout.setter
+    def stdout(self, value: str):
+        self._materialize()
+        self._stdout = [value] if value else []
+
+    @property
+    def stderr(self) -> str:
+        self._materialize()
+        if len(self._stderr) > 1:
+            self._stderr = ["".join(self._stderr)]
+        return self._stderr[0] if self._stderr else ""
+
+    @stderr.setter
+    def stderr(self, value: str):
+        self._materialize()
+        self._stderr = [value] if value else []
+
+    @property
+    def errcode(self) -> int:
+        self._materialize()
+        return self._errcode
+
+    @errcode.setter
+    def errcode(self, value: int):
+        self._errcode = value
+
+    def consume(self, raw: bool = False) -> Iterator[tuple[str, "str | FileRegion"]]:
+        """
+        Consumes output chunk by chunk. Consumed chunks are not kept, so memory does not depend on output size.
+        Errcode is available after output is consumed
+        :param raw: yield regions of files as ("raw", FileRegion) instead of decoding them. Region must be written before the next chunk is taken
+        :return: iterator over ("stdout" | "stderr", chunk)
+        """
+        stdout, stderr = self._stdout, self._stderr
+        self._stdout, self._stderr = [], []
+        for chunk in stderr:
+            yield "stderr", chunk
+        for chunk in stdout:
+            yield "stdout", chunk
+
+        stream, self._stream = self._stream, None
+        if stream is None:
+            return
+        for item in stream:
+            if isinstance(item, str):
+                if item:
+                    yield "stdout", item
+                continue
+            if isinstance(item, FileRegion):
+                if raw:
+                    yield "raw", item
+                else:
+                    text = item.decode()
+                    if text:
+                        yield "stdout", text
+                continue
+            yield from item.consume(raw)
+            if item.errcode != 0:
+                self._errcode = item.errcode
+
+    def _materialize(self):
+        """Produces all chunks of lazy output and keeps them"""
+        if self._stream is None:
+            return
+        for kind, chunk in self.consume():
+            (self._stdout if kind == "stdout" else self._stderr).append(chunk)  # type: ignore[arg-type]
 
     def __add__(self, other):
         if isinstance(other, str):
-            self.stdout += other
-            self.stderr += other
+            if self._stream is not None:
+                self._stream = chain(self._stream, [other])
+            elif other:
+                self._stdout.append(other)
             return self
         elif not isinstance(other, CommandOutput):
             raise TypeError
+        elif self._stream is not None or other._stream is not None:
+            self._stream = chain(self._stream or (), [other])
+            return self
         else:
-            if other.stdout:
-                self.stdout += other.stdout
-            if other.stderr:
-                self.stderr += other.stderr
-            if other.errcode != 0:
-                self.errcode = other.errcode
+            self._stdout.extend(other._stdout)
+            self._stderr.extend(other._stderr)
+            if other._errcode != 0:
+                self._errcode = other._errcode
             return self
 
+    def __repr__(self):
+        return f"CommandOutput(stdout={self.stdout!r}, stderr={self.stderr!r}, errcode={self.errcode!r})"
+
     def print(self):
         if self.stderr:
             print(self.stderr)
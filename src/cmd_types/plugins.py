@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from types import ModuleType
 from typing import Any
 
@@ -8,3 +8,39 @@ class PluginMetadata:
     module: ModuleType
     author: Any
     version: Any
+
+
+@dataclass
+class ModuleManifest:
+    """
+    Commands of plugin module found by scanning its source without importing it
+    """
+    module: str
+    """Full name of module"""
+
+    path: str
+    """Path to source file"""
+
+    mtime_ns: int
+    """Modification time of source file when it was scanned"""
+
+    size: int
+    """Size of source file when it was scanned"""
+
+    sha256: str = ""
+    """Hash of source file content when it was scanned"""
+
+    author: Any = None
+    version: Any = None
+
+    commands: dict[str, str] = field(default_factory=dict)
+    """Map of commands names to their classes names"""
+
+    flags: dict[str, list[str]] = field(default_factory=dict)
+    """Map of commands names to their flags"""
+
+    read_only: list[str] = field(default_factory=list)
+    """Names of read-only commands"""
+
+    dynamic: bool = False
+    """Module registers commands in a way that can not be found without import(must be loaded eagerly)"""
@@ -0,0 +1,144 @@
+import bisect
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+
+from src.cmd_types.commands import UndoableCommand
+from src.cmd_types.meta import CommandMetadata, LazyCommandMetadata
+
+
+@dataclass
+class CommandInfo:
+    """
+    Capabilities of registered command
+    """
+    meta: CommandMetadata
+
+    flags: tuple[str, ...] = ()
+    """Short and long names of options of the command(with '-' in front)"""
+
+    read_only: bool = False
+    """Command does not change files"""
+
+    undoable: bool | None = None
+    """Command can be undone. None until class of lazy command is imported"""
+
+    @classmethod
+    def from_meta(cls, meta: CommandMetadata) -> "CommandInfo":
+        """
+        Creates info from metadata. Class of lazy command is not imported: its flags are taken from manifest
+        :param meta: metadata of command
+        """
+        if isinstance(meta, LazyCommandMetadata) and not meta.loaded:
+            return cls(meta, tuple(meta.flags), meta.read_only)
+        cmd = meta.cmd
+        parser = getattr(cmd, "arg_parser", None)
+        flags = [name for option in parser().options for name in (option.short, option.long) if name] if parser else []
+        return cls(
+            meta,
+            tuple(flags or getattr(cmd, "flags", None) or ()),
+            getattr(cmd, "read_only", False),
+            issubclass(cmd, UndoableCommand) or callable(getattr(cmd, "undo", None))
+        )
+
+
+class CommandRegistry(Mapping[str, CommandMetadata]):
+    """
+    Read-only map of commands names to their metadata with precomputed capabilities and sorted names.
+    Registry is never changed: patched() returns a new one, reusing everything that was computed for unchanged commands
+
+    :param commands: map of commands names to their metadata
+    :type commands: dict[str, CommandMetadata] | None
+    """
+    def __init__(self, commands: dict[str, CommandMetadata] | None = None):
+        self._commands: dict[str, CommandMetadata] = dict(commands or {})
+        self._infos: dict[str, CommandInfo] = {name: CommandInfo.from_meta(meta) for name, meta in self._commands.items()}
+        self._names: list[str] = sorted(self._commands)
+        self._help_text: str | None = None
+
+    def __getitem__(self, name: str) -> CommandMetadata:
+        return self._commands[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._commands)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._commands
+
+    def get(self, name, default=None):
+        return self._commands.get(name, default)
+
+    def __repr__(self):
+        return f"CommandRegistry({self._names!r})"
+
+    @property
+    def names(self) -> list[str]:
+        """Sorted names of commands. Must not be changed"""
+        return self._names
+
+    @property
+    def help_text(self) -> str:
+        """Sorted names of commands, one per line"""
+        if self._help_text is None:
+            self._help_text = "".join(f"{name}\n" for name in self._names)
+        return self._help_text
+
+    def info(self, name: str) -> CommandInfo | None:
+        """
+        Gets capabilities of command
+        :param name: name of command
+        :return: info or None if command is not registered
+        """
+        return self._infos.get(name)
+
+    def flags(self, name: str) -> tuple[str, ...]:
+        """
+        :param name: name of command
+        :return: flags of command(empty if command is not registered)
+        """
+        info = self._infos.get(name)
+        return info.flags if info else ()
+
+    def is_read_only(self, name: str) -> bool:
+        info = self._infos.get(name)
+        return bool(info and info.read_only)
+
+    def is_undoable(self, name: str) -> bool:
+        """
+        Checks if command can be undone. Class of lazy command is imported on the first check
+        :param name: name of command
+        """
+        info = self._infos.get(name)
+        if info is None:
+            return False
+        if info.undoable is None:
+            try:
+                _ = info.meta.cmd
+            except ImportError:
+                return False
+            self._infos[name] = info = CommandInfo.from_meta(info.meta)
+        return bool(info.undoable)
+
+    def patched(self, commands: dict[str, CommandMetadata]) -> "CommandRegistry":
+        """
+        Creates registry with new commands. Info of commands with the same metadata is reused,
+        sorted names are updated only for added and removed commands
+        :param commands: new map of commands names to their metadata
+        :return: new registry
+        """
+        registry = CommandRegistry.__new__(CommandRegistry)
+        registry._commands = dict(commands)
+        registry._infos = {}
+        for name, meta in registry._commands.items():
+            info = self._infos.get(name)
+            registry._infos[name] = info if info is not None and info.meta is meta else CommandInfo.from_meta(meta)
+        names = list(self._names)
+        for name in set(self._commands) - set(commands):
+            del names[bisect.bisect_left(names, name)]
+        for name in set(commands) - set(self._commands):
+            bisect.insort(names, name)
+        registry._names = names
+        registry._help_text = self._help_text if names == self._names else None
+        return registry
@@ -1,17 +1,28 @@
+import copy
 import logging
-import os
 import shlex
+import sys
 import readline #type: ignore
+import threading
+import time
 from pathlib import Path
+from typing import Callable, Iterable, TextIO
 import src.constants as cst
+from src.cmd_types.commands import ExecutableCommand
+from src.cmd_types.context import CommandContext
+from src.cmd_types.registry import CommandRegistry
 from src.cmd_types.meta import CommandMetadata
-from src.cmd_types.output import CommandOutput
-from src.extra import utils
-from src.extra.plugins_loader import PluginLoader
+from src.cmd_types.output import CommandOutput, FileRegion
+from src.extra import completion, utils
+from src.extra.jobs import JobManager
+from src.extra.plugins_loader import PluginLoader, PluginsWatcher
+from src.extra.profiling import StartupProfile
+from src.extra.trash import start_collector
 from src.extra.utils import log_error
-from src.plugins.plugin_default import LsCommand
 
 HANDLED_ERRORS = tuple(cst.ERROR_HANDLERS_MESSAGES_FORMATS.keys())
+SEQUENCE_OPERATORS = (";", "&&", "||", "&")
+PIPE_OPERATORS = ("|",)
 
 class CommandLineSession:
 
@@ -37,8 +48,10 @@ class CommandLineSession:
                  strict_load: bool = cst.STRICT_PLUGIN_LOADING
                  ):
         self.default_wd = default_wd or "."
-        self.cmd_map: dict[str, CommandMetadata] = {}
-        """Map of commands names to its metadata."""
+        self.cwd: Path = Path(self.default_wd).expanduser().absolute()
+        """Working directory of the session. All paths of commands are resolved against it, process working directory is not changed"""
+        self.cmd_map: CommandRegistry = CommandRegistry()
+        """Registry of commands: map of commands names to its metadata."""
 
         self.plugins_dir = plugins_dir
         self.plugins_prefix = plugins_prefix
@@ -48,6 +61,24 @@ class CommandLineSession:
         self.posix = utils.is_posix()
         """Is system posix"""
 
+        self.errcode: int = 0
+        """Errcode of the last executed command"""
+
+        self.jobs = JobManager()
+        """Background jobs of the session"""
+
+        self.plugins_loader: PluginLoader | None = None
+        """Loader of plugins. Kept to reload only changed plugins"""
+
+        self.plugins_watcher: PluginsWatcher | None = None
+        """Thread that reloads changed plugins in 'plugins watch' mode"""
+
+        self._reload_lock = threading.Lock()
+        """Serializes reloads, so registry of the latest reload is the one that is kept"""
+
+        self.output: TextIO | None = None
+        """Stream that output of commands is written to. None means sys.stdout at the moment of writing"""
+
     def shlex_split(self, cmd: str) -> list[str]:
         """
         Splits a line like bash does(with passed posix param)
@@ -76,62 +107,255 @@ class CommandLineSession:
         :return: None
         """
         self.load_modules()
-        default = self.default_wd
-        to_move = Path(default).expanduser()
-        os.chdir(to_move)
+        start_collector()
+        if sys.stdin.isatty():
+            completion.install(self, SEQUENCE_OPERATORS + PIPE_OPERATORS)
+        self.cwd = Path(self.default_wd).expanduser().absolute()
         while True:
-            cmd = input(f"{os.getcwd()} $ ").strip()
+            self.report_jobs()
+            try:
+                cmd = input(f"{self.cwd} $ ").strip()
+            except KeyboardInterrupt:
+                # Ctrl-C drops the typed line, like in bash
+                print()
+                continue
             if not cmd.strip():
                 continue
+            self.run_line(cmd)
+
+    def run_script(self, lines: Iterable[str]) -> int:
+        """
+        Runs lines non-interactively. Plugins are loaded once for the whole script
+        :param lines: lines to run(e.g. opened script file or sys.stdin)
+        :return: errcode of the last executed command
+        """
+        self.load_modules()
+        start_collector()
+        self.cwd = Path(self.default_wd).expanduser().absolute()
+        executed = 0
+        started = time.perf_counter()
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            self.run_line(line)
+            executed += 1
+        for job in self.jobs.wait():
+            self.write_output(job.report())
+        elapsed = time.perf_counter() - started
+        if executed and elapsed:
+            rate = executed / elapsed
+            self.logger.debug(f"Executed {executed} commands in {elapsed:.3f}s ({rate:.0f} cmd/s)")
+            if rate < cst.BATCH_TARGET_CPS:
+                self.logger.warning(f"Batch throughput {rate:.0f} cmd/s is below target of {cst.BATCH_TARGET_CPS} cmd/s")
+        return self.errcode
+
+    def run_line(self, line: str) -> int:
+        """
+        Runs a line with commands sequenced by ';', '&&' and '||' and prints their output.
+        Commands list terminated with '&' is run in background
+        :param line: Input line
+        :return: errcode of the last executed foreground command
+        """
+        and_or: list[tuple[str, str | None]] = []
+        for segment, op in utils.split_operators(line, SEQUENCE_OPERATORS):
+            segment = segment.strip()
+            if not segment:
+                if op is not None:
+                    utils.log_error(f"syntax error near unexpected token '{op}'", self.logger)
+                    self.errcode = 2
+                    return self.errcode
+                continue
+            and_or.append((segment, op))
+            if op in ("&&", "||"):
+                continue
+            if op == "&":
+                self.start_job(and_or)
+            else:
+                self._run_and_or(and_or, self._run_and_print)
+            and_or = []
+        if and_or:
+            # line ends with '&&' or '||'
+            utils.log_error(f"syntax error near unexpected token '{and_or[-1][1]}'", self.logger)
+            self.errcode = 2
+        return self.errcode
+
+    def _run_and_or(self, and_or: list[tuple[str, str | None]], run: Callable[[str], None]):
+        """
+        Runs commands sequenced by '&&' and '||' by errcode of the previous one
+        :param and_or: list of (command, operator after it)
+        :param run: function that runs one command and sets self.errcode
+        """
+        prev_op = None
+        for segment, op in and_or:
+            skip = (prev_op == "&&" and self.errcode != 0) or (prev_op == "||" and self.errcode == 0)
+            if not skip:
+                run(segment)
+            prev_op = op
+
+    def start_job(self, and_or: list[tuple[str, str | None]]):
+        """
+        Runs commands in background. Job has its own copy of session, so errcode and cwd of foreground commands are not affected.
+        Errcode of session is set to 0, like '$?' after starting a job in bash
+        :param and_or: list of (command, operator after it)
+        """
+        line = " ".join(f"{segment} {op}" if op != "&" else segment for segment, op in and_or)
+        job_session = copy.copy(self)
+        job = self.jobs.submit(line, lambda: job_session._run_captured(and_or))
+        self.write_output(CommandOutput(stdout = f"[{job.job_id}] {line}\n"))
+        self.errcode = 0
+
+    def _run_captured(self, and_or: list[tuple[str, str | None]]) -> CommandOutput:
+        """
+        Runs commands and captures their output instead of printing it
+        :param and_or: list of (command, operator after it)
+        :return: output of all commands, errors are prefixed with command names
+        """
+        out = CommandOutput()
+
+        def run(cmd: str):
+            nonlocal out
             try:
                 res = self.execute_command(cmd)
-                if res:
-                    res = res.strip()
-                    if res.stderr:
-                        errs = res.stderr.split("\n")
-                        for err in errs:
-                            if not err:
-                                continue
-                            cmd_name = self.parse_line(cmd)[0]
-                            log_error(f"{cmd_name}: {err}", self.logger)
-                    if res.stdout:
-                        print(res.stdout)
-            except ImportError:
-                raise
-
             except Exception as e:
-                try:
-                    name = self.shlex_split(cmd)[0]
-                    cmd_meta = self.cmd_map.get(name)
-                except ValueError:
-                    name = ''
-                    cmd_meta = CommandMetadata('default', 'default', 'default', '', LsCommand)
-                if cmd_meta.plugin_author != "default":
-                    utils.log_error(
-                        f"Author of plugin '{cmd_meta.plugin_name}' of version '{cmd_meta.plugin_version}' is a debil(real name - '{cmd_meta.plugin_author}'). His command '{name}' raised an unexpected error:",
-                        self.logger
-                    )
-                    utils.log_error(e, self.logger, exc=True)
-                else:
-                    utils.log_error(e, self.logger)
-
-    def load_modules(self, outer_strict: bool = False):
+                self._log_unexpected(cmd, e)
+                self.errcode = 1
+                return
+            if res:
+                self.errcode = res.errcode
+                piped = len(utils.split_operators(cmd, PIPE_OPERATORS)) > 1
+                errs = res if piped else self.prefixed(self._command_name(cmd), res)
+                out += CommandOutput(stdout = res.stdout, stderr = errs.stderr)
+
+        self._run_and_or(and_or, run)
+        out.errcode = self.errcode
+        return out
+
+    def report_jobs(self):
+        """Prints status and output of finished background jobs"""
+        for job in self.jobs.pop_finished():
+            self.write_output(job.report())
+
+    def _run_and_print(self, cmd: str):
+        """
+        Executes one command, prints its output and handles unexpected errors
+        :param cmd: Input command
+        """
+        try:
+            res = self.execute_command(cmd)
+            if res:
+                self.write_output(res, cmd)
+                self.errcode = res.errcode
+        except ImportError:
+            raise
+
+        except KeyboardInterrupt:
+            # Ctrl-C stops the command, not the session
+            (self.output or sys.stdout).write("\n")
+            self.errcode = 130
+
+        except Exception as e:
+            self.errcode = 1
+            self._log_unexpected(cmd, e)
+
+    def _log_unexpected(self, cmd: str, e: Exception):
+        """
+        Logs an unexpected error raised by command
+        :param cmd: Input command
+        :param e: raised error
+        """
+        try:
+            name = self.shlex_split(cmd)[0]
+            cmd_meta = self.cmd_map.get(name)
+        except ValueError:
+            name = ''
+            cmd_meta = None
+        if cmd_meta and cmd_meta.plugin_author != "default":
+            utils.log_error(
+                f"Author of plugin '{cmd_meta.plugin_name}' of version '{cmd_meta.plugin_version}' is a debil(real name - '{cmd_meta.plugin_author}'). His command '{name}' raised an unexpected error:",
+                self.logger
+            )
+            utils.log_error(e, self.logger, exc=True)
+        else:
+            utils.log_error(e, self.logger)
+
+    @staticmethod
+    def prefixed(name: str, out: CommandOutput) -> CommandOutput:
+        """
+        Prefixes error lines with command name
+        :param name: name of the command
+        :param out: output of the command
+        :return: output with prefixed stderr and the same errcode
+        """
+        lines = [f"{name}: {err}" for err in out.stderr.splitlines() if err]
+        return CommandOutput(stderr = "\n".join(lines) + "\n" * bool(lines), errcode = out.errcode)
+
+    def write_output(self, res: CommandOutput, cmd: str | None = None):
+        """
+        Writes output to stdout chunk by chunk as it is produced. Errors are written to stderr and logs
+        :param res: output to write
+        :param cmd: line that produced output. Errors are prefixed with its command name unless it is pipeline or None
+        """
+        piped = cmd is None or len(utils.split_operators(cmd, PIPE_OPERATORS)) > 1
+        prefix = "" if cmd is None or piped else f"{self._command_name(cmd)}: "
+        stdout = self.output or sys.stdout
+        last = "\n"
+        for kind, chunk in res.consume(raw = True):
+            if isinstance(chunk, FileRegion):
+                last = chunk.write_to(stdout) or last
+                continue
+            if kind == "stdout":
+                stdout.write(chunk)
+                last = chunk[-1]
+                continue
+            if last != "\n":
+                stdout.write("\n")
+                last = "\n"
+            stdout.flush()
+            for err in chunk.split("\n"):
+                if err:
+                    log_error(f"{prefix}{err}", self.logger)
+        if last != "\n":
+            stdout.write("\n")
+        stdout.flush()
+
+    def load_modules(self, outer_strict: bool = False, profile: StartupProfile | None = None):
         """
         Loads plugins
         :param outer_strict: if method was called out of class, will be more prioritized than self.strict_load
         :type outer_strict: bool
 
+        :param profile: if given, loading of plugins is profiled to it
+        :type profile: StartupProfile | None
+
         :return: None
         """
 
         if not outer_strict:
             outer_strict = self.strict_load
-        plugins_loader = PluginLoader(self.plugins_dir, self.plugins_prefix, outer_strict)
-        plugins_loader.load_plugins()
+        self.plugins_loader = PluginLoader(self.plugins_dir, self.plugins_prefix, outer_strict, profile)
+        self.plugins_loader.load_plugins()
 
-        self.cmd_map = plugins_loader.commands
+        self.cmd_map = self.plugins_loader.commands
         #self.cmd_map["reload-plugins"] = CommandMetadata("reload-plugins", "default_plugin", "default", "1.0.0", ReloadPluginsCommand)
 
+    def reload_modules(self, outer_strict: bool = False) -> list[str]:
+        """
+        Reloads only plugins that were changed since the last load. Loads all plugins if they were not loaded yet
+        :param outer_strict: if method was called out of class, will be more prioritized than self.strict_load.
+        It applies only to this reload, so reloads of plugins watcher and of 'plugins reload' do not affect each other
+        :type outer_strict: bool
+
+        :return: full names of reloaded modules
+        """
+        with self._reload_lock:
+            if self.plugins_loader is None:
+                self.load_modules(outer_strict)
+                return list(self.plugins_loader.loaded) if self.plugins_loader else []
+            changed = self.plugins_loader.reload_plugins(outer_strict or self.strict_load)
+            self.cmd_map = self.plugins_loader.commands
+            return changed
+
     def parse_line(self, line: str) -> tuple[str, list[str]] | None:
         """
         Parses input line by calling self.shlex_split and self.fetch_name_and_args
@@ -145,33 +369,78 @@ class CommandLineSession:
 
         return cmd_name, cmd_args
 
-    def execute_command(self, line: str):
+    def _command_name(self, line: str) -> str:
         """
-        Executes input command
-        :param line:
-        :return: Result of command(None, if error occurred or command was not found)
+        :param line: Input line
+        :return: name of the command of line('' if line is empty)
+        """
+        parsed = self.parse_line(line)
+        return parsed[0] if parsed else ""
+
+    def create_context(self, cmd_cls: type[ExecutableCommand]) -> CommandContext:
+        """
+        Creates context for command executed in the session
+        :param cmd_cls: class of the command
+        :return: context with the session, its working directory and output
+        """
+        return CommandContext(
+            session = self,
+            cwd = self.cwd,
+            logger = getattr(cmd_cls, "logger", None) or self.logger,
+            output = self.output
+        )
+
+    def create_command(self, line: str) -> ExecutableCommand | None:
+        """
+        Creates command object from input line and writes it to history
+        :param line: Input line
+        :return: Command object(None, if line was empty or command was not found)
         """
         parsed = self.parse_line(line)
         if not parsed:
             return None
 
         cmd_name, cmd_args = parsed
-        if cmd_name == "help":
-            out = ""
-            for cmd in sorted(self.cmd_map.keys()):
-                out+=f"{cmd}\n"
-            return CommandOutput(stdout=out)
-
-
         cmd_meta = self.cmd_map.get(cmd_name)
         if not cmd_meta:
             utils.write_history(line)
             utils.log_error(f"{cmd_name}: command not found", self.logger)
+            self.errcode = 127
             return None
 
         self.logger.info(line)
-        cmd_obj = cmd_meta.cmd(args = cmd_args)
+        try:
+            cmd_cls = cmd_meta.cmd
+        except ImportError as e:
+            utils.log_error(f"{cmd_name}: {e}", self.logger)
+            self.errcode = 126
+            return None
+        cmd_obj = cmd_cls(args = cmd_args, ctx = self.create_context(cmd_cls))
         cmd_obj.history()
+        return cmd_obj
+
+    def execute_command(self, line: str):
+        """
+        Executes input command. Commands separated by '|' are executed as pipeline
+        :param line:
+        :return: Result of command(None, if error occurred or command was not found)
+        """
+        self.errcode = 0
+        parts = [part.strip() for part, _ in utils.split_operators(line, PIPE_OPERATORS)]
+        if len(parts) > 1:
+            return self.execute_pipeline(parts)
+
+        parsed = self.parse_line(line)
+        if not parsed:
+            return None
+
+        cmd_name, cmd_args = parsed
+        if cmd_name == "help":
+            return CommandOutput(stdout=self.cmd_map.help_text)
+
+        cmd_obj = self.create_command(line)
+        if not cmd_obj:
+            return None
 
         if "--help" in cmd_args:
             return cmd_obj.help() #TODO: --help keys
@@ -180,3 +449,69 @@ class CommandLineSession:
             return cmd_obj.handled_run()
         except HANDLED_ERRORS as e:
             log_error(f"{cmd_name}: {str(e)}", self.logger)
+            self.errcode = 1
+            return None
+        finally:
+            self.cwd = cmd_obj.cwd
+
+    def execute_pipeline(self, parts: list[str]) -> CommandOutput | None:
+        """
+        Executes commands connected with pipes. Stdout of each command is lazily streamed to the next one,
+        so downstream command starts before upstream one finishes. Errors of all commands are prefixed with command name.
+        Like in bash, commands of pipeline do not change working directory of the session
+        :param parts: lines of commands in pipeline
+        :return: Result of the last command with errors of the previous ones(None, if some command was not found).
+        Errcode is errcode of the last command, like in bash without pipefail
+        """
+        if not all(parts):
+            utils.log_error("syntax error near unexpected token '|'", self.logger)
+            self.errcode = 2
+            return None
+
+        cmds: list[ExecutableCommand] = []
+        for part in parts:
+            cmd_obj = self.create_command(part)
+            if not cmd_obj:
+                return None
+            cmds.append(cmd_obj)
+
+        errors: list[CommandOutput] = []
+
+        def pipe(cmd_obj: ExecutableCommand):
+            for chunk in cmd_obj.stream():
+                if isinstance(chunk, str):
+                    yield chunk
+                    continue
+                if isinstance(chunk, FileRegion):
+                    text = chunk.decode()
+                    if text:
+                        yield text
+                    continue
+                if chunk.stdout:
+                    yield chunk.stdout
+                # like in bash(without pipefail), errcode of pipeline is errcode of the last command: only errors are kept
+                if chunk.stderr:
+                    errors.append(CommandOutput(stderr = self.prefixed(cmd_obj.name, chunk).stderr))
+
+        stdin = None
+        for cmd_obj in cmds[:-1]:
+            cmd_obj.stdin = stdin
+            stdin = pipe(cmd_obj)
+
+        last = cmds[-1]
+        last.stdin = stdin
+        try:
+            res = last.handled_run()
+        except HANDLED_ERRORS as e:
+            res = CommandOutput(stderr = str(e), errcode = 1)
+
+        def run_last():
+            if res:
+                for kind, chunk in res.consume():
+                    yield from errors
+                    errors.clear()
+                    yield chunk if kind == "stdout" else self.prefixed(last.name, CommandOutput(stderr = chunk))
+                yield CommandOutput(errcode = res.errcode)
+            yield from errors
+
+        return CommandOutput.from_stream(run_last())
@@ -1,5 +1,7 @@
 import logging
+import os
 from pathlib import Path
+from src.cmd_types.arguments import ArgumentsError
 from src.cmd_types.formats import ErrFormat, Attribute
 
 LOG_FILE: str = "/var/log/python-lab-2/shell.log"
@@ -12,9 +14,62 @@ DEFAULT_PWD: Path = Path("~/playground").expanduser()
 PLUGINS_DIR: str = "src.plugins"
 PLUGINS_PREFIX: str = "plugin"
 STRICT_PLUGIN_LOADING: bool = False
+PLUGINS_MANIFEST: Path = Path(DEFAULT_PWD) / ".plugins_manifest.json"
+"""Cache of commands found in plugins sources(see extra.plugins_manifest)"""
+PLUGINS_WATCH_INTERVAL: float = 1.0
+"""Seconds between checks of plugins for changes in 'plugins watch' mode"""
+
+BATCH_TARGET_CPS: int = 1000
+"""Expected throughput of script mode in commands per second. Warning is logged if the script runs slower"""
+
+JOBS_MAX_WORKERS: int = 4
+"""Max number of background jobs running at the same time"""
+
+DAEMON_SOCKET: Path = Path(DEFAULT_PWD) / ".daemon.sock"
+"""Unix socket of daemon(see src.daemon)"""
+
+CAT_CHUNK_SIZE: int = 1 << 20
+"""Bytes that cat reads or sends at once. Memory of cat does not depend on size of file"""
+
+LS_STAT_WORKERS: int = 8
+"""Threads that stat entries for 'ls -l', '-S' and '-t'. Helps on high-latency filesystems(NFS, FUSE). 1 to stat inline"""
+LS_STAT_CHUNK: int = 256
+"""Entries stat'ed by one task of 'ls' thread pool"""
+
+TAIL_BLOCK_SIZE: int = 1 << 16
+"""Bytes that head and tail scan for newlines at once. tail reads blocks backwards from the end of file"""
+TAIL_FOLLOW_INTERVAL: float = 0.25
+"""Seconds between checks of size of followed files('tail -f')"""
+
+GREP_WORKERS: int = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+"""Processes that scan files for 'grep -r' unless '-j' is given(CPUs available to the process, affinity is known only on Linux)"""
+GREP_BATCH: int = 64
+"""Files scanned by one task of grep process pool. Search of fewer files is done in process of the command"""
+GREP_BINARY_PROBE: int = 1 << 15
+"""Bytes at the start of file checked for NUL: file with NUL there is binary"""
+GREP_BLOCK_SIZE: int = 1 << 20
+"""Bytes of file decoded at once when pattern can not be matched against bytes(see extra.grep.Query)"""
 
 HISTORY_PATH: Path = Path(DEFAULT_PWD) / ".history"
+HISTORY_FLUSH_ENTRIES: int = 32
+"""Number of buffered history entries that are written at once(see extra.history)"""
+HISTORY_FLUSH_INTERVAL: float = 1.0
+"""Max age of buffered history entry in seconds. Older entries are written on the next command"""
+READLINE_HISTORY_SIZE: int = 1000
+"""Max number of history entries available with arrow keys in interactive session"""
+COMPLETION_CACHE_DIRS: int = 64
+"""Number of directories which listings are cached for path completion"""
 TRASH_PATH: Path = Path(DEFAULT_PWD) / ".trash"
+TRASH_MAX_BYTES: int = 1 << 30
+"""Max total size of trash in bytes. The oldest entries are evicted when it is exceeded(0 for no limit)"""
+TRASH_MAX_AGE: float = 7 * 24 * 60 * 60
+"""Max age of trash entry in seconds(0 for no limit)"""
+TRASH_EVICT_GRACE: float = 10 * 60
+"""Seconds a trash entry can not be evicted by size after removal, so it can be undone(the newest entry is never evicted by size)"""
+TRASH_GC_INTERVAL: float = 60.0
+"""Seconds between checks of trash quota by background collector"""
+JOURNAL_PATH: Path = Path(DEFAULT_PWD) / ".journal"
+"""Directory of undo and redo stacks(see extra.journal)"""
 
 TYPE_EXTENSION_ENUM: dict[str, str] = {
             "gztar": "tar.gz",
@@ -40,5 +95,12 @@ ERROR_HANDLERS_MESSAGES_FORMATS: dict[type[Exception], ErrFormat] = {
         format_str = "unicode decoding error",
         attrs = [],
         errcode = 3
+    ),
+    ArgumentsError: ErrFormat(
+        format_str = "{0}",
+        attrs = [
+            Attribute("message", [])
+        ],
+        errcode = 4
     )
 }
@@ -0,0 +1,105 @@
+"""
+Resident daemon that keeps plugins loaded and executes lines sent by src.client over a Unix socket.
+
+Protocol: client sends one JSON line {"line": str, "cwd": str}(or {"argv": list[str], ...} instead of "line").
+Daemon answers with JSON lines {"stdout": chunk}, {"stderr": chunk} as output is produced and {"errcode": int} in the end
+"""
+import io
+import json
+import shlex
+import socketserver
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+import src.constants as cst
+from src.command_line_session import CommandLineSession
+from src.extra.trash import start_collector
+
+
+class FrameWriter(io.TextIOBase):
+    """
+    Text stream that sends everything written to it to the client as {key: chunk} frames
+
+    :param wfile: binary stream of client connection
+    :param key: key of frames("stdout" or "stderr")
+    """
+    def __init__(self, wfile, key: str):
+        self.wfile = wfile
+        self.key = key
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if s:
+            self.wfile.write(json.dumps({self.key: s}).encode() + b"\n")
+        return len(s)
+
+    def flush(self):
+        self.wfile.flush()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Executes one line for one connection"""
+
+    wbufsize = io.DEFAULT_BUFFER_SIZE
+
+    server: "ShellDaemon"
+
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        line = request.get("line") or shlex.join(request.get("argv", []))
+        stdout = FrameWriter(self.wfile, "stdout")
+        stderr = FrameWriter(self.wfile, "stderr")
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            errcode = self.server.run(line, request.get("cwd"))
+        self.wfile.write(json.dumps({"errcode": errcode}).encode() + b"\n")
+
+
+class ShellDaemon(socketserver.UnixStreamServer):
+    """
+    Unix socket server with one warm session. Requests are served one by one, because output of commands is redirected process-wide
+
+    :param session: session to execute lines in. Plugins are loaded on creation
+    :type session: CommandLineSession
+
+    :param socket_path: path to Unix socket
+    :type socket_path: str | Path
+    """
+    def __init__(self, session: CommandLineSession, socket_path: str | Path = cst.DAEMON_SOCKET):
+        self.session = session
+        self.session.load_modules()
+        start_collector()
+        self.socket_path = Path(socket_path)
+        self.socket_path.unlink(missing_ok=True)
+        super().__init__(str(self.socket_path), RequestHandler)
+
+    def run(self, line: str, cwd: str | None) -> int:
+        """
+        Runs a line in the session
+        :param line: line to run
+        :param cwd: directory to run line in. If None, session default working directory is used
+        :return: errcode of the line
+        """
+        self.session.cwd = Path(cwd or self.session.default_wd).expanduser()
+        self.session.errcode = 0
+        try:
+            return self.session.run_line(line)
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 0
+
+    def server_close(self):
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def serve(socket_path: str | Path = cst.DAEMON_SOCKET):
+    """
+    Starts daemon and serves requests until interrupted
+    :param socket_path: path to Unix socket
+    """
+    with ShellDaemon(CommandLineSession(), socket_path) as daemon:
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -1,20 +1,51 @@
 """Submodule to register commands and their info"""
+import inspect
 import logging
 
+from src.cmd_types.arguments import CompiledParser, Option, Positional
 
-def command(cmd_name: str, flags: list[str] | None = None):
+
+def command(cmd_name: str, flags: list[str] | None = None, read_only: bool = False,
+            options: list[Option] | None = None, positionals: list[Positional] | None = None):
     """
-    Decorator to register a class as a command
+    Decorator to register a class as a command. Help table and arguments parser of the command are built once here
     :param cmd_name: name of the command
     :param flags: list of flags to be parsed(with '-' in the beginning)
+    :param read_only: command does not change files(e.g. ls, cat)
+    :param options: options of the command(see cmd_types.arguments.Option). Class attribute 'options' is used if None
+    :param positionals: positional arguments of the command. Class attribute 'positionals' is used if None
     """
     def decorator(cls):
         setattr(cls, 'name', cmd_name)
         setattr(cls, 'logger', logging.getLogger(cmd_name))
         setattr(cls, 'flags', flags)
+        setattr(cls, 'read_only', read_only)
+        if options is not None:
+            setattr(cls, 'options', tuple(options))
+        if positionals is not None:
+            setattr(cls, 'positionals', tuple(positionals))
+        setattr(cls, '__parser__', CompiledParser.from_flags(
+            flags, getattr(cls, 'options', ()), getattr(cls, 'positionals', None)
+        ))
+        setattr(cls, '__help_table__', build_help_table(cls))
         return cls
     return decorator
 
+def build_help_table(cls) -> str:
+    """
+    Builds help table of command class from methods registered with display_in_help
+    :param cls: command class
+    :return: table with rows '{name}\t\t{doc}' sorted by methods names
+    """
+    outs: list[tuple[str, str]] = []
+    for name, obj in inspect.getmembers(cls, callable):
+        if not name.startswith("__") and getattr(obj, "__display_help__", False):
+            outs.append((getattr(obj, "__help_name__", None) or name, getattr(obj, "__doc__", "") or ""))
+    if not outs:
+        return ""
+    max_len = max(len(name) for name, _ in outs)
+    return "".join(name + " " * (max_len - len(name)) + 2 * "\t" + doc + "\n" for name, doc in outs)
+
 def display_in_help(name: str | None = None):
     """
     Decorator to register method in display of '--help' option. Will take information from __doc__
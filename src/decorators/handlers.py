@@ -5,48 +5,39 @@ import src.constants as cst
 from src.cmd_types.output import CommandOutput
 from src.extra.formatter import formatter
 
-def get_cls_caller(func):
+def handled_output(e: Exception) -> CommandOutput:
     """
-    Gets initial caller of the decorated function. Caller is identified by logger attribute availability
-    :param func: decorated function
-    :return:
+    Converts exception registered in constants.ERROR_HANDLERS_MESSAGES_FORMATS to command output
+    :param e: exception to convert
+    :return: output with formatted error message
     """
-    @wraps(func)
-    def wrapper(self = None, *args, **kwargs):
-        requires_self = True
-        if not getattr(self, 'logger', None):
-            requires_self = False
-            caller_frame = inspect.currentframe().f_back
-            while not (
-                    getattr(caller_frame.f_locals.get('self', {}),
-                            "logger",
-                            None)
-            ):
-                caller_frame = caller_frame.f_back
-            args = list(args)
-            args.insert(0, self)
-            self = caller_frame.f_locals["self"]
-
-        return func(self, *args, requires_self = requires_self, **kwargs)
-    return wrapper
+    err_msg_format = cst.ERROR_HANDLERS_MESSAGES_FORMATS[type(e)]
+    err_msg = formatter(e, err_msg_format)
+    return CommandOutput(
+        stderr = err_msg+"\n",
+        errcode = err_msg_format.errcode
+    )
 
 def handle_all_default(func):
-    """Converts default exceptions to custom ones. Will raise an exception, if initial caller is class, not a function"""
+    """
+    Converts default exceptions to custom ones. Works for methods and plain functions the same way: arguments are passed as is.
+    Generator functions are supported: error is yielded as the last chunk
+    """
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            try:
+                yield from func(*args, **kwargs)
+            except tuple(cst.ERROR_HANDLERS_MESSAGES_FORMATS.keys()) as e:
+                yield handled_output(e)
+
+        return gen_wrapper
+
     @wraps(func)
-    @get_cls_caller
-    def wrapper(self, *args, requires_self: bool = True, **kwargs):
+    def wrapper(*args, **kwargs):
         try:
-            if requires_self:
-                return func(self, *args, **kwargs)
-            else:
-                return func(*args, **kwargs)
+            return func(*args, **kwargs)
         except tuple(cst.ERROR_HANDLERS_MESSAGES_FORMATS.keys()) as e:
-            e_type = type(e)
-            err_msg_format = cst.ERROR_HANDLERS_MESSAGES_FORMATS[e_type]
-            err_msg = formatter(e, err_msg_format)
-            return CommandOutput(
-                stderr = err_msg+"\n",
-                errcode = err_msg_format.errcode
-            )
+            return handled_output(e)
 
     return wrapper
@@ -0,0 +1,166 @@
+"""
+Tab completion of interactive session: names of commands, their flags and paths.
+
+Path completion reads directories through DirectoryCache: sorted names of directory are kept until its mtime changes,
+so completion in huge directories costs a stat and a binary search
+"""
+import bisect
+import os
+import readline  # type: ignore
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import src.constants as cst
+from src.extra import utils
+from src.extra.history import get_history
+
+if TYPE_CHECKING:
+    from src.command_line_session import CommandLineSession
+
+COMPLETER_DELIMS = " \t\n;|&<>"
+"""Characters that split words for completion. '/', '~', '.' and '-' are parts of paths and flags"""
+
+
+def prefixed(names: list[str], prefix: str) -> list[str]:
+    """
+    Finds names starting with prefix by binary search
+    :param names: sorted names
+    :param prefix: prefix to look for
+    """
+    start = bisect.bisect_left(names, prefix)
+    stop = start
+    while stop < len(names) and names[stop].startswith(prefix):
+        stop += 1
+    return names[start:stop]
+
+
+class DirectoryCache:
+    """
+    Sorted listings of directories. Listing is read again only when mtime of directory changes,
+    the least recently used listings are dropped
+
+    :param max_dirs: number of cached directories
+    :type max_dirs: int
+    """
+    def __init__(self, max_dirs: int = cst.COMPLETION_CACHE_DIRS):
+        self.max_dirs = max_dirs
+        self._listings: OrderedDict[Path, tuple[int, list[str]]] = OrderedDict()
+
+    def listing(self, directory: Path) -> list[str]:
+        """
+        :param directory: directory to list
+        :return: sorted names of entries. Names of directories end with '/'. Empty if directory can not be read
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            self._listings.move_to_end(directory)
+            return cached[1]
+        try:
+            with os.scandir(directory) as it:
+                names = sorted(entry.name + "/" if entry.is_dir() else entry.name for entry in it)
+        except OSError:
+            return []
+        self._listings[directory] = (mtime, names)
+        self._listings.move_to_end(directory)
+        while len(self._listings) > self.max_dirs:
+            self._listings.popitem(last=False)
+        return names
+
+    def complete(self, directory: Path, prefix: str) -> list[str]:
+        """
+        :param directory: directory to look in
+        :param prefix: beginning of name. Hidden entries are completed only if it starts with '.'
+        :return: names of entries starting with prefix
+        """
+        names = prefixed(self.listing(directory), prefix)
+        if not prefix.startswith("."):
+            names = [name for name in names if not name.startswith(".")]
+        return names
+
+
+class Completer:
+    """
+    Completer for readline
+
+    :param session: session to take commands and working directory from
+    :type session: CommandLineSession
+
+    :param operators: control operators that start a new command(e.g. ';', '|')
+    :type operators: tuple[str, ...]
+    """
+    def __init__(self, session: "CommandLineSession", operators: tuple[str, ...]):
+        self.session = session
+        self.operators = operators
+        self.dirs = DirectoryCache()
+        self._matches: list[str] = []
+
+    def matches(self, line: str, begidx: int, text: str) -> list[str]:
+        """
+        Finds completions of word
+        :param line: whole input line
+        :param begidx: index of the word in line
+        :param text: word to complete
+        :return: completions of the word
+        """
+        segment = utils.split_operators(line[:begidx], self.operators)[-1][0]
+        words = segment.split()
+        if not words:
+            return [name + " " for name in prefixed(self.session.cmd_map.names, text)]
+        if text.startswith("-"):
+            flags = (*self.session.cmd_map.flags(words[0]), "--help")
+            return sorted(flag + " " for flag in flags if flag.startswith(text))
+        return self.complete_path(text)
+
+    def complete_path(self, text: str) -> list[str]:
+        """
+        :param text: beginning of path, relative to working directory of session or absolute
+        :return: paths starting with text
+        """
+        head, prefix = os.path.split(text)
+        directory = self.session.cwd / os.path.expanduser(head) if head else self.session.cwd
+        base = head + "/" if head and not head.endswith("/") else head
+        return [base + name for name in self.dirs.complete(Path(os.path.normpath(directory)), prefix)]
+
+    def complete(self, text: str, state: int) -> str | None:
+        """Completion function of readline: returns match number 'state'"""
+        if state == 0:
+            try:
+                self._matches = self.matches(readline.get_line_buffer(), readline.get_begidx(), text)
+            except Exception:
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+
+
+def history_lines(limit: int = cst.READLINE_HISTORY_SIZE) -> list[str]:
+    """
+    :param limit: max number of lines
+    :return: the last lines of shared history(see extra.history)
+    """
+    return [line for _, line in get_history().tail(limit)]
+
+
+def install(session: "CommandLineSession", operators: tuple[str, ...]) -> Completer:
+    """
+    Registers completer in readline. History is loaded into readline lazily, right before the first prompt
+    :param session: interactive session
+    :param operators: control operators that start a new command
+    :return: registered completer
+    """
+    completer = Completer(session, operators)
+    readline.set_completer(completer.complete)
+    readline.set_completer_delims(COMPLETER_DELIMS)
+    readline.parse_and_bind("tab: complete")
+    readline.set_history_length(cst.READLINE_HISTORY_SIZE)
+
+    def load_history():
+        readline.set_startup_hook(None)
+        for line in history_lines():
+            readline.add_history(line)
+
+    readline.set_startup_hook(load_history)
+    return completer
@@ -0,0 +1,597 @@
+"""
+Search engine of grep. Tree is walked once in order of paths, files are scanned in batches on a process pool
+(regular expressions hold GIL, so threads would not scan in parallel) and results are returned in order of paths.
+
+Files are memory-mapped and searched by one regex pass over the whole buffer, so there is no object per line:
+a line is found around every match and its number is counted only then. Bytes are never decoded as a whole,
+except for patterns whose meaning depends on characters(see Query).
+
+Many fixed strings('-F' with many '-e' or '-f') are searched in one pass(see literals_pattern)
+"""
+import itertools
+import mmap
+import multiprocessing
+import os
+import re
+import re._constants as sre  # type: ignore[import-not-found]
+import re._parser as sre_parse  # type: ignore[import-not-found]
+import stat
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AnyStr, Generator, Iterable, Iterator
+
+import src.constants as cst
+
+_REPEATS = (sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT)
+
+_NOTHING = "(?!)"
+"""Pattern that never matches(no patterns select no lines, like in GNU grep)"""
+
+
+def _bytes_safe(items) -> bool:
+    """
+    Checks parsed pattern: it is safe to match it against UTF-8 bytes if it consists of ASCII literals only.
+    Constructs that match one character('.', classes, \\w, \\b...) would match one byte of multibyte character
+    """
+    for op, av in items:
+        if op is sre.LITERAL:
+            if av > 127:
+                return False
+        elif op is sre.IN:
+            for item_op, item_av in av:
+                if item_op is sre.LITERAL and item_av > 127 or item_op is sre.RANGE and item_av[1] > 127:
+                    return False
+                if item_op in (sre.NEGATE, sre.CATEGORY):
+                    return False
+        elif op is sre.AT:
+            if av in (sre.AT_BOUNDARY, sre.AT_NON_BOUNDARY):
+                return False
+        elif op is sre.SUBPATTERN:
+            if not _bytes_safe(av[3]):
+                return False
+        elif op in _REPEATS:
+            if not _bytes_safe(av[2]):
+                return False
+        elif op is sre.BRANCH:
+            if not all(_bytes_safe(branch) for branch in av[1]):
+                return False
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            if not _bytes_safe(av[1]):
+                return False
+        elif op is sre.ATOMIC_GROUP:
+            if not _bytes_safe(av):
+                return False
+        elif op is sre.GROUPREF_EXISTS:
+            if not all(_bytes_safe(branch) for branch in av[1:] if branch is not None):
+                return False
+        elif op is not sre.GROUPREF:
+            return False
+    return True
+
+
+class Literal:
+    """
+    Searcher of one fixed string by find. Has search method of re.Pattern, so it is used in place of regex
+
+    :param needle: string or bytes to find
+    """
+    def __init__(self, needle: str | bytes):
+        self.needle: str | bytes = needle
+
+    def search(self, buf, pos: int = 0, endpos: int | None = None) -> "_Found | None":
+        found = buf.find(self.needle, pos, len(buf) if endpos is None else endpos)
+        return None if found == -1 else _Found(found, found + len(self.needle))
+
+
+class AnyOf:
+    """
+    Searcher of the earliest match of many regexes. Has search method of re.Pattern, so it is used in place of regex
+    for patterns that can not be joined to one regex(see Query._separate).
+    The next match of every regex is remembered, so buffer is scanned by every regex once, not once per found line
+
+    :param regexes: compiled patterns of the same type
+    """
+    def __init__(self, regexes: list[re.Pattern]):
+        self.regexes = regexes
+        self._buf = None
+        self._next: list[tuple[int, _Found | None]] = []
+        """Position search of every regex started from and the match it found, for self._buf"""
+
+    def __getstate__(self):
+        return {"regexes": self.regexes}
+
+    def __setstate__(self, state):
+        self.__init__(state["regexes"])
+
+    def search(self, buf, pos: int = 0, endpos: int | None = None) -> "_Found | None":
+        if endpos is not None:
+            found = [self._found(regex.search(buf, pos, endpos)) for regex in self.regexes]
+        else:
+            if buf is not self._buf:
+                self._buf, self._next = buf, [(len(buf) + 1, None)] * len(self.regexes)
+            found = []
+            for i, regex in enumerate(self.regexes):
+                start, match = self._next[i]
+                if start > pos or match is not None and match.first < pos:
+                    self._next[i] = start, match = pos, self._found(regex.search(buf, pos))
+                found.append(match)
+        return min((match for match in found if match is not None), key=lambda match: match.first, default=None)
+
+    @staticmethod
+    def _found(match: re.Match | None) -> "_Found | None":
+        # bounds only: match would keep buffer(e.g. mmap) referenced
+        return None if match is None else _Found(match.start(), match.end())
+
+
+@dataclass(frozen=True)
+class _Found:
+    """Match of Literal(start and end are methods, like in re.Match)"""
+    first: int
+    last: int
+
+    def start(self) -> int:
+        return self.first
+
+    def end(self) -> int:
+        return self.last
+
+
+def literals_pattern(needles: Iterable[AnyStr], empty: AnyStr) -> AnyStr:
+    """
+    Makes pattern that matches any of fixed strings. Strings are put to trie and the trie is written as regex
+    with common prefixes factored out, so search tries only the trie at every position, not every string.
+    (alternation of strings is tried string by string at every position)
+    :param needles: strings or bytes
+    :param empty: '' or b'', type of pattern
+    :return: pattern that never matches if there are no strings
+    """
+    trie: dict = {}
+    for needle in needles:
+        node = trie
+        for i in range(len(needle)):
+            node = node.setdefault(needle[i:i + 1], {})
+        node[None] = {}
+    if not trie:
+        return _NOTHING if isinstance(empty, str) else _NOTHING.encode()  # type: ignore[return-value]
+    return _trie_pattern(trie, empty)
+
+
+def _trie_pattern(node: dict, empty: AnyStr) -> AnyStr:
+    def text(s: str) -> AnyStr:
+        return s if isinstance(empty, str) else s.encode()  # type: ignore[return-value]
+
+    # chains of single children are written as literal runs without recursion and groups
+    prefix = []
+    while len(node) == 1 and None not in node:
+        unit, node = next(iter(node.items()))
+        prefix.append(re.escape(unit))
+    branches = [re.escape(unit) + _trie_pattern(child, empty) for unit, child in sorted(
+        (item for item in node.items() if item[0] is not None), key=lambda item: item[0])]
+    body = empty.join(branches)
+    if len(branches) > 1:
+        body = text("(?:") + text("|").join(branches) + text(")")
+    if None in node and branches:
+        body = (body if len(branches) > 1 else text("(?:") + body + text(")")) + text("?")
+    return empty.join(prefix) + body
+
+
+_GLOBAL_FLAGS = re.compile(r"(?:\(\?[aiLmsux]+\))+")
+"""Inline global flags, they may be only at the start of pattern"""
+
+
+def _word(pattern: str) -> str:
+    """
+    Makes pattern match only whole words. Inline global flags of pattern are kept at the start
+    """
+    prefix = _GLOBAL_FLAGS.match(pattern)
+    flags = prefix.group() if prefix else ""
+    return rf"{flags}(?<!\w)(?:{pattern[len(flags):]})(?!\w)"
+
+
+def _bytes_regex(pattern: str, flags: int) -> re.Pattern | None:
+    """
+    :return: pattern compiled for UTF-8 bytes or None if it would not match the same lines as text(see _bytes_safe)
+    """
+    if not pattern.isascii() or not _bytes_safe(sre_parse.parse(pattern, flags)):
+        return None
+    try:
+        return re.compile(pattern.encode("ascii"), flags)
+    except re.error:
+        # e.g. inline flag 'u' is not allowed in bytes pattern
+        return None
+
+
+@dataclass
+class Query:
+    """
+    What to search. It is sent to worker processes, so patterns are compiled once
+
+    :raise re.error: if pattern is invalid(error has the invalid pattern)
+    """
+    patterns: list[str]
+    """Line matches if any of patterns matches"""
+
+    fixed: bool = False
+    """Patterns are strings, not regular expressions"""
+
+    ignore_case: bool = False
+
+    binary_files: str = "binary"
+    """What to do with binary files: 'binary'(report that file matches), 'without-match'(skip), 'text'(search as text)"""
+
+    invert: bool = False
+    """Select lines that do not match"""
+
+    word: bool = False
+    """Match only whole words"""
+
+    max_count: int | None = None
+    """Stop reading file after this number of selected lines"""
+
+    mode: str = "lines"
+    """What is needed: 'lines'(selected lines), 'count'(their number), 'files'(whether there is one)"""
+
+    text_searcher: "re.Pattern | Literal | AnyOf" = field(init=False)
+    """Searcher for text"""
+
+    bytes_searcher: "re.Pattern | Literal | AnyOf | None" = field(init=False)
+    """Searcher for UTF-8 bytes. None if it would not match the same lines as text searcher"""
+
+    verify: bool = field(init=False)
+    """Bytes searcher only finds candidate lines, they must be matched by text searcher"""
+
+    def __post_init__(self):
+        flags = re.MULTILINE | (re.IGNORECASE if self.ignore_case else 0)
+        separate = None if self.fixed else self._separate(flags)
+        if separate:
+            self._compile_separate(separate, flags)
+        else:
+            pattern = self._compile_fixed(flags) if self.fixed else self._compile_regex(flags)
+            if self.word:
+                self.text_searcher = re.compile(_word(pattern), flags)
+        # bytes can not tell which UTF-8 characters are word ones, so bytes searcher finds only candidate lines
+        self.verify = self.word and self.bytes_searcher is not None
+
+    def _separate(self, flags: int) -> list[re.Pattern] | None:
+        """
+        Checks if patterns can be joined to one regex. They can not if some of them has groups(joining renumbers them,
+        so backreferences break and names may repeat) or inline flags(they would apply to the whole regex)
+        :return: compiled patterns if they must be searched separately, otherwise None
+        """
+        if len(self.patterns) < 2:
+            return None
+        compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+        default = re.compile("", flags).flags
+        return compiled if any(regex.groups or regex.flags != default for regex in compiled) else None
+
+    def _compile_separate(self, compiled: list[re.Pattern], flags: int):
+        """Makes searchers of patterns that can not be joined(see _separate, AnyOf)"""
+        self.text_searcher = AnyOf([re.compile(_word(regex.pattern), flags) if self.word else regex for regex in compiled])
+        raws = [raw for raw in (_bytes_regex(regex.pattern, flags) for regex in compiled) if raw is not None]
+        self.bytes_searcher = AnyOf(raws) if len(raws) == len(compiled) else None
+
+    def _compile_regex(self, flags: int) -> str:
+        """:return: text pattern"""
+        if not self.patterns:
+            pattern = _NOTHING
+        elif len(self.patterns) == 1:
+            pattern = self.patterns[0]
+        else:
+            for pattern in self.patterns:
+                re.compile(pattern, flags)
+            pattern = "|".join(f"(?:{pattern})" for pattern in self.patterns)
+        self.text_searcher = re.compile(pattern, flags)
+        self.bytes_searcher = _bytes_regex(pattern, flags)
+        return pattern
+
+    def _compile_fixed(self, flags: int) -> str:
+        """:return: text pattern"""
+        needles = [needle.encode("utf-8", errors="surrogateescape") for needle in self.patterns]
+        if len(self.patterns) == 1 and not self.ignore_case:
+            self.text_searcher, self.bytes_searcher = Literal(self.patterns[0]), Literal(needles[0])
+            return re.escape(self.patterns[0])
+        pattern = literals_pattern(self.patterns, "")
+        self.text_searcher = re.compile(pattern, flags)
+        self.bytes_searcher = None
+        # bytes are case-folded only in ASCII
+        if not self.ignore_case or all(needle.isascii() for needle in needles):
+            self.bytes_searcher = re.compile(literals_pattern(needles, b""), flags)
+        return pattern
+
+
+@dataclass
+class FileResult:
+    """
+    Result of scanning one file
+    """
+    path: Path
+
+    lines: list[tuple[int, str]] = field(default_factory=list)
+    """Matched lines (number, line without line end)"""
+
+    count: int = 0
+    """Number of selected lines(it is 1 at most if only files with matches are needed)"""
+
+    binary: bool = False
+    """File is binary and matches(its lines are not shown)"""
+
+    error: Exception | None = None
+    """Error that stopped scanning(lines matched before it are kept)"""
+
+
+def _sorted_entries(directory: str) -> Iterator[os.DirEntry]:
+    with os.scandir(directory) as it:
+        return iter(sorted(it, key=lambda entry: entry.name))
+
+
+def walk(root: Path) -> Iterator[FileResult | Path]:
+    """
+    Finds files of tree depth-first, names are sorted in every directory. Symbolic links to directories are not followed
+    :param root: directory
+    :return: iterator of files and results with errors of directories that can not be read
+    """
+    stack = []
+    try:
+        stack.append(_sorted_entries(str(root)))
+    except OSError as e:
+        yield FileResult(root, error=e)
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            is_file = not is_dir and entry.is_file()
+        except OSError:
+            continue
+        if is_dir:
+            try:
+                stack.append(_sorted_entries(entry.path))
+            except OSError as e:
+                yield FileResult(Path(entry.path), error=e)
+        elif is_file:
+            yield Path(entry.path)
+
+
+def matched_lines(buf, regex: "re.Pattern | Literal | AnyOf") -> Iterator[tuple[int, int]]:
+    """
+    Finds lines that match by search over the whole buffer. Line is found around match, so lines without matches cost nothing
+    :param buf: bytes, mmap or str
+    :param regex: searcher of the same type as buffer(pattern is compiled with re.MULTILINE)
+    :return: iterator of bounds of lines (start, end), end is offset of newline
+    """
+    newline = "\n" if isinstance(buf, str) else b"\n"
+    size = len(buf)
+    pos = 0
+    while pos < size:
+        match = regex.search(buf, pos)
+        if match is None:
+            return
+        start = buf.rfind(newline, 0, match.start()) + 1
+        end = buf.find(newline, match.start())
+        if end == -1:
+            end = size
+        # match can span newline(e.g. '\s'), lines never do: the line must match on its own
+        if match.end() <= end or regex.search(buf, start, end):
+            yield start, end
+        pos = end + 1
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    if isinstance(buf, str):
+        return buf.count("\n", start, end)
+    if isinstance(buf, bytes):
+        return buf.count(b"\n", start, end)
+    # mmap can not count, it is copied by blocks
+    return sum(buf[pos:min(pos + cst.GREP_BLOCK_SIZE, end)].count(b"\n")
+               for pos in range(start, end, cst.GREP_BLOCK_SIZE))
+
+
+def numbered(buf, bounds: Iterable[tuple[int, int]]) -> Iterator[tuple[int, int, int]]:
+    """
+    Numbers lines. Newlines are counted only between consecutive lines, so every byte is counted once
+    :param buf: bytes, mmap or str
+    :param bounds: bounds of lines in order
+    :return: iterator of (number, start, end)
+    """
+    number, counted = 1, 0
+    for start, end in bounds:
+        number += _count_newlines(buf, counted, start)
+        counted = start
+        yield number, start, end
+
+
+def complement(buf, bounds: Iterable[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+    """
+    Finds lines that are not in bounds
+    :param buf: bytes, mmap or str
+    :param bounds: bounds of lines in order(see matched_lines)
+    :return: iterator of bounds of other lines
+    """
+    newline = "\n" if isinstance(buf, str) else b"\n"
+    size = len(buf)
+    pos = 0
+    for start, end in itertools.chain(bounds, [(size, size)]):
+        while pos < start:
+            stop = buf.find(newline, pos, start)
+            if stop == -1:
+                stop = start
+            yield pos, stop
+            pos = stop + 1
+        pos = end + 1
+
+
+def _selected(buf, searcher: "re.Pattern | Literal | AnyOf", query: Query) -> Iterator[tuple[int, int]]:
+    """Bounds of lines of buffer that are selected by query"""
+    bounds = matched_lines(buf, searcher)
+    if query.verify and not isinstance(buf, str):
+        bounds = (
+            (start, end) for start, end in bounds
+            if query.text_searcher.search(buf[start:end].decode("utf-8", errors="surrogateescape"))
+        )
+    return complement(buf, bounds) if query.invert else bounds
+
+
+def _decoded_blocks(buf) -> Iterator[tuple[str, int]]:
+    """
+    Decodes buffer by blocks of whole lines
+    :return: iterator of (block, number of lines before it)
+    """
+    size = len(buf)
+    pos, base = 0, 0
+    while pos < size:
+        end = buf.find(b"\n", min(pos + cst.GREP_BLOCK_SIZE, size) - 1)
+        end = size if end == -1 else end + 1
+        # blocks end after newline, so multibyte character is never split
+        text = buf[pos:end].decode("utf-8", errors="surrogateescape")
+        yield text, base
+        base += text.count("\n")
+        pos = end
+
+
+def selected_lines(buf, query: Query, numbers: bool = True) -> Iterator[tuple[int, AnyStr]]:
+    """
+    Finds lines selected by query. Bytes are searched as is if possible, otherwise they are decoded by blocks
+    :param buf: bytes or mmap
+    :param numbers: count numbers of lines. If False, numbers are 0
+    :return: iterator of (number, line)
+    """
+    if query.bytes_searcher is not None:
+        searcher, segments = query.bytes_searcher, iter([(buf, 0)])
+    else:
+        searcher, segments = query.text_searcher, _decoded_blocks(buf)
+    for segment, base in segments:
+        bounds = _selected(segment, searcher, query)
+        if not numbers:
+            for start, end in bounds:
+                yield 0, segment[start:end]
+            continue
+        for number, start, end in numbered(segment, bounds):
+            yield base + number, segment[start:end]
+
+
+def _text(line: AnyStr) -> str:
+    raw = line.encode("utf-8", errors="surrogateescape") if isinstance(line, str) else line
+    return raw.decode("utf-8", errors="replace").rstrip("\r")
+
+
+@contextmanager
+def _mapped(file):
+    """Maps regular file to memory. Other files(and empty ones, they can not be mapped) are read"""
+    st = os.fstat(file.fileno())
+    if stat.S_ISREG(st.st_mode) and st.st_size:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+    else:
+        yield file.read()
+
+
+def scan(path: Path, query: Query) -> FileResult:
+    """
+    Finds lines of file that are selected by query. Reading stops as soon as query needs no more lines
+    :param path: path to file
+    :param query: what to search
+    """
+    result = FileResult(path)
+    try:
+        with open(path, "rb") as file, _mapped(file) as buf:
+            binary = query.binary_files != "text" and buf.find(b"\0", 0, cst.GREP_BINARY_PROBE) != -1
+            if binary and query.binary_files == "without-match":
+                return result
+            lines: Iterator = selected_lines(buf, query, numbers=query.mode == "lines")
+            limit = 1 if query.mode == "files" else query.max_count
+            if limit is not None:
+                lines = itertools.islice(lines, limit)
+            if query.mode != "lines":
+                result.count = sum(1 for _ in lines)
+                return result
+            for number, line in lines:
+                text = _text(line)
+                # NUL may be after the probed start of file
+                if binary or query.binary_files != "text" and "\0" in text:
+                    result.lines.clear()
+                    result.binary = query.binary_files == "binary"
+                    result.count = 1
+                    break
+                result.lines.append((number, text))
+                result.count += 1
+    except OSError as e:
+        result.error = e
+    return result
+
+
+def scan_batch(paths: list[Path], query: Query) -> list[FileResult]:
+    """Scans files in worker process"""
+    return [scan(path, query) for path in paths]
+
+
+def _merged(batch: list, results: Iterable[FileResult]) -> Iterator:
+    """Puts results of scanned paths of batch to their places"""
+    results = iter(results)
+    for item in batch:
+        yield next(results) if isinstance(item, Path) else item
+
+
+def search(items: Iterable, query: Query, jobs: int) -> Generator:
+    """
+    Scans files in batches of GREP_BATCH. If there is more than one batch and jobs > 1, batches are scanned on process pool
+    (see _pool).
+    Only a few batches are in flight at once, so memory does not depend on number of files
+    :param items: files in order of output(see walk). Other items(e.g. errors) are returned as is in their places
+    :param query: what to search
+    :param jobs: number of worker processes
+    :return: iterator of results and other items in order of items
+    """
+    items = iter(items)
+    batches = iter(lambda: list(itertools.islice(items, cst.GREP_BATCH)), [])
+    head = list(itertools.islice(batches, 2))
+    if jobs <= 1 or len(head) < 2:
+        for batch in itertools.chain(head, batches):
+            yield from _merged(batch, (scan(item, query) for item in batch if isinstance(item, Path)))
+        return
+    pool = _pool(jobs)
+    pending: deque = deque()
+    try:
+        for batch in itertools.chain(head, batches):
+            paths = [item for item in batch if isinstance(item, Path)]
+            pending.append((batch, pool.submit(scan_batch, paths, query)))
+            if len(pending) > 2 * jobs:
+                batch, future = pending.popleft()
+                yield from _merged(batch, future.result())
+        while pending:
+            batch, future = pending.popleft()
+            yield from _merged(batch, future.result())
+    except BrokenProcessPool:
+        with _pools_lock:
+            if _pools.get(jobs) is pool:
+                del _pools[jobs]
+        raise
+    finally:
+        # pool is shared, so only batches of this search are cancelled(e.g. if search was stopped early)
+        for _, future in pending:
+            future.cancel()
+
+
+_pools: dict[int, ProcessPoolExecutor] = {}
+"""Process pools by number of workers. Pool is kept for the whole session, so its start is paid only once"""
+
+_pools_lock = threading.Lock()
+
+
+def _pool(jobs: int) -> ProcessPoolExecutor:
+    """
+    Gets pool of jobs workers, starts it on the first call
+    :param jobs: number of worker processes
+    """
+    with _pools_lock:
+        pool = _pools.get(jobs)
+        if pool is None:
+            # workers are forked by fork server: session may have threads(jobs, trash collector), forking them is unsafe
+            pool = _pools[jobs] = ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("forkserver"))
+        return pool
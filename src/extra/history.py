@@ -0,0 +1,291 @@
+"""
+Append-only history of commands shared by sessions.
+
+Files:
+ - HISTORY_PATH: entries, one per line(same format as before, so old history is kept)
+ - HISTORY_PATH.idx: offset of every entry in data file as uint64. Entry number N(1-based) starts at offset N-1
+ - HISTORY_PATH.del: numbers of deleted entries(tombstones) as uint64
+
+Entries are buffered and written by group commits under flock, index is caught up from data file if it is behind
+(e.g. history was written by older version)
+"""
+import atexit
+import bisect
+import fcntl
+import mmap
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import src.constants as cst
+
+_OFFSET_SIZE = array("Q").itemsize
+
+
+class HistoryStore:
+    """
+    Indexed append-only history
+
+    :param path: path to history file. If None, constants.HISTORY_PATH is used
+    :type path: Path | None
+
+    :param flush_entries: number of buffered entries that triggers commit
+    :type flush_entries: int
+
+    :param flush_interval: age of the oldest buffered entry(seconds) that triggers commit on the next append
+    :type flush_interval: float
+    """
+    def __init__(self, path: Path | None = None, flush_entries: int = cst.HISTORY_FLUSH_ENTRIES,
+                 flush_interval: float = cst.HISTORY_FLUSH_INTERVAL):
+        self.path = Path(path or cst.HISTORY_PATH)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.tombstones_path = self.path.with_name(self.path.name + ".del")
+        self.flush_entries = flush_entries
+        self.flush_interval = flush_interval
+        self._buffer: list[bytes] = []
+        self._buffered_at = 0.0
+        self._lock = threading.RLock()
+        self._tombstones: set[int] = set()
+        self._tombstones_size = 0
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """
+        Opens data file locked with flock
+        :param exclusive: lock for writing. Index is caught up with data file under exclusive lock
+        :return: binary data file
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path, "a+b") as data:
+            fcntl.flock(data, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                if exclusive:
+                    self._sync_index(data)
+                yield data
+            finally:
+                fcntl.flock(data, fcntl.LOCK_UN)
+
+    def _sync_index(self, data):
+        """
+        Appends offsets of entries that are in data file but not in index. Index is rebuilt if it does not match data
+        :param data: data file locked exclusively
+        """
+        data_size = os.fstat(data.fileno()).st_size
+        with open(self.index_path, "a+b") as index:
+            count = os.fstat(index.fileno()).st_size // _OFFSET_SIZE
+            end = 0
+            if count:
+                last = self._read_offsets(index, count - 1, count)[0]
+                data.seek(last)
+                line = data.readline()
+                end = last + len(line)
+                if last >= data_size or not line.endswith(b"\n"):
+                    index.truncate(0)
+                    count, end = 0, 0
+            index.truncate(count * _OFFSET_SIZE)
+            if end >= data_size:
+                return
+            offsets = array("Q")
+            data.seek(end)
+            for line in iter(data.readline, b""):
+                offsets.append(end)
+                end += len(line)
+                if not line.endswith(b"\n"):
+                    data.write(b"\n")
+            index.seek(0, os.SEEK_END)
+            offsets.tofile(index)
+
+    @staticmethod
+    def _read_offsets(index, start: int, stop: int) -> array:
+        offsets = array("Q")
+        index.seek(start * _OFFSET_SIZE)
+        offsets.frombytes(index.read((stop - start) * _OFFSET_SIZE))
+        return offsets
+
+    def append(self, line: str):
+        """
+        Adds entry. It is committed when buffer is full or old enough, before any read and on exit
+        :param line: command line
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not self._buffer:
+                self._buffered_at = now
+            self._buffer.append(line.replace("\n", " ").encode("utf-8") + b"\n")
+            if len(self._buffer) >= self.flush_entries or now - self._buffered_at >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """Writes buffered entries and their offsets with one write each. Index is caught up with data file even if buffer is empty"""
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+            with self._locked(exclusive=True) as data:
+                if not buffer:
+                    return
+                end = data.seek(0, os.SEEK_END)
+                offsets = array("Q")
+                for entry in buffer:
+                    offsets.append(end)
+                    end += len(entry)
+                data.write(b"".join(buffer))
+                data.flush()
+                with open(self.index_path, "ab") as index:
+                    offsets.tofile(index)
+
+    def __len__(self) -> int:
+        """Number of entries, deleted ones included"""
+        self.flush()
+        with self._locked(exclusive=False):
+            return self._count()
+
+    def _count(self) -> int:
+        try:
+            return self.index_path.stat().st_size // _OFFSET_SIZE
+        except FileNotFoundError:
+            return 0
+
+    def tombstones(self) -> set[int]:
+        """
+        :return: numbers of deleted entries
+        """
+        try:
+            size = self.tombstones_path.stat().st_size
+        except FileNotFoundError:
+            return set()
+        if size != self._tombstones_size:
+            deleted = array("Q")
+            with open(self.tombstones_path, "rb") as f:
+                deleted.frombytes(f.read(size - size % _OFFSET_SIZE))
+            self._tombstones = set(deleted)
+            self._tombstones_size = size
+        return self._tombstones
+
+    def delete(self, number: int) -> bool:
+        """
+        Marks entry as deleted without rewriting history
+        :param number: number of entry(1-based)
+        :return: False if there is no such entry or it is already deleted
+        """
+        with self._lock:
+            if not 0 < number <= len(self) or number in self.tombstones():
+                return False
+            with self._locked(exclusive=True):
+                with open(self.tombstones_path, "ab") as f:
+                    array("Q", [number]).tofile(f)
+            return True
+
+    def _entries(self, data, start: int, stop: int) -> list[tuple[int, str]]:
+        """
+        Reads entries with numbers in [start+1, stop] with one read
+        :param data: locked data file
+        """
+        if start >= stop:
+            return []
+        with open(self.index_path, "rb") as index:
+            offsets = self._read_offsets(index, start, stop)
+        data.seek(offsets[0])
+        chunk = data.read(self._end_of(data, stop) - offsets[0])
+        base = offsets[0]
+        bounds = [o - base for o in offsets] + [len(chunk)]
+        return [
+            (start + i + 1, chunk[bounds[i]:bounds[i + 1]].decode("utf-8", errors="replace").rstrip("\n"))
+            for i in range(len(offsets))
+        ]
+
+    def _end_of(self, data, number: int) -> int:
+        """Offset of the end of entry with given number"""
+        if number < self._count():
+            with open(self.index_path, "rb") as index:
+                return self._read_offsets(index, number, number + 1)[0]
+        return os.fstat(data.fileno()).st_size
+
+    def get(self, number: int) -> str | None:
+        """
+        :param number: number of entry(1-based)
+        :return: entry or None if there is no such entry or it is deleted
+        """
+        self.flush()
+        if number in self.tombstones():
+            return None
+        with self._locked(exclusive=False) as data:
+            if not 0 < number <= self._count():
+                return None
+            return self._entries(data, number - 1, number)[0][1]
+
+    def reverse(self, batch: int = 64) -> Iterator[tuple[int, str]]:
+        """
+        Iterates over not deleted entries from the newest one, reading them in batches from the end of file
+        :param batch: entries read at once
+        :return: iterator of (number, entry)
+        """
+        self.flush()
+        deleted = self.tombstones()
+        with self._locked(exclusive=False):
+            stop = self._count()
+        while stop > 0:
+            start = max(stop - batch, 0)
+            with self._locked(exclusive=False) as data:
+                entries = self._entries(data, start, stop)
+            for number, line in reversed(entries):
+                if number not in deleted:
+                    yield number, line
+            stop = start
+            batch *= 2
+
+    def tail(self, n: int) -> list[tuple[int, str]]:
+        """
+        :param n: number of entries
+        :return: last n not deleted entries in chronological order
+        """
+        entries: list[tuple[int, str]] = []
+        for entry in self.reverse(batch=max(n, 1)):
+            if len(entries) >= n:
+                break
+            entries.append(entry)
+        return entries[::-1]
+
+    def search(self, pattern: str) -> Iterator[tuple[int, str]]:
+        """
+        Finds entries containing pattern. Data file is scanned with mmap, entry of every match is found by bisect in index
+        :param pattern: substring to search
+        :return: iterator of (number, entry) in chronological order
+        """
+        self.flush()
+        needle = pattern.encode("utf-8")
+        deleted = self.tombstones()
+        with self._locked(exclusive=False) as data:
+            size = os.fstat(data.fileno()).st_size
+            if not size or not needle:
+                return
+            with open(self.index_path, "rb") as index:
+                offsets = self._read_offsets(index, 0, self._count())
+            with mmap.mmap(data.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                pos = mm.find(needle)
+                while pos != -1:
+                    i = bisect.bisect_right(offsets, pos) - 1
+                    end = offsets[i + 1] if i + 1 < len(offsets) else size
+                    if i + 1 not in deleted:
+                        yield i + 1, mm[offsets[i]:end].decode("utf-8", errors="replace").rstrip("\n")
+                    pos = mm.find(needle, end)
+
+
+_stores: dict[Path, HistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_history(path: Path | None = None) -> HistoryStore:
+    """
+    Gets history store shared by sessions of the process. Buffered entries are committed on exit
+    :param path: path to history file. If None, constants.HISTORY_PATH is used
+    """
+    path = Path(path or cst.HISTORY_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = HistoryStore(path)
+            atexit.register(store.flush)
+        return store
@@ -0,0 +1,113 @@
+"""
+Background jobs of command line session
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+import src.constants as cst
+from src.cmd_types.output import CommandOutput
+
+
+@dataclass
+class Job:
+    job_id: int
+    line: str
+    """Line that job is running"""
+
+    future: Future = field(repr=False)
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "Running"
+        errcode = self.output.errcode
+        return "Done" if errcode == 0 else f"Exit {errcode}"
+
+    @property
+    def output(self) -> CommandOutput:
+        """Captured output of finished job"""
+        exc = self.future.exception()
+        if exc is not None:
+            return CommandOutput(stderr = f"{exc}\n", errcode = 1)
+        return self.future.result()
+
+    def report(self) -> CommandOutput:
+        """
+        :return: status line with captured output of finished job
+        """
+        out = CommandOutput(stdout = f"[{self.job_id}]  {self.status}\t{self.line}\n")
+        out += self.output
+        return out
+
+
+class JobManager:
+    """
+    Runs lines on worker threads and keeps jobs until their results are reported
+
+    :param max_workers: max number of jobs running at the same time
+    :type max_workers: int
+    """
+    def __init__(self, max_workers: int = cst.JOBS_MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="job")
+        self.jobs: dict[int, Job] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def submit(self, line: str, func: Callable[[], CommandOutput]) -> Job:
+        """
+        Starts a job
+        :param line: line that job runs(for display)
+        :param func: function that runs line and returns its materialized output
+        :return: started job
+        """
+        with self._lock:
+            job = Job(self._next_id, line, self.executor.submit(func))
+            self.jobs[job.job_id] = job
+            self._next_id += 1
+        return job
+
+    def list_jobs(self) -> list[Job]:
+        """
+        Lists jobs that were not reported yet
+        :return: list of jobs sorted by id
+        """
+        with self._lock:
+            return list(self.jobs.values())
+
+    def get(self, job_id: int | None = None) -> Job | None:
+        """
+        Gets not reported job by id
+        :param job_id: id of the job. If None, the latest job is returned
+        :return: job or None if it was not found
+        """
+        with self._lock:
+            if job_id is None:
+                return next(reversed(self.jobs.values()), None)
+            return self.jobs.get(job_id)
+
+    def wait(self, jobs: list[Job] | None = None) -> list[Job]:
+        """
+        Waits for jobs to finish and forgets about them, so they must be reported by caller
+        :param jobs: jobs to wait for. If None, waits for all not reported jobs
+        :return: finished jobs
+        """
+        if jobs is None:
+            jobs = self.list_jobs()
+        wait([job.future for job in jobs])
+        with self._lock:
+            for job in jobs:
+                self.jobs.pop(job.job_id, None)
+        return jobs
+
+    def pop_finished(self) -> list[Job]:
+        """
+        Gets finished jobs and forgets about them, so they must be reported by caller
+        :return: list of finished jobs
+        """
+        with self._lock:
+            finished = [job for job in self.jobs.values() if job.future.done()]
+            for job in finished:
+                del self.jobs[job.job_id]
+        return finished
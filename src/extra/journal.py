@@ -0,0 +1,318 @@
+"""
+Journal of undoable commands. Commands record exact operations they performed(see Transaction),
+so undo and redo never parse history or guess paths.
+
+Journal is two stacks of transactions stored as JSON lines: JOURNAL_PATH/undo and JOURNAL_PATH/redo.
+Push is an append and pop reads the last line from the end of file and truncates it, so every step is O(1)
+"""
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import src.constants as cst
+from src.extra import trash
+
+
+class JournalError(Exception):
+    """
+    Raised when transaction can not be undone or redone
+
+    :param message: description of error
+    :param discard: transaction can never be applied(e.g. all its trash entries were purged), so it must be dropped from journal
+    """
+    def __init__(self, message: str, discard: bool = False):
+        super().__init__(message)
+        self.message = message
+        self.discard = discard
+
+
+def move(src: Path, dst: Path):
+    """
+    Moves path without overwriting. Rename is used when possible
+    :param src: path to move
+    :param dst: new path
+    :raise FileNotFoundError: if src does not exist
+    :raise FileExistsError: if dst exists
+    """
+    if not os.path.lexists(src):
+        raise FileNotFoundError(2, "No such file or directory", str(src))
+    if os.path.lexists(dst):
+        raise FileExistsError(17, "File exists", str(dst))
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(src, dst)
+    except OSError:
+        shutil.move(src, dst)
+
+
+@dataclass
+class Transaction:
+    """
+    Operations performed by one command. Every operation is a move of path 'src' to 'dst'
+    (path created by command is recorded as a move from trash slot, so its undo moves it to the slot)
+    """
+    line: str
+    """Line of command(for display)"""
+
+    ops: list[tuple[str, str]] = field(default_factory=list)
+    """Moves (src, dst) in order of execution"""
+
+    lost: list[str] = field(default_factory=list)
+    """Paths that were not restored by the last undo or redo: their trash entries were purged(not stored in journal)"""
+
+    def record(self, src: Path, dst: Path):
+        """
+        Records move that was performed
+        :param src: moved path
+        :param dst: new path
+        """
+        self.ops.append((os.path.abspath(src), os.path.abspath(dst)))
+
+    def move(self, src: Path, dst: Path):
+        """
+        Moves path(see journal.move) and records it
+        :param src: path to move
+        :param dst: new path
+        """
+        move(src, dst)
+        self.record(src, dst)
+
+    def _apply(self, ops: list[tuple[str, str]]):
+        """
+        Performs moves. If one of them fails, performed ones are rolled back, so transaction is applied entirely or not at all
+        :raise JournalError: if some move failed. If rollback failed too, error names paths that were left moved
+        """
+        done: list[tuple[str, str]] = []
+        try:
+            for src, dst in ops:
+                move(Path(src), Path(dst))
+                done.append((src, dst))
+        except OSError as e:
+            message = f"'{self.line}': {e.filename}: {(e.strerror or str(e)).lower()}"
+            left = []
+            for src, dst in reversed(done):
+                try:
+                    move(Path(dst), Path(src))
+                except OSError:
+                    left.append(dst)
+            if left:
+                raise JournalError(f"{message}; rollback failed, left in place: {', '.join(left)}") from e
+            raise JournalError(message, discard=isinstance(e, FileNotFoundError)) from e
+
+    def _prune(self, undo: bool):
+        """
+        Removes operations which paths were in trash entries that were purged(see trash.purged): they can never be applied,
+        but other operations still can. Paths that will not be restored are put to self.lost
+        :raise JournalError: if no operations are left
+        """
+        kept = []
+        self.lost = []
+        for src, dst in self.ops:
+            source, target = (dst, src) if undo else (src, dst)
+            if trash.purged(Path(source)):
+                self.lost.append(target)
+            else:
+                kept.append((src, dst))
+        if not kept:
+            raise JournalError(f"'{self.line}': {self.lost[0]}: removed from trash", discard=True)
+        self.ops = kept
+
+    def undo(self):
+        """
+        Reverts all operations in reverse order
+        :raise JournalError: if transaction can not be undone
+        """
+        self._prune(True)
+        self._apply([(dst, src) for src, dst in reversed(self.ops)])
+
+    def redo(self):
+        """
+        Performs all operations again
+        :raise JournalError: if transaction can not be redone
+        """
+        self._prune(False)
+        self._apply(list(self.ops))
+
+    def to_json(self) -> str:
+        return json.dumps({"line": self.line, "ops": self.ops})
+
+    @classmethod
+    def from_json(cls, data: str | bytes) -> "Transaction":
+        """
+        :raise JournalError: if data is corrupted(e.g. line was truncated by crash during append), it must be discarded
+        """
+        try:
+            raw = json.loads(data)
+            return cls(raw["line"], [(src, dst) for src, dst in raw["ops"]])
+        except (ValueError, KeyError, TypeError) as e:
+            raise JournalError(f"corrupted journal entry: {data[:80]!r}", discard=True) from e
+
+
+class Stack:
+    """
+    Stack of transactions in file of JSON lines
+
+    :param path: path to file
+    """
+    def __init__(self, path: Path):
+        self.path = path
+
+    @contextmanager
+    def locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _last_line_start(f) -> int:
+        """
+        Finds start of the last line reading file from the end
+        :param f: file opened for reading
+        :return: offset of last line, -1 if file is empty
+        """
+        end = f.seek(0, os.SEEK_END)
+        if not end:
+            return -1
+        pos = end - 1
+        block = 4096
+        while pos > 0:
+            start = max(pos - block, 0)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            found = chunk.rfind(b"\n")
+            if found != -1:
+                return start + found + 1
+            pos = start
+            block *= 2
+        return 0
+
+    def push(self, tx: Transaction, f=None):
+        """
+        Pushes transaction
+        :param tx: transaction
+        :param f: file of stack if it is already locked
+        """
+        if f is None:
+            with self.locked() as f:
+                self.push(tx, f)
+            return
+        f.seek(0, os.SEEK_END)
+        f.write(tx.to_json().encode("utf-8") + b"\n")
+        f.flush()
+
+    def peek(self, f) -> Transaction | None:
+        """
+        :param f: locked file of stack
+        :raise JournalError: if the last transaction is corrupted
+        :return: the last transaction or None if stack is empty
+        """
+        start = self._last_line_start(f)
+        if start == -1:
+            return None
+        f.seek(start)
+        return Transaction.from_json(f.read())
+
+    def drop(self, f):
+        """
+        Removes the last transaction
+        :param f: locked file of stack
+        """
+        start = self._last_line_start(f)
+        if start != -1:
+            f.truncate(start)
+
+    def clear(self, f=None):
+        if f is None:
+            with self.locked() as f:
+                self.clear(f)
+            return
+        f.truncate(0)
+
+
+class Journal:
+    """
+    Undo and redo stacks of transactions
+
+    :param path: directory of journal. If None, constants.JOURNAL_PATH is used
+    :type path: Path | None
+    """
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or cst.JOURNAL_PATH)
+        self.undo_stack = Stack(self.path / "undo")
+        self.redo_stack = Stack(self.path / "redo")
+        self._lock = threading.Lock()
+
+    def commit(self, tx: Transaction):
+        """
+        Records transaction of executed command. Redo stack is cleared, like in editors
+        :param tx: transaction
+        """
+        if not tx.ops:
+            return
+        with self._lock, self.undo_stack.locked() as undo, self.redo_stack.locked() as redo:
+            self.undo_stack.push(tx, undo)
+            self.redo_stack.clear(redo)
+
+    def _step(self, undo: bool) -> Transaction | None:
+        # stacks are always locked in the same order, so concurrent sessions can not deadlock
+        with self._lock, self.undo_stack.locked() as undo_f, self.redo_stack.locked() as redo_f:
+            source, src, target, dst = (self.undo_stack, undo_f, self.redo_stack, redo_f) if undo \
+                else (self.redo_stack, redo_f, self.undo_stack, undo_f)
+            try:
+                tx = source.peek(src)
+                if tx is None:
+                    return None
+                tx.undo() if undo else tx.redo()
+            except JournalError as e:
+                if e.discard:
+                    source.drop(src)
+                raise
+            source.drop(src)
+            target.push(tx, dst)
+            return tx
+
+    def undo(self) -> Transaction | None:
+        """
+        Undoes the last transaction and moves it to redo stack
+        :raise JournalError: if transaction can not be undone. It is kept in journal, unless it can never be undone
+        :return: undone transaction or None if there is nothing to undo
+        """
+        return self._step(True)
+
+    def redo(self) -> Transaction | None:
+        """
+        Redoes the last undone transaction and moves it to undo stack
+        :raise JournalError: if transaction can not be redone
+        :return: redone transaction or None if there is nothing to redo
+        """
+        return self._step(False)
+
+    def clear(self):
+        with self._lock:
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+
+
+_journals: dict[Path, Journal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path: Path | None = None) -> Journal:
+    """
+    Gets journal shared by sessions of the process
+    :param path: directory of journal. If None, constants.JOURNAL_PATH is used
+    """
+    path = Path(path or cst.JOURNAL_PATH)
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = Journal(path)
+        return _journals[path]
@@ -7,16 +7,41 @@ import inspect
 import logging
 import pkgutil
 import sys
-from sys import stdout
-from typing import Any
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from sys import stderr
+from typing import Any, Callable
 
 import src.constants as cst
 from src.cmd_types.commands import ExecutableCommand, UndoableCommand
-from src.cmd_types.meta import CommandMetadata
-from src.cmd_types.plugins import PluginMetadata
+from src.cmd_types.meta import CommandMetadata, LazyCommandMetadata
+from src.cmd_types.plugins import ModuleManifest, PluginMetadata
+from src.cmd_types.registry import CommandRegistry
+from src.extra.plugins_manifest import ManifestCache
+from src.extra.profiling import StartupProfile
 
 RESTRICTED = (ExecutableCommand, UndoableCommand)
 
+
+def _get_logger() -> logging.Logger:
+    """
+    Gets logger of loader. Handlers are attached only once, so loaders can be created many times
+    """
+    logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        handlers: list[logging.Handler] = [
+            logging.FileHandler(cst.LOG_FILE, mode="a", encoding="utf-8"),
+            logging.StreamHandler(stderr),
+        ]
+        formatter = logging.Formatter(cst.FORMAT_LOADER)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        logger.setLevel(cst.LOGGING_LEVEL)
+        logger.propagate = False
+    return logger
+
 class PluginLoader:
     """
     Class to load plugins
@@ -30,76 +55,245 @@ class PluginLoader:
     :param strict: Whether raise an error on import or not
     :type strict: bool
 
+    :param profile: if given, time of logger setup and of modules imports is recorded to it
+    :type profile: StartupProfile | None
+
     :raise ImportError: if plugin cannot be loaded. Rather the command was already loaded or plugins has some errors on import
 
     """
-    def __init__(self, pkg_dir: str = cst.PLUGINS_DIR, prefix: str = cst.PLUGINS_PREFIX, strict: bool = cst.STRICT_PLUGIN_LOADING):
+    def __init__(self, pkg_dir: str = cst.PLUGINS_DIR, prefix: str = cst.PLUGINS_PREFIX, strict: bool = cst.STRICT_PLUGIN_LOADING,
+                 profile: StartupProfile | None = None):
         self.pkg_dir = pkg_dir
         self.prefix = prefix
-        self.logger = logging.Logger(__name__)
+        self.profile = profile
+        with self._phase("loader logger"):
+            self.logger = _get_logger()
+
+        self.commands = CommandRegistry()
+        """Registry of loaded commands"""
 
-        self.commands: dict[str, CommandMetadata] = {}
-        """dict of loaded commands"""
+        self._staged: dict[str, CommandMetadata] = {}
+        """Commands being registered by current (re)load"""
 
         self.strict = strict
-        self.__init_logger()
         self.non_default: dict[str, PluginMetadata] = {}
         """dict of non-default plugins(will be loaded only after default ones)"""
 
-    def __init_logger(self):
-        handlers = [
-            logging.FileHandler(cst.LOG_FILE, mode="a", encoding="utf-8"),
-            logging.StreamHandler(stdout),
-        ]
-        formatter = logging.Formatter(cst.FORMAT_LOADER)
-        for handler in handlers:
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-        self.logger.setLevel(cst.LOGGING_LEVEL)
+        self.loaded: dict[str, str | None] = {}
+        """Full names of loaded modules mapped to hashes of their sources(None if source is unknown)"""
+
+        self.cache: ManifestCache | None = None
+
+        self._lock = threading.RLock()
+        """Serializes loads and reloads(e.g. of plugins watcher and of 'plugins reload')"""
 
     def load_plugins(self):
         """
-        Loads all plugins
+        Loads all plugins. Commands are found in plugins manifest(see extra.plugins_manifest), their modules are imported
+        on the first call of the command. Modules are imported immediately if loading is strict, if they were already
+        imported(to reload them) or if their commands can not be found without import
         :return:
         """
+        with self._lock:
+            self.commands = CommandRegistry()
+            self.loaded = {}
+            with self._phase("read plugins manifest"):
+                self.cache = ManifestCache()
+            with self._phase("register plugins"):
+                self.reload_plugins()
+
+    def import_lazy(self):
+        """
+        Imports modules of commands that were registered from manifest and were not imported yet
+        """
+        modules: dict[str, list[LazyCommandMetadata]] = {}
+        for meta in self.commands.values():
+            if isinstance(meta, LazyCommandMetadata) and not meta.loaded:
+                modules.setdefault(meta.module, []).append(meta)
+        for module, metas in modules.items():
+            try:
+                with self._module_import(module):
+                    for meta in metas:
+                        _ = meta.cmd
+            except ImportError as e:
+                self.warn_or_error(warn_msg=f"Failed to load module {module}: {e}", exc=e)
+
+    def reload_plugins(self, strict: bool | None = None) -> list[str]:
+        """
+        Reloads only plugins which were added, removed or changed since the last load. Module is considered changed
+        if its mtime differs and content hash differs too. Commands of other modules are kept as is.
+        self.commands is replaced by a patched registry, so the registry that was given out before is never changed
+        Reloads are serialized, so concurrent ones never see half-patched state
+        :param strict: whether to raise an error on import for this reload. If None, self.strict is used
+        :return: full names of reloaded modules
+        """
+        with self._lock:
+            return self._reload(self.strict if strict is None else strict)
+
+    def _reload(self, strict: bool) -> list[str]:
+        """Reloads plugins(see reload_plugins), lock must be held"""
+        if self.cache is None:
+            self.cache = ManifestCache()
         plugins_pkg = importlib.import_module(self.pkg_dir)
-        for importer, module_name, is_pkg in pkgutil.iter_modules(plugins_pkg.__path__):
-            if module_name.startswith(self.prefix) and not is_pkg:
-                self._load_module(module_name)
-        for k in self.non_default.keys():
-            self._load_module(k, False)
+        old_loaded = dict(self.loaded)
+        self._staged = dict(self.commands)
+        self.non_default = {}
+        lazy_non_default: list[ModuleManifest] = []
+        found = set()
+        changed = []
+        try:
+            for importer, module_name, is_pkg in pkgutil.iter_modules(plugins_pkg.__path__):
+                if not module_name.startswith(self.prefix) or is_pkg:
+                    continue
+                full_module_name = f"{self.pkg_dir}.{module_name}"
+                path = Path(getattr(importer, "path", "")) / f"{module_name}.py"
+                found.add(full_module_name)
+                manifest = None
+                if path.is_file():
+                    try:
+                        manifest = self.cache.get(full_module_name, path)
+                    except (OSError, SyntaxError, ValueError) as e:
+                        self.warn_or_error(warn_msg=f"Failed to load module {full_module_name}: {e}", exc=e, strict=strict)
+                        continue
+                digest = manifest.sha256 if manifest else None
+                if digest and self.loaded.get(full_module_name) == digest:
+                    continue
+                changed.append(full_module_name)
+                self._unregister(module_name)
+                self.loaded[full_module_name] = digest
+                if manifest is None or manifest.dynamic or strict or full_module_name in sys.modules:
+                    self._load_module(module_name, strict=strict)
+                elif manifest.author != "default":
+                    lazy_non_default.append(manifest)
+                else:
+                    self._load_lazy(manifest, strict)
+            for k in self.non_default.keys():
+                self._load_module(k, False, strict)
+            for manifest in lazy_non_default:
+                self._load_lazy(manifest, strict)
+            for full_module_name in set(self.loaded) - found:
+                self.logger.debug(f"Module {full_module_name} was removed")
+                self._unregister(full_module_name.rsplit(".", 1)[-1])
+                del self.loaded[full_module_name]
+                sys.modules.pop(full_module_name, None)
+                changed.append(full_module_name)
+        except BaseException:
+            self.loaded = old_loaded
+            raise
+        if changed:
+            self.commands = self.commands.patched(self._staged)
+        self.cache.prune(found)
+        self.cache.save()
+        return changed
+
+    def _phase(self, name: str):
+        """Measures phase if loader is profiled"""
+        return self.profile.phase(name) if self.profile else nullcontext()
 
-    def warn_or_error(self, *, warn_msg: str = "", exc: Any = ImportError):
+    def _module_import(self, module: str):
+        """Measures import of module if loader is profiled"""
+        return self.profile.module_import(module) if self.profile else nullcontext()
+
+    def _unregister(self, module_name: str):
+        """
+        Removes commands of module
+        :param module_name: name of module
+        """
+        for cmd_name in [k for k, v in self._staged.items() if v.plugin_name == module_name]:
+            del self._staged[cmd_name]
+
+    def _load_lazy(self, manifest: ModuleManifest, strict: bool | None = None):
+        """
+        Registers commands of module from its manifest without importing it
+        :param manifest: manifest of module
+        :param strict: whether to raise an error instead of warning. If None, self.strict is used
+        """
+        module_name = manifest.module.rsplit(".", 1)[-1]
+        self.logger.debug(f"Loading commands of module {manifest.module} from manifest...")
+        for cmd_name, cls_name in manifest.commands.items():
+            meta = LazyCommandMetadata(
+                name = cmd_name,
+                plugin_name = module_name,
+                plugin_author = manifest.author,
+                plugin_version = manifest.version,
+                module = manifest.module,
+                cls_name = cls_name,
+                flags = manifest.flags.get(cmd_name),
+                read_only = cmd_name in manifest.read_only
+            )
+            self._register(meta, module_name, manifest.module, strict)
+
+    def _register(self, meta: CommandMetadata, module_name: str, full_module_name: str, strict: bool | None = None):
+        """
+        Registers command if its name is valid and unique
+        :param meta: metadata of command
+        :param module_name: name of module that defines command
+        :param full_module_name: full name of module that defines command
+        :param strict: whether to raise an error instead of warning. If None, self.strict is used
+        """
+        cmd_name = meta.name
+        if not cmd_name:
+            warn_msg = f"Command in module {full_module_name} has no name"
+            exc = ImportError(warn_msg, name = module_name, path = full_module_name)
+            warn_msg += ", skipping"
+
+            self.warn_or_error(warn_msg=warn_msg, exc=exc, strict=strict)
+
+        elif self._staged.get(cmd_name):
+
+            warn_msg = f"Command {cmd_name} in module {full_module_name} already exists, skipping"
+
+            exc = ImportError(f"{cmd_name} imported twice", name = module_name, path = full_module_name)
+
+            self.warn_or_error(warn_msg=warn_msg, exc=exc, strict=strict)
+
+        elif " " in cmd_name:
+            warn_msg = f"Command {cmd_name} in module {full_module_name} has spaces in it"
+            exc = ImportError(warn_msg, name = module_name, path = full_module_name)
+            warn_msg+=", skipping"
+
+            self.warn_or_error(warn_msg=warn_msg, exc=exc, strict=strict)
+
+        else:
+            self.logger.debug(f"Loading command {cmd_name}...")
+            self._staged[cmd_name] = meta
+            self.logger.debug(f"Command {cmd_name} in module {full_module_name} loaded")
+
+    def warn_or_error(self, *, warn_msg: str = "", exc: Any = ImportError, strict: bool | None = None):
         """
         Will warn if strict set to False else will raise given exception
         :param warn_msg: message for warning
         :param exc: exception to raise
+        :param strict: overrides self.strict(e.g. for one reload)
         """
-        if not self.strict:
+        if not (self.strict if strict is None else strict):
             self.logger.warning(warn_msg)
 
         else:
             raise exc
 
 
-    def _load_module(self, module_name: str, defaults: bool = True):
+    def _load_module(self, module_name: str, defaults: bool = True, strict: bool | None = None):
         """
         Imports one module.
-        :param module_name: name of the module to import
+        :param module_name: name of the module to import(full name if defaults is False)
         :param defaults: if set to True, will only load if it is non-default. Otherwise, will load commands from self.non_default
+        :param strict: whether to raise an error instead of warning. If None, self.strict is used
         :return:
         """
         full_module_name = defaults * f'{self.pkg_dir}.' + f"{module_name}"
+        module_name = full_module_name.rsplit(".", 1)[-1]
         if defaults:
             try:
-                if full_module_name in sys.modules:
-                    module = sys.modules[full_module_name]
-                    importlib.reload(module)
-                    self.logger.debug(f"Module {module.__name__} already imported: reloading")
-                else:
-                    module = importlib.import_module(full_module_name)
+                with self._module_import(full_module_name):
+                    if full_module_name in sys.modules:
+                        module = sys.modules[full_module_name]
+                        importlib.reload(module)
+                        self.logger.debug(f"Module {module.__name__} already imported: reloading")
+                    else:
+                        module = importlib.import_module(full_module_name)
             except Exception as e:
-                self.warn_or_error(warn_msg=f"Failed to load module {full_module_name}: {e}", exc=e)
+                self.warn_or_error(warn_msg=f"Failed to load module {full_module_name}: {e}", exc=e, strict=strict)
                 return
             author = getattr(module, "__author__", None)
             version = getattr(module, "__version__", None)
@@ -115,31 +309,45 @@ class PluginLoader:
         for name, obj in inspect.getmembers(module):
             if inspect.isclass(obj):
                 if issubclass(obj, ExecutableCommand) and obj not in RESTRICTED and getattr(obj, "name", None):
-                    cmd_name = obj.name
-                    if self.commands.get(cmd_name):
+                    meta = CommandMetadata(
+                        name = obj.name,
+                        plugin_name = module_name,
+                        plugin_author=author,
+                        plugin_version=version,
+                        cmd = obj
+                        )
+                    self._register(meta, module_name, full_module_name, strict)
 
-                        warn_msg = f"Command {cmd_name} in module {full_module_name} already exists, skipping"
+        self.logger.debug(f"Loaded module {full_module_name}")
 
-                        exc = ImportError(f"{cmd_name} imported twice", name = module_name, path = full_module_name)
 
-                        self.warn_or_error(warn_msg=warn_msg, exc=exc)
+class PluginsWatcher(threading.Thread):
+    """
+    Background thread that polls plugins for changes and reloads them
 
-                    elif " " in cmd_name:
-                        warn_msg = f"Command {cmd_name} in module {full_module_name} has spaces in it"
-                        exc = ImportError(warn_msg, name = module_name, path = full_module_name)
-                        warn_msg+=", skipping"
+    :param reload: function that reloads changed plugins and returns names of reloaded modules
+    :type reload: Callable[[], list[str]]
 
-                        self.warn_or_error(warn_msg=warn_msg, exc=exc)
+    :param interval: seconds between polls
+    :type interval: float
+    """
+    def __init__(self, reload: Callable[[], list[str]], interval: float = cst.PLUGINS_WATCH_INTERVAL):
+        super().__init__(name="plugins-watcher", daemon=True)
+        self.reload = reload
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.logger = _get_logger()
 
-                    else:
-                        self.logger.debug(f"Loading command {cmd_name}...")
-                        self.commands[cmd_name] = CommandMetadata(
-                            name = cmd_name,
-                            plugin_name = module_name,
-                            plugin_author=author,
-                            plugin_version=version,
-                            cmd = obj
-                            )
-                        self.logger.debug(f"Command {cmd_name} in module {full_module_name} loaded")
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                changed = self.reload()
+            except Exception as e:
+                self.logger.warning(f"Failed to reload plugins: {e}")
+                continue
+            if changed:
+                self.logger.info(f"Reloaded plugins: {', '.join(changed)}")
 
-        self.logger.debug(f"Loaded module {full_module_name}")
+    def stop(self):
+        """Stops polling. Reload that is running is finished"""
+        self.stopped.set()
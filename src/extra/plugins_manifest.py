@@ -0,0 +1,217 @@
+"""
+Finds commands of plugins by scanning their sources for '@command(...)' registrations without importing them.
+Results are cached in constants.PLUGINS_MANIFEST and rescanned only when source file changes
+"""
+import ast
+import hashlib
+import json
+import logging
+import os
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+import src.constants as cst
+from src.cmd_types.plugins import ModuleManifest
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 4
+"""Version of cache format. Cache of other version is rescanned"""
+
+
+def _is_command_decorator(node: ast.expr) -> bool:
+    """
+    Checks if decorator is a call of commands_register.command
+    :param node: decorator node
+    """
+    if not isinstance(node, ast.Call):
+        return False
+    func = node.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+    return name == "command"
+
+
+COMMAND_BASES = {"ExecutableCommand", "UndoableCommand"}
+"""Base classes of commands. They have no name, so loader never registers them"""
+
+SAFE_IMPORTS = ("src.cmd_types", "src.decorators", "src.extra", "src.constants")
+"""Packages that never export named commands, so names imported from them are not registered by loader"""
+
+
+def _base_name(node: ast.expr) -> str | None:
+    """Gets name of base class: 'Base' for 'Base' and 'module.Base'"""
+    return node.attr if isinstance(node, ast.Attribute) else getattr(node, "id", None)
+
+
+def _assigns_name(node: ast.ClassDef) -> bool:
+    """Checks if class body assigns attribute 'name'(loader registers any command class that has it)"""
+    for item in node.body:
+        targets = item.targets if isinstance(item, ast.Assign) else [item.target] if isinstance(item, ast.AnnAssign) else []
+        if any(isinstance(target, ast.Name) and target.id == "name" for target in targets):
+            return True
+    return False
+
+
+def _safe_import(node: ast.ImportFrom) -> bool:
+    """
+    Checks if names imported by 'from ... import ...' can not be command classes with name. Loader registers every
+    such class found in module, imported ones too
+    """
+    module = node.module
+    if node.level or not module:
+        return False
+    return module.split(".")[0] in sys.stdlib_module_names or \
+        any(module == package or module.startswith(f"{package}.") for package in SAFE_IMPORTS)
+
+
+def _options_names(node: ast.expr | None) -> list[str]:
+    """
+    Gets names of options declared as list of Option(...) calls. Options that are not literal are skipped
+    :param node: value of 'options' argument of decorator
+    """
+    if not isinstance(node, (ast.List, ast.Tuple)):
+        return []
+    names = []
+    for elt in node.elts:
+        if isinstance(elt, ast.Call):
+            values = list(elt.args[:2]) + [kw.value for kw in elt.keywords if kw.arg in ("short", "long")]
+            names += [v.value for v in values if isinstance(v, ast.Constant) and isinstance(v.value, str) and v.value.startswith("-")]
+    return names
+
+
+def scan_source(path: Path, module: str, source: bytes | None = None) -> ModuleManifest:
+    """
+    Scans source of plugin module. Module is marked dynamic if its commands can not be found without import:
+    command class has name without '@command("literal")'(assigned or inherited), or names are imported from other modules
+    :param path: path to source file
+    :param module: full name of module
+    :param source: content of source file, if it was already read
+    :raise SyntaxError: if source can not be parsed
+    :return: manifest of module
+    """
+    stat_info = path.stat()
+    if source is None:
+        source = path.read_bytes()
+    tree = ast.parse(source, filename=str(path))
+    manifest = ModuleManifest(
+        module=module,
+        path=str(path),
+        mtime_ns=stat_info.st_mtime_ns,
+        size=stat_info.st_size,
+        sha256=hashlib.sha256(source).hexdigest()
+    )
+    classes: set[str] = set()
+    # classes of module that have name(so their subclasses have it too)
+    named: set[str] = set()
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and not _safe_import(node):
+            manifest.dynamic = True
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            target = node.targets[0].id
+            if target in ("__author__", "__version__"):
+                if not isinstance(node.value, ast.Constant):
+                    manifest.dynamic = True
+                    continue
+                setattr(manifest, target.strip("_"), node.value.value)
+        elif isinstance(node, ast.ClassDef):
+            decorators = list(filter(_is_command_decorator, node.decorator_list))
+            bases = {_base_name(base) for base in node.bases}
+            if decorators or _assigns_name(node) or bases & named:
+                named.add(node.name)
+            # name of base that is not a class of module or a command base is unknown
+            if not decorators and node.name in named or bases - classes - COMMAND_BASES - {"object"}:
+                manifest.dynamic = True
+            classes.add(node.name)
+            for decorator in decorators:
+                args = decorator.args  # type: ignore[attr-defined]
+                if not (args and isinstance(args[0], ast.Constant) and isinstance(args[0].value, str)):
+                    manifest.dynamic = True
+                    continue
+                cmd_name = args[0].value
+                manifest.commands[cmd_name] = node.name
+                options = dict(zip(("flags", "read_only"), args[1:]))
+                options.update((kw.arg, kw.value) for kw in decorator.keywords if kw.arg)  # type: ignore[attr-defined]
+                try:
+                    flags = ast.literal_eval(options["flags"]) if "flags" in options else None
+                    read_only = ast.literal_eval(options["read_only"]) if "read_only" in options else False
+                except ValueError:
+                    manifest.dynamic = True
+                    continue
+                flags = list(flags or []) + _options_names(options.get("options"))
+                if flags:
+                    manifest.flags[cmd_name] = flags
+                if read_only:
+                    manifest.read_only.append(cmd_name)
+    return manifest
+
+
+class ManifestCache:
+    """
+    Cache of plugins manifests stored in JSON file
+
+    :param path: path to cache file. If None, constants.PLUGINS_MANIFEST is used
+    :type path: Path | None
+    """
+    def __init__(self, path: Path | None = None):
+        self.path = path or cst.PLUGINS_MANIFEST
+        self.manifests: dict[str, ModuleManifest] = {}
+        self.changed = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.manifests = {k: ModuleManifest(**v) for k, v in data["modules"].items()}
+            else:
+                self.changed = True
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            self.changed = True
+
+    def get(self, module: str, path: Path) -> ModuleManifest:
+        """
+        Gets manifest of module. Rescans source if it was modified since the last scan.
+        If only mtime of source was changed(content hash is the same), cached manifest is kept
+        :param module: full name of module
+        :param path: path to source file
+        :raise SyntaxError: if source can not be parsed
+        :return: manifest of module
+        """
+        cached = self.manifests.get(module)
+        if cached and cached.path == str(path) and cached.sha256:
+            stat_info = os.stat(path)
+            if (stat_info.st_mtime_ns, stat_info.st_size) == (cached.mtime_ns, cached.size):
+                return cached
+            source = path.read_bytes()
+            if cached.sha256 == hashlib.sha256(source).hexdigest():
+                cached.mtime_ns, cached.size = stat_info.st_mtime_ns, stat_info.st_size
+                self.changed = True
+                return cached
+        else:
+            source = None
+        logger.debug(f"Scanning {path}")
+        manifest = scan_source(path, module, source)
+        self.manifests[module] = manifest
+        self.changed = True
+        return manifest
+
+    def prune(self, modules: set[str]):
+        """
+        Forgets about modules that were removed
+        :param modules: full names of modules that exist
+        """
+        for module in set(self.manifests) - modules:
+            del self.manifests[module]
+            self.changed = True
+
+    def save(self):
+        """Writes cache file if it was changed. Errors are ignored, as cache is optional"""
+        if not self.changed:
+            return
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "modules": {k: asdict(v) for k, v in self.manifests.items()}}, f)
+            os.replace(tmp, self.path)
+            self.changed = False
+        except OSError as e:
+            logger.debug(f"Unable to save plugins manifest: {e}")
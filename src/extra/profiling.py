@@ -0,0 +1,91 @@
+"""
+Profiling of application startup: wall time of startup phases and import time of plugins modules
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    """Full name of imported module"""
+
+    seconds: float
+    """Wall time of import, including transitive imports that were not imported before"""
+
+    new_modules: int
+    """Number of modules that were imported by the import(module itself included)"""
+
+
+@dataclass
+class StartupProfile:
+    phases: dict[str, float] = field(default_factory=dict)
+    """Wall time of startup phases in seconds, in order of execution"""
+
+    imports: list[ImportRecord] = field(default_factory=list)
+    """Imports of plugins modules in order of execution"""
+
+    commands: int = 0
+    """Number of registered commands"""
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Measures wall time of a phase. Time of phases with the same name is summed
+        :param name: name of phase
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    @contextmanager
+    def module_import(self, module: str):
+        """
+        Measures import of plugin module
+        :param module: full name of module
+        """
+        modules_before = len(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.imports.append(ImportRecord(module, elapsed, max(len(sys.modules) - modules_before, 0)))
+
+    @property
+    def total(self) -> float:
+        """Wall time of all phases"""
+        return sum(self.phases.values())
+
+    def to_json(self) -> str:
+        return json.dumps({**asdict(self), "total": self.total}, indent=2)
+
+    @classmethod
+    def from_json(cls, data: str) -> "StartupProfile":
+        raw = json.loads(data)
+        return cls(
+            phases=raw["phases"],
+            imports=[ImportRecord(**record) for record in raw["imports"]],
+            commands=raw["commands"]
+        )
+
+    def to_table(self) -> str:
+        """
+        :return: report as text table. Imports are sorted from slowest
+        """
+        rows: list[tuple[str, ...]] = [("phase", "ms")]
+        rows += [(name, f"{seconds * 1000:.2f}") for name, seconds in self.phases.items()]
+        rows += [("total", f"{self.total * 1000:.2f}"), ("", "")]
+        rows += [("module import", "ms", "modules")]
+        rows += [
+            (record.module, f"{record.seconds * 1000:.2f}", str(record.new_modules))
+            for record in sorted(self.imports, key=lambda r: r.seconds, reverse=True)
+        ]
+        rows += [("", ""), ("commands registered", str(self.commands))]
+        width = max(len(row[0]) for row in rows)
+        return "".join("\t".join((row[0].ljust(width), *row[1:])).rstrip() + "\n" for row in rows)
@@ -0,0 +1,385 @@
+"""
+Trash of removed files. Every removed path gets its own slot: <trash root>/<unique id>/<name>,
+so paths with the same name never overwrite each other and undo knows exactly where the path is.
+
+Trash root is chosen by device of removed path, so removal and undo are always one rename:
+TRASH_PATH for device of playground and <mount point>/.Trash-<uid> for other devices(like freedesktop trash).
+Roots of other devices are listed in TRASH_PATH/.roots, so every session knows them.
+
+Every root is limited by total size and age of entries(TRASH_MAX_BYTES, TRASH_MAX_AGE). The oldest entries are evicted first,
+recent ones are kept for undo(TRASH_EVICT_GRACE). Operations of evicted entries are pruned from journal when it is applied.
+Entries are purged by renaming their slots to <trash root>/.purge, which is instant, and deleted by TrashCollector in background
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import src.constants as cst
+
+PURGE_DIR = ".purge"
+ROOTS_FILE = ".roots"
+EMPTY_SLOT_TTL = 60.0
+"""Seconds an empty slot is kept: it may have been created for a move that is in progress"""
+
+
+@dataclass
+class TrashEntry:
+    """
+    Removed path in trash
+    """
+    id: str
+    """Id of slot"""
+
+    path: Path
+    """Path in trash"""
+
+    size: int
+    """Total size of files in bytes"""
+
+    time: float
+    """Time of removal"""
+
+
+def tree_size(path: Path) -> int:
+    """
+    Counts total size of files without following symlinks
+    :param path: file or directory
+    """
+    st = os.lstat(path)
+    if not os.path.isdir(path) or os.path.islink(path):
+        return st.st_size
+    total = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for item in it:
+                if item.is_dir(follow_symlinks=False):
+                    stack.append(Path(item.path))
+                else:
+                    total += item.stat(follow_symlinks=False).st_size
+    return total
+
+
+class Trash:
+    """
+    Trash directory with quota
+
+    :param root: directory of trash. If None, constants.TRASH_PATH is used
+    :type root: Path | None
+
+    :param max_bytes: max total size of entries. 0 for no limit
+    :type max_bytes: int
+
+    :param max_age: max age of entry in seconds. 0 for no limit
+    :type max_age: float
+    """
+    def __init__(self, root: Path | None = None, max_bytes: int = cst.TRASH_MAX_BYTES, max_age: float = cst.TRASH_MAX_AGE):
+        self.root = Path(root or cst.TRASH_PATH)
+        self.purge_dir = self.root / PURGE_DIR
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._sizes: dict[str, int] = {}
+        """Sizes of entries by id. Entry is never changed while it is in trash"""
+        self._lock = threading.Lock()
+
+    def slot(self, name: str) -> Path:
+        """
+        Creates path in trash for removed file. Slot itself is not created
+        :param name: name of removed file
+        :return: path to move removed file to
+        """
+        return self.root / uuid.uuid4().hex / name
+
+    def entries(self) -> list[TrashEntry]:
+        """
+        :return: entries from the oldest to the newest. Sizes of new entries are counted
+        """
+        entries = []
+        try:
+            it = os.scandir(self.root)
+        except FileNotFoundError:
+            return []
+        with it:
+            for slot in it:
+                if slot.name.startswith(".") or not slot.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(slot.path) as items:
+                    item = next(items, None)
+                if item is None:
+                    continue
+                path = Path(item.path)
+                size = self._sizes.get(slot.name)
+                if size is None:
+                    try:
+                        size = self._sizes[slot.name] = tree_size(path)
+                    except OSError:
+                        continue
+                entries.append(TrashEntry(slot.name, path, size, slot.stat(follow_symlinks=False).st_mtime))
+        entries.sort(key=lambda e: e.time)
+        return entries
+
+    def purge(self, ids: list[str] | None = None) -> list[str]:
+        """
+        Moves entries to purge directory. They are deleted by collector(or by the next collect)
+        :param ids: ids of slots. If None, all entries are purged
+        :return: ids of purged entries
+        """
+        if ids is None:
+            try:
+                ids = [name for name in os.listdir(self.root) if not name.startswith(".")]
+            except FileNotFoundError:
+                return []
+        purged = []
+        self.purge_dir.mkdir(parents=True, exist_ok=True)
+        for slot_id in ids:
+            try:
+                os.rename(self.root / slot_id, self.purge_dir / slot_id)
+            except FileNotFoundError:
+                continue
+            self._sizes.pop(slot_id, None)
+            purged.append(slot_id)
+        if purged:
+            notify_collector()
+        return purged
+
+    def _expired(self, entries: list[TrashEntry], now: float) -> list[str]:
+        """
+        Chooses entries to evict: too old ones and the oldest ones while total size exceeds quota.
+        The newest entry and entries removed less than TRASH_EVICT_GRACE seconds ago are never evicted by size,
+        so the last removal can be undone even if it alone exceeds quota
+        """
+        evicted = []
+        total = sum(entry.size for entry in entries)
+        for i, entry in enumerate(entries):
+            too_old = self.max_age and now - entry.time > self.max_age
+            protected = i == len(entries) - 1 or now - entry.time < cst.TRASH_EVICT_GRACE
+            too_big = self.max_bytes and total > self.max_bytes and not protected
+            if not (too_old or too_big):
+                break
+            evicted.append(entry.id)
+            total -= entry.size
+        return evicted
+
+    def _remove_empty_slots(self, now: float):
+        """Removes slots left by undo"""
+        try:
+            it = os.scandir(self.root)
+        except FileNotFoundError:
+            return
+        with it:
+            for slot in it:
+                if slot.name.startswith(".") or not slot.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    if now - slot.stat(follow_symlinks=False).st_mtime > EMPTY_SLOT_TTL:
+                        os.rmdir(slot.path)
+                        self._sizes.pop(slot.name, None)
+                except OSError:
+                    continue
+
+    def collect(self) -> list[str]:
+        """
+        Evicts entries that exceed quota and deletes purged ones
+        :return: ids of evicted entries
+        """
+        with self._lock:
+            now = time.time()
+            self._remove_empty_slots(now)
+            evicted = self.purge(self._expired(self.entries(), now))
+            try:
+                purged = os.listdir(self.purge_dir)
+            except FileNotFoundError:
+                purged = []
+            for slot_id in purged:
+                shutil.rmtree(self.purge_dir / slot_id, ignore_errors=True)
+            return evicted
+
+
+class TrashCollector(threading.Thread):
+    """
+    Background thread that enforces quota of trash roots and deletes purged entries
+
+    :param trashes: function that returns trashes to collect
+    :type trashes: Callable[[], list[Trash]]
+
+    :param interval: seconds between collections if collector is not woken up
+    :type interval: float
+    """
+    def __init__(self, trashes: Callable[[], list["Trash"]], interval: float = cst.TRASH_GC_INTERVAL):
+        super().__init__(name="trash-collector", daemon=True)
+        self.trashes = trashes
+        self.interval = interval
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.wake.clear()
+            for trash in self.trashes():
+                try:
+                    evicted = trash.collect()
+                except Exception as e:
+                    self.logger.warning(f"Failed to collect trash {trash.root}: {e}")
+                    continue
+                if evicted:
+                    self.logger.info(f"Evicted from trash {trash.root}: {', '.join(evicted)}")
+            self.wake.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+
+_trashes: dict[Path, Trash] = {}
+_trashes_lock = threading.Lock()
+_roots_by_dev: dict[int, Path] = {}
+_collector: TrashCollector | None = None
+_collector_lock = threading.Lock()
+
+
+def get_trash(root: Path | None = None) -> Trash:
+    """
+    Gets trash shared by sessions of the process
+    :param root: directory of trash. If None, constants.TRASH_PATH is used
+    """
+    root = Path(root or cst.TRASH_PATH)
+    with _trashes_lock:
+        if root not in _trashes:
+            _trashes[root] = Trash(root)
+        return _trashes[root]
+
+
+def _mount_point(path: Path, dev: int) -> Path:
+    """Finds the topmost directory of path on the same device"""
+    path = Path(os.path.abspath(path))
+    while path.parent != path:
+        try:
+            if os.lstat(path.parent).st_dev != dev:
+                break
+        except OSError:
+            break
+        path = path.parent
+    return path
+
+
+def _register_root(root: Path):
+    """Adds root of other device to TRASH_PATH/.roots"""
+    roots_file = Path(cst.TRASH_PATH) / ROOTS_FILE
+    if root in known_roots():
+        return
+    roots_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(roots_file, "a", encoding="utf-8") as f:
+        f.write(f"{root}\n")
+
+
+def known_roots() -> list[Path]:
+    """
+    :return: TRASH_PATH and existing roots of other devices
+    """
+    roots = [Path(cst.TRASH_PATH)]
+    try:
+        with open(Path(cst.TRASH_PATH) / ROOTS_FILE, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return roots
+    for line in lines:
+        root = Path(line)
+        if line and root not in roots and root.is_dir():
+            roots.append(root)
+    return roots
+
+
+def root_for(path: Path) -> Path:
+    """
+    Chooses trash root on the same device as path. TRASH_PATH is used if root can not be created on that device
+    :param path: path that is going to be moved to trash(or its future location)
+    :return: trash root
+    """
+    home = Path(cst.TRASH_PATH)
+    target = path if os.path.lexists(path) else path.parent
+    try:
+        dev = os.lstat(target).st_dev
+        home.mkdir(parents=True, exist_ok=True)
+        if dev == os.stat(home).st_dev:
+            return home
+    except OSError:
+        return home
+    with _trashes_lock:
+        root = _roots_by_dev.get(dev)
+    if root is not None and root.is_dir():
+        return root
+    root = _mount_point(target, dev) / f".Trash-{os.getuid()}"
+    try:
+        root.mkdir(mode=0o700, exist_ok=True)
+        if os.stat(root).st_dev != dev or not os.access(root, os.W_OK):
+            return home
+        _register_root(root)
+    except OSError:
+        return home
+    with _trashes_lock:
+        _roots_by_dev[dev] = root
+    return root
+
+
+def is_root(path: Path) -> bool:
+    """
+    Checks if path is a trash root
+    """
+    return path == Path(cst.TRASH_PATH) or path.name == f".Trash-{os.getuid()}" or path in known_roots()
+
+
+def all_trashes() -> list[Trash]:
+    """
+    :return: trashes of all known roots
+    """
+    return [get_trash(root) for root in known_roots()]
+
+
+def purged(path: Path) -> bool:
+    """
+    Checks if path was in trash slot that is gone(entry was purged or evicted). Slots are never reused,
+    so such path can never appear again
+    :param path: path in trash slot(see Trash.slot)
+    """
+    return is_root(path.parent.parent) and not os.path.lexists(path.parent)
+
+
+def trash_slot(path: Path) -> Path:
+    """
+    Creates path in trash for removed file on the same device(see Trash.slot, root_for)
+    :param path: path that is going to be moved to trash(or its future location)
+    :return: path to move removed file to
+    """
+    return get_trash(root_for(path)).slot(path.name)
+
+
+def start_collector():
+    """Starts collector of all trash roots if it is not running"""
+    global _collector
+    with _collector_lock:
+        if _collector is None or not _collector.is_alive():
+            _collector = TrashCollector(all_trashes)
+            _collector.start()
+
+
+def notify_collector():
+    """Wakes collector up, e.g. when entry was added"""
+    collector = _collector
+    if collector is not None:
+        collector.wake.set()
+
+
+def stop_collector():
+    """Stops collector. Deletion that is running is finished in background"""
+    global _collector
+    with _collector_lock:
+        if _collector is not None:
+            _collector.stop()
+            _collector = None
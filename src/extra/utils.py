@@ -1,17 +1,20 @@
 import logging
 import os
 import shutil
+import sys
 from pathlib import Path
+from typing import Iterable, Iterator
 import src.constants as cst
+from src.extra.history import get_history
 
 def log_error(msg: str | Exception, logger: logging.Logger, exc = False) -> None:
     """
-    Writes an error message to stdout and logfile
+    Writes an error message to stderr and logfile
     :param msg: message to log
     :param logger: logger to write with
     :param exc: if set to True will enable full traceback
     """
-    print(msg)
+    print(msg, file=sys.stderr)
     if exc:
         logger.exception(msg)
         return
@@ -30,16 +33,19 @@ def remove_arg(arg: str, args: list) -> list:
         c_args.remove(arg)
     return c_args
 
-def create_path_obj(path: str, must_exist = True) -> Path:
+def create_path_obj(path: str, must_exist = True, cwd: Path | None = None) -> Path:
     """
     Create pathlib.Path object from string.
     :param path: path to create object from
     :param must_exist: if set to True, will raise exception if path doesn't exist
+    :param cwd: working directory to resolve relative path against. If None, process working directory is used
     :raise FileNotFoundError: if path doesn't exist ans must_exist set to True
     :return: pathlib.Path object
     """
     path_obj = Path(path)
     path_obj = path_obj.expanduser()
+    if cwd is not None:
+        path_obj = cwd / path_obj
 
     if not path_obj.exists() and must_exist:
         raise FileNotFoundError(
@@ -49,15 +55,76 @@ def create_path_obj(path: str, must_exist = True) -> Path:
         )
     return path_obj
 
+def display_path(path: Path, cwd: Path | None) -> str:
+    """
+    Makes path relative to working directory for display
+    :param path: path to display
+    :param cwd: working directory
+    :return: path relative to cwd if it is inside it, otherwise path as is
+    """
+    if cwd is None:
+        return str(path)
+    try:
+        return str(path.relative_to(cwd))
+    except ValueError:
+        return str(path)
+
 def write_history(obj: str):
     """
-    Write to history file
+    Write to history(see extra.history). Entry is buffered and committed with others
     :param obj: line to write to history
     """
-    if not cst.HISTORY_PATH.exists():
-        cst.HISTORY_PATH.touch()
-    with open(cst.HISTORY_PATH, "a", encoding='utf-8') as f:
-        f.write(f"{obj}\n")
+    get_history().append(obj)
+
+def split_operators(line: str, operators: tuple[str, ...]) -> list[tuple[str, str | None]]:
+    """
+    Splits a line by control operators that are not quoted or escaped
+    :param line: line to split
+    :param operators: operators to split by. Longer ones are matched first
+    :return: list of (segment, operator after segment | None for the last one)
+    """
+    ops = sorted(operators, key=len, reverse=True)
+    parts: list[tuple[str, str | None]] = []
+    quote = None
+    start = i = 0
+    while i < len(line):
+        ch = line[i]
+        if ch == "\\" and quote != "'":
+            i += 2
+            continue
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        else:
+            op = next((o for o in ops if line.startswith(o, i)), None)
+            if op:
+                parts.append((line[start:i], op))
+                i += len(op)
+                start = i
+                continue
+        i += 1
+    parts.append((line[start:], None))
+    return parts
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Regroups text chunks(e.g. stdin of piped command) into lines
+    :param chunks: text chunks of any size
+    :return: iterator over lines with line endings kept
+    """
+    tail = ""
+    for chunk in chunks:
+        if "\n" not in chunk:
+            tail += chunk
+            continue
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if tail:
+        yield tail
 
 def is_posix() -> bool:
     """
@@ -88,3 +155,17 @@ def raise_on_strict(logger, exc, strict: bool = False):
     if strict:
         raise exc
     log_error(str(exc), logger)
+
+def human_size(size: int) -> str:
+    """
+    Formats size in bytes like 'ls -h' does(e.g. 1.5K, 20M)
+    :param size: size in bytes
+    """
+    value = float(size)
+    for unit in ("", "K", "M", "G", "T"):
+        if value < 1024 or unit == "T":
+            if not unit:
+                return str(size)
+            return f"{value:.1f}{unit}" if value < 10 else f"{value:.0f}{unit}"
+        value /= 1024
+    return str(size)
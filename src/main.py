@@ -1,19 +1,81 @@
-import logging
-from src.command_line_session import CommandLineSession
-import src.constants as cst
+import time
+# taken before other imports, so that their time is in the startup profile(hence noqa: E402 below)
+_IMPORT_STARTED = time.perf_counter()
 
-def main():
+import argparse  # noqa: E402
+import logging  # noqa: E402
+import sys  # noqa: E402
+from src.command_line_session import CommandLineSession  # noqa: E402
+from src.daemon import serve  # noqa: E402
+from src.extra.profiling import StartupProfile  # noqa: E402
+import src.constants as cst  # noqa: E402
+
+_IMPORT_TIME = time.perf_counter() - _IMPORT_STARTED
+
+def parse_cli_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses command line arguments of application
+    :param argv: arguments to parse. If None, sys.argv is used
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.main", description="Bash emulator")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("-f", "--file", help="run commands from script file")
+    source.add_argument("-c", "--command", help="run commands from string, e.g. \"ls; cd dir && ls\"")
+    source.add_argument("--daemon", action="store_true", help=f"serve commands of src.client on {cst.DAEMON_SOCKET}")
+    source.add_argument("--profile-startup", nargs="?", const="table", choices=["table", "json"],
+                        help="print time of startup phases and plugins imports and exit")
+    return parser.parse_args(argv)
+
+def profile_startup() -> StartupProfile:
+    """
+    Runs startup phases of application and measures them. Plugins that are loaded lazily are imported too,
+    so import time of every plugin is measured
+    :return: profile of startup
+    """
+    profile = StartupProfile()
+    profile.phases["import src.main"] = _IMPORT_TIME
+    with profile.phase("logging.basicConfig"):
+        logging.basicConfig(
+            level=cst.LOGGING_LEVEL,
+            filename=cst.LOG_FILE,
+            format=cst.FORMAT
+        )
+    with profile.phase("session init"):
+        session = CommandLineSession()
+    session.load_modules(profile=profile)
+    with profile.phase("import lazy plugins"):
+        session.plugins_loader.import_lazy()  # type: ignore[union-attr]
+    profile.commands = len(session.cmd_map)
+    return profile
+
+def main(argv: list[str] | None = None):
     """
-    Entry point for application
+    Entry point for application. Runs interactive session, unless script file, command string, piped stdin or daemon mode is given
 
     :return:
     """
+    args = parse_cli_args(argv)
+    if args.profile_startup:
+        profile = profile_startup()
+        print(profile.to_json() if args.profile_startup == "json" else profile.to_table(), end="")
+        return
     logging.basicConfig(
         level=cst.LOGGING_LEVEL,
         filename=cst.LOG_FILE,
         format=cst.FORMAT
     )
+    if args.daemon:
+        serve()
+        return
     session = CommandLineSession()
+    if args.command is not None:
+        sys.exit(session.run_script([args.command]))
+    if args.file is not None:
+        with open(args.file, "r", encoding="utf-8") as script:
+            sys.exit(session.run_script(script))
+    if not sys.stdin.isatty():
+        sys.exit(session.run_script(sys.stdin))
     session.start_session()
 
 
@@ -6,7 +6,6 @@ import src.decorators.commands_register as cmd_register
 import src.decorators.handlers as handlers
 from src.cmd_types.commands import ExecutableCommand
 from src.cmd_types.output import CommandOutput
-from src.extra.utils import create_path_obj
 import src.constants as cst
 
 __author__ = "default"
@@ -35,10 +34,11 @@ class UnpackCommand(ExecutableCommand):
         if not self.args[0].endswith(ext):
             self._log_error(f"{self.name} command requires {ext} extension. Given: {self.args[0]}")
             return None
-        source = create_path_obj(self.args[0])
+        source = self.create_path_obj(self.args[0])
+        destination = self.create_path_obj(self.args[1], must_exist=False)
 
         try:
-            shutil.unpack_archive(source, self.args[1])
+            shutil.unpack_archive(source, destination)
         except shutil.ReadError as e:
             self._log_error(str(e))
         return None
@@ -81,10 +81,10 @@ class PackCommand(ExecutableCommand):
             msg = f"{self.name} command requires {ext} extension. Given: {self.args[1]}"
             return CommandOutput(stderr= msg, errcode=2)
 
-        source = create_path_obj(self.args[0])
+        source = self.create_path_obj(self.args[0])
+        destination = self.create_path_obj(self.args[1], must_exist=False)
 
-        self.make_archive(source, self.args[1], self.archive_type)
-        return None
+        return self.make_archive(source, destination, self.archive_type)
 
 
 @cmd_register.command("tar")
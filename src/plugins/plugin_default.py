@@ -1,101 +1,254 @@
-"""Default commands: ls, cat, cd, cp, mv, rm, grep, history, undo, exit"""
+"""Default commands: ls, cat, head, tail, cd, cp, mv, rm, grep, wc, history, undo, redo, exit"""
+import codecs
+import functools
 import grp
-import inspect
+import itertools
 import os
 import pwd
 import re
 import shutil
 import stat
 import time
+from abc import abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import BinaryIO, Iterator
 import src.decorators.commands_register as cmd_register
 import src.decorators.handlers as handlers
 import src.extra.utils as utils
 import src.cmd_types.commands as cmds
-from src.cmd_types.output import CommandOutput
+from src.cmd_types.arguments import ArgumentsError, Option, Positional
+from src.cmd_types.context import CommandContext
+from src.cmd_types.output import CommandOutput, FileRegion
+from src.extra.history import get_history
+from src.extra.journal import Journal, JournalError, Transaction, get_journal
+from src.extra import grep, trash
 from src.extra.utils import create_path_obj
 import src.constants as cst
 
 __author__ = "default"
 __version__ = "1.0.0"
 
-def get_resolved_line(args: list[str]) -> str:
+def get_resolved_line(args: list[str], cwd: Path) -> str:
     line = ""
     for arg in args:
-        line += f" {create_path_obj(arg, must_exist=False).resolve()}"
+        line += f" {create_path_obj(arg, must_exist=False, cwd=cwd).resolve()}"
     return line
 
-@cmd_register.command("ls", flags = ["-l"])
+@functools.lru_cache(maxsize=None)
+def owner_name(uid: int) -> str:
+    """Name of user by uid(uid itself if user is unknown). Lookups are memoized"""
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+@functools.lru_cache(maxsize=None)
+def group_name(gid: int) -> str:
+    """Name of group by gid(gid itself if group is unknown). Lookups are memoized"""
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+@functools.lru_cache(maxsize=1024)
+def _file_mode(mode: int) -> str:
+    return stat.filemode(mode)
+
+@functools.lru_cache(maxsize=4096)
+def _mtime_label(minute: int) -> str:
+    """Time of modification as 'ls -l' shows it. It has precision of minutes, so it is memoized by minute"""
+    return time.strftime('%b %d %H:%M', time.gmtime(minute * 60))
+
+def _stat_entry(entry: os.DirEntry) -> os.stat_result | OSError:
+    """Stats entry following symlinks, broken symlinks are stat'ed themselves. Error is returned, not raised"""
+    try:
+        return entry.stat()
+    except OSError:
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError as e:
+            return e
+
+def _stat_chunk(entries: list[os.DirEntry]) -> list[os.stat_result | OSError]:
+    return [_stat_entry(entry) for entry in entries]
+
+@cmd_register.command("ls", read_only = True, options = [
+    Option("-l", dest = "long", help = "use a long listing format"),
+    Option("-a", "--all", help = "do not ignore entries starting with ."),
+    Option("-R", "--recursive", help = "list subdirectories recursively"),
+    Option("-S", dest = "by_size", help = "sort by file size, largest first"),
+    Option("-t", dest = "by_time", help = "sort by modification time, newest first"),
+    Option("-h", "--human-readable", help = "with -l, print sizes like 1K 234M 2G"),
+], positionals = [Positional("paths", Path, "*")])
 class LsCommand(cmds.ExecutableCommand):
-    def _parse_args(self) -> tuple[list[Path], dict[str, bool]]:
-        flags = self.parse_flags()
-        ret = []
-        for arg in self.args:
-            ret.append(create_path_obj(arg, must_exist=False))
-        if not ret:
-            ret.append(create_path_obj("."))
-        return ret, flags
-
-    def execute(self):
-        paths, flags = self._parse_args()
-        out = CommandOutput()
-        l_flag = flags["-l"]
-        @handlers.handle_all_default
-        def file_info(item: Path):
-            output = ""
-            name = item.name
-            if item.name.startswith("."):
-                return CommandOutput()
-            if str(item).find(" ")!=-1:
-                name = f'"{name}"'
-
-            if l_flag:
-                stat_info = item.stat()
-
-                permissions = stat.filemode(stat_info.st_mode)
-                owner = pwd.getpwuid(stat_info.st_uid).pw_name
-                group = grp.getgrgid(stat_info.st_gid).gr_name
-                output += f"{permissions} {stat_info.st_nlink:>2} {owner} {group} {stat_info.st_size:>8} {time.strftime('%b %d %H:%M', time.gmtime(stat_info.st_mtime))} {name} \n"
+    batch_size: int = 1024
+    """Number of entries joined to one output chunk"""
 
-            else:
-                output+=f"{name} "
-
-            return CommandOutput(
-                stdout = output
-            )
-
-
-        @handlers.handle_all_default
-        def list_dir(path: Path):
-            output = CommandOutput()
-            col = utils.get_terminal_dimensions()[0]
-            len_counter = 0
-            if path.is_file():
-                return file_info(path)
-            next_line = 0
-            if len(paths)>1:
-                output.stdout = str(path) + ":\n"
-                next_line = 1
-            path_iter = path.iterdir()
-
-            for item in path_iter:
-                add = file_info(item)
-                add_stdout = add.stdout
-                if not l_flag:
-                    len_counter += len(add_stdout)
-                    if len_counter > col:
-                        len_counter = len(add_stdout)
-                        add.stdout = "\n" + add_stdout
-                output += add
-
-            output.stdout+=next_line*"\n\n"
-            return output
-
-        for arg in paths:
-            add_global = list_dir(arg)
-            out+=add_global
+    def _parse_args(self):
+        args = self.parse_args()
+        if not args.paths:
+            args.paths = [self.create_path_obj(".")]
+        return args.paths, args
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return f'"{name}"' if " " in name else name
+
+    def _long_line(self, name: str, st: os.stat_result, prefixes: dict | None = None, human: bool = False) -> str:
+        """
+        Formats line of 'ls -l'
+        :param prefixes: cache of formatted mode, links, owner and group. Entries of one directory mostly share them
+        :param human: print size like 'ls -h'
+        """
+        key = (st.st_mode, st.st_nlink, st.st_uid, st.st_gid)
+        prefix = prefixes.get(key) if prefixes is not None else None
+        if prefix is None:
+            prefix = f"{_file_mode(st.st_mode)} {st.st_nlink:>2} {owner_name(st.st_uid)} {group_name(st.st_gid)}"
+            if prefixes is not None:
+                prefixes[key] = prefix
+        size = utils.human_size(st.st_size) if human else st.st_size
+        return f"{prefix} {size:>8} {_mtime_label(int(st.st_mtime) // 60)} {self._quote(name)} \n"
 
-        return out
+    def execute(self):
+        return CommandOutput.from_stream(self.stream())
+
+    def _error(self, entry: os.DirEntry, e: OSError) -> CommandOutput:
+        return CommandOutput(stderr = f"{self.display(Path(entry.path))}: {(e.strerror or str(e)).lower()}\n", errcode = 2)
+
+    def _with_stats(self, entries: Iterator[os.DirEntry], pool: ThreadPoolExecutor | None):
+        """
+        Stats entries in chunks on thread pool, so latency of slow filesystems(NFS, FUSE) overlaps.
+        Only a few chunks are in flight at once, so memory is bounded
+        :return: iterator of (entry, stat result or error) in order of entries
+        """
+        if pool is None:
+            for entry in entries:
+                yield entry, _stat_entry(entry)
+            return
+        pending: deque = deque()
+        while True:
+            chunk = list(itertools.islice(entries, cst.LS_STAT_CHUNK))
+            if chunk:
+                pending.append((chunk, pool.submit(_stat_chunk, chunk)))
+            if pending and (not chunk or len(pending) > cst.LS_STAT_WORKERS):
+                done, future = pending.popleft()
+                yield from zip(done, future.result())
+            if not chunk and not pending:
+                return
+
+    def _list_long(self, items, human: bool):
+        """Yields lines of 'ls -l' in batches. Entries that can not be stat'ed are reported and skipped"""
+        batch = []
+        prefixes: dict = {}
+        for entry, st in items:
+            if isinstance(st, OSError):
+                yield self._error(entry, st)
+                continue
+            batch.append(self._long_line(entry.name, st, prefixes, human))
+            if len(batch) >= self.batch_size:
+                yield "".join(batch)
+                batch.clear()
+        if batch:
+            yield "".join(batch)
+
+    def _list_short(self, items):
+        """Yields names wrapped to terminal width. Layout is computed in the same pass as directory is read"""
+        col = utils.get_terminal_dimensions()[0]
+        line_len = 0
+        parts: list[str] = []
+        for entry, st in items:
+            if isinstance(st, OSError):
+                yield self._error(entry, st)
+                continue
+            piece = self._quote(entry.name) + " "
+            line_len += len(piece)
+            if line_len > col:
+                parts.append("\n")
+                line_len = len(piece)
+            parts.append(piece)
+            if len(parts) >= self.batch_size:
+                yield "".join(parts)
+                parts.clear()
+        if parts:
+            yield "".join(parts)
+
+    @staticmethod
+    def _scan(path: Path, show_all: bool, subdirs: list[Path] | None) -> Iterator[os.DirEntry]:
+        """
+        Reads directory lazily
+        :param subdirs: list to collect subdirectories to(for -R). Symlinks to directories are not followed
+        """
+        with os.scandir(path) as it:
+            for entry in it:
+                if not show_all and entry.name.startswith("."):
+                    continue
+                if subdirs is not None and entry.is_dir(follow_symlinks=False):
+                    subdirs.append(Path(entry.path))
+                yield entry
+
+    @handlers.handle_all_default
+    def _list_dir(self, path: Path, args, pool: ThreadPoolExecutor | None, subdirs: list[Path] | None):
+        """
+        Lists one directory. Entries are streamed unless they are sorted: then only this directory is kept in memory
+        """
+        entries = self._scan(path, args.all, subdirs)
+        if args.long or args.by_size or args.by_time:
+            items = self._with_stats(entries, pool)
+        else:
+            items = ((entry, None) for entry in entries)
+        if args.by_size or args.by_time:
+            field = "st_size" if args.by_size else "st_mtime"
+            items = sorted(items, key=lambda item: (isinstance(item[1], OSError),
+                                                   -getattr(item[1], field, 0), item[0].name))
+        yield from self._list_long(items, args.human_readable) if args.long else self._list_short(items)
+
+    @handlers.handle_all_default
+    def _list_file(self, path: Path, args):
+        if not args.all and path.name.startswith("."):
+            return
+        if args.long:
+            yield self._long_line(path.name, path.stat(), human = args.human_readable)
+        elif os.path.lexists(path):
+            yield f"{self._quote(path.name)} "
+        else:
+            raise FileNotFoundError(2, "No such file or directory", self.display(path))
+
+    def _walk(self, root: Path, args, pool: ThreadPoolExecutor | None, headers: bool):
+        """
+        Lists directory and, with -R, its subdirectories depth-first. Each directory is printed as soon as it is read,
+        only paths of subdirectories that are not listed yet are kept
+        """
+        separator = "\n" if args.long else "\n\n"
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            subdirs: list[Path] | None = [] if args.recursive else None
+            if headers:
+                yield self.display(path) + ":\n"
+            yield from self._list_dir(path, args, pool, subdirs)
+            if headers:
+                yield separator
+            if subdirs:
+                stack.extend(reversed(subdirs))
+
+    @handlers.handle_all_default
+    def stream(self):
+        paths, args = self._parse_args()
+        headers = len(paths) > 1 or args.recursive
+        needs_stat = args.long or args.by_size or args.by_time
+        pool = ThreadPoolExecutor(cst.LS_STAT_WORKERS, thread_name_prefix = "ls-stat") \
+            if needs_stat and cst.LS_STAT_WORKERS > 1 else None
+        try:
+            for path in paths:
+                if path.is_dir():
+                    yield from self._walk(path, args, pool, headers)
+                else:
+                    yield from self._list_file(path, args)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures = True)
 
 @cmd_register.command("cd")
 class CdCommand(cmds.ExecutableCommand):
@@ -110,9 +263,7 @@ class CdCommand(cmds.ExecutableCommand):
             return Path(""), len(args)
 
         path = args[0]
-        path_obj = utils.create_path_obj(path)
-        if not path_obj.is_absolute():
-            path_obj = Path.cwd() / path_obj
+        path_obj = self.create_path_obj(path)
 
         return path_obj, len(args)
 
@@ -122,61 +273,409 @@ class CdCommand(cmds.ExecutableCommand):
             msg = "too many arguments\n"
             return CommandOutput(stderr = msg, errcode = 4)
         if path.is_dir():
-            os.chdir(path)
+            self.cwd = path.resolve()
             return CommandOutput()
         elif path.is_file():
 
-            msg = f"{path}: it is a file\n"
+            msg = f"{self.display(path)}: it is a file\n"
             return CommandOutput(stderr = msg, errcode = 2)
-        return CommandOutput(stderr = f"not found: {path}", errcode = 2)
+        return CommandOutput(stderr = f"not found: {self.display(path)}", errcode = 2)
+
+
+def file_regions(file: BinaryIO, start: int, end: int, errors: str) -> Iterator[FileRegion]:
+    """
+    Splits part of file to regions of constant size. Their bytes are read only by consumer
+    :param start: offset of the first byte
+    :param end: offset after the last byte
+    :param errors: handler of decoding errors
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors)
+    for offset in range(start, end, cst.CAT_CHUNK_SIZE):
+        count = min(cst.CAT_CHUNK_SIZE, end - offset)
+        yield FileRegion(file, offset, count, decoder, final = offset + count >= end)
+
+def decode_errors(name: str) -> str:
+    """
+    Checks name of decoding errors handler(strict, replace, ignore, backslashreplace, surrogateescape...)
+    :raise ValueError: if there is no such handler
+    """
+    try:
+        codecs.lookup_error(name)
+    except LookupError:
+        raise ValueError(name)
+    return name
+
+@cmd_register.command("cat", read_only = True, options = [
+    Option("-n", "--number", help = "number all output lines"),
+    Option(long = "--errors", type = decode_errors, default = "replace",
+           help = "how to decode invalid UTF-8: replace(default), strict, ignore, backslashreplace"),
+], positionals = [Positional("paths", Path, "*")])
+class CatCommand(cmds.ExecutableCommand):
 
+    def __init__(self, args: list[str], cwd: Path | None = None, ctx: CommandContext | None = None):
+        super().__init__(args, cwd, ctx)
+        self._line_number = 0
+        """Number of the last numbered line('-n')"""
 
-@cmd_register.command("cat")
-class CatCommand(cmds.ExecutableCommand):
+        self._at_line_start = True
+        """Next chunk starts a new line"""
 
-    def _parse_args(self) -> list[Path]:
-        if len(self.args)==0:
-            return []
-        ret = []
-        for arg in self.args:
-            ret.append(create_path_obj(arg, must_exist=False))
-        return ret
+    def _parse_args(self):
+        args = self.parse_args()
+        return args.paths, args
 
     def execute(self):
-        paths = self._parse_args()
-        output = CommandOutput()
+        return CommandOutput.from_stream(self.stream())
+
+    def _numbered(self, chunks: Iterator[str]) -> Iterator[str]:
+        """
+        Prefixes lines of text with their numbers. Text may be split to chunks anywhere.
+        Numbering continues through all files, like in GNU cat
+        """
+        for text in chunks:
+            parts = []
+            pieces = text.split("\n")
+            for i, piece in enumerate(pieces):
+                last = i == len(pieces) - 1
+                if last and not piece:
+                    break
+                if self._at_line_start:
+                    self._line_number += 1
+                    parts.append(f"{self._line_number:>6}\t")
+                parts.append(piece)
+                if not last:
+                    parts.append("\n")
+                self._at_line_start = not last
+            if parts:
+                yield "".join(parts)
+
+    @staticmethod
+    def _decoded(file: BinaryIO, errors: str) -> Iterator[str]:
+        """Reads file by chunks of constant size and decodes them"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors)
+        while chunk := file.read(cst.CAT_CHUNK_SIZE):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b"", final = True)
+        if text:
+            yield text
+
+    @handlers.handle_all_default
+    def _read_file(self, path: Path, args):
+        if path.is_dir():
+            msg = f"{self.display(path)}: is a directory\n"
+            yield CommandOutput(stderr = msg, errcode = 2)
+            return
+        if not path.exists():
+            raise FileNotFoundError(2, "No such file or directory", self.display(path))
+        with open(path, "rb") as file:
+            st = os.fstat(file.fileno())
+            if args.number:
+                yield from self._numbered(self._decoded(file, args.errors))
+            elif stat.S_ISREG(st.st_mode) and st.st_size and args.errors != "strict":
+                # regions are decoded by consumer, so decoding errors can not be raised there
+                yield from file_regions(file, 0, st.st_size, args.errors)
+            else:
+                # size of pipes and special files(e.g. in /proc) is unknown, they are read until EOF
+                yield from self._decoded(file, args.errors)
+
+    @handlers.handle_all_default
+    def stream(self):
+        paths, args = self._parse_args()
         if not paths:
+            if self.stdin is not None:
+                yield from self._numbered(self.stdin) if args.number else self.stdin
+                return
             msg = "too few arguments\n"
-            return CommandOutput(stderr = msg, errcode = 4)
+            yield CommandOutput(stderr = msg, errcode = 4)
+            return
+
+        for path in paths:
+            yield from self._read_file(path, args)
+
+def count_arg(raw: str) -> int:
+    """Number of lines or bytes for head and tail"""
+    count = int(raw)
+    if count < 0:
+        raise ValueError(raw)
+    return count
+
+def _line_end(fd: int, size: int, n: int) -> int:
+    """Offset after the n-th line of file. Blocks are read from the start until n newlines are found"""
+    if not n:
+        return 0
+    pos = 0
+    while pos < size:
+        block = os.pread(fd, cst.TAIL_BLOCK_SIZE, pos)
+        if not block:
+            break
+        found = block.count(b"\n")
+        if found >= n:
+            idx = -1
+            for _ in range(n):
+                idx = block.index(b"\n", idx + 1)
+            return pos + idx + 1
+        n -= found
+        pos += len(block)
+    return size
+
+def _lines_start(fd: int, size: int, n: int) -> int:
+    """Offset of the first of the last n lines of file. Blocks are read backwards from the end until n newlines are found"""
+    if not n:
+        return size
+    pos = size
+    # newline at the end of file terminates the last line, it does not start a new one
+    if size and os.pread(fd, 1, size - 1) == b"\n":
+        pos -= 1
+    while pos > 0:
+        start = max(pos - cst.TAIL_BLOCK_SIZE, 0)
+        block = os.pread(fd, pos - start, start)
+        idx = len(block)
+        while (idx := block.rfind(b"\n", 0, idx)) != -1:
+            n -= 1
+            if not n:
+                return start + idx + 1
+        pos = start
+    return 0
 
-        @handlers.handle_all_default
-        def read_file(path: Path):
-            if path.is_dir():
-                msg = f"{path}: is is a directory\n"
-                return CommandOutput(stderr = msg, errcode = 2)
-            elif path.is_file():
-                try:
-                    with open(path, "r", encoding='utf-8') as file:
-                        return file.read()+"\n"
-                except Exception:
-                    return CommandOutput(stderr = f"unable to read {path}\n", errcode = 3)
+class PartCommand(cmds.ExecutableCommand):
+    """
+    Base of head and tail: prints part of every file('==> name <==' headers are printed if there are many files)
+    or of stdin. Regular files are read only where the part is, other ones are read in blocks
+    """
 
-            raise FileNotFoundError(2, path, str(path))
+    def _parse_args(self):
+        return self.parse_args()
 
-        for arg in paths:
-            output += read_file(arg)
-        return output
+    def execute(self):
+        return CommandOutput.from_stream(self.stream())
+
+    @abstractmethod
+    def _file_part(self, fd: int, size: int, args) -> tuple[int, int]:
+        """
+        :param fd: descriptor of regular file
+        :param size: size of file
+        :return: offsets of part (start, end)
+        """
+
+    @abstractmethod
+    def _blocks_part(self, blocks: Iterator[bytes], args) -> Iterator[bytes]:
+        """
+        :param blocks: content of file that can not be seeked(pipe, stdin, special file)
+        :return: part of content
+        """
+
+    @staticmethod
+    def _decoded(blocks: Iterator[bytes]) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        for block in blocks:
+            text = decoder.decode(block)
+            if text:
+                yield text
+        text = decoder.decode(b"", final = True)
+        if text:
+            yield text
+
+    @handlers.handle_all_default
+    def _read_file(self, path: Path, args, many: bool):
+        if path.is_dir():
+            msg = f"{self.display(path)}: is a directory\n"
+            yield CommandOutput(stderr = msg, errcode = 2)
+            return
+        if not path.exists():
+            raise FileNotFoundError(2, "No such file or directory", self.display(path))
+        file = open(path, "rb")
+        self._opened.append((path, file))
+        if many:
+            separator = "\n" if len(self._opened) > 1 else ""
+            yield f"{separator}==> {self.display(path)} <==\n"
+        st = os.fstat(file.fileno())
+        if stat.S_ISREG(st.st_mode):
+            start, end = self._file_part(file.fileno(), st.st_size, args)
+            yield from file_regions(file, start, end, "replace")
+            self._positions[path] = st.st_size
+        else:
+            blocks = iter(functools.partial(file.read, cst.TAIL_BLOCK_SIZE), b"")
+            yield from self._decoded(self._blocks_part(blocks, args))
+
+    def _read_stdin(self, args):
+        yield from self._decoded(self._blocks_part((chunk.encode("utf-8") for chunk in self.stdin), args))
+
+    def _after_files(self, args, many: bool):
+        """Called when all files are read, while they are still opened"""
+        return iter(())
+
+    @handlers.handle_all_default
+    def stream(self):
+        args = self._parse_args()
+        if not args.paths:
+            if self.stdin is not None:
+                yield from self._read_stdin(args)
+                return
+            msg = "too few arguments\n"
+            yield CommandOutput(stderr = msg, errcode = 4)
+            return
+
+        self._opened: list[tuple[Path, BinaryIO]] = []
+        self._positions: dict[Path, int] = {}
+        many = len(args.paths) > 1
+        try:
+            for path in args.paths:
+                yield from self._read_file(path, args, many)
+            yield from self._after_files(args, many)
+        finally:
+            for _, file in self._opened:
+                file.close()
+
+@cmd_register.command("head", read_only = True, options = [
+    Option("-n", "--lines", type = count_arg, default = 10, help = "print the first LINES lines(10 by default)"),
+    Option("-c", "--bytes", type = count_arg, help = "print the first BYTES bytes"),
+], positionals = [Positional("paths", Path, "*")])
+class HeadCommand(PartCommand):
+    """Prints beginning of files. Reading stops as soon as the part is read"""
+
+    def _file_part(self, fd: int, size: int, args) -> tuple[int, int]:
+        if args.bytes is not None:
+            return 0, min(args.bytes, size)
+        return 0, _line_end(fd, size, args.lines)
+
+    def _blocks_part(self, blocks: Iterator[bytes], args) -> Iterator[bytes]:
+        if args.bytes is not None:
+            left = args.bytes
+            for block in blocks:
+                if not left:
+                    return
+                yield block[:left]
+                left -= min(left, len(block))
+            return
+        left = args.lines
+        for block in blocks:
+            if not left:
+                return
+            found = block.count(b"\n")
+            if found < left:
+                left -= found
+                yield block
+                continue
+            idx = -1
+            for _ in range(left):
+                idx = block.index(b"\n", idx + 1)
+            yield block[:idx + 1]
+            return
+
+@cmd_register.command("tail", read_only = True, options = [
+    Option("-n", "--lines", type = count_arg, default = 10, help = "print the last LINES lines(10 by default)"),
+    Option("-c", "--bytes", type = count_arg, help = "print the last BYTES bytes"),
+    Option("-f", "--follow", help = "output appended data as files grow, until Ctrl-C"),
+], positionals = [Positional("paths", Path, "*")])
+class TailCommand(PartCommand):
+    """Prints end of files. Regular files are read backwards from the end, so only the last blocks are read"""
+
+    def _file_part(self, fd: int, size: int, args) -> tuple[int, int]:
+        if args.bytes is not None:
+            return max(size - args.bytes, 0), size
+        return _lines_start(fd, size, args.lines), size
+
+    def _blocks_part(self, blocks: Iterator[bytes], args) -> Iterator[bytes]:
+        if args.bytes is not None:
+            kept: deque[bytes] = deque()
+            total = 0
+            for block in blocks:
+                kept.append(block)
+                total += len(block)
+                while kept and total - len(kept[0]) >= args.bytes:
+                    total -= len(kept.popleft())
+            yield b"".join(kept)[total - args.bytes if total > args.bytes else 0:]
+            return
+        lines: deque[bytes] = deque(maxlen = args.lines)
+        rest = b""
+        for block in blocks:
+            parts = (rest + block).split(b"\n")
+            rest = parts.pop()
+            lines.extend(part + b"\n" for part in parts)
+        if rest:
+            lines.append(rest)
+        yield b"".join(lines)
+
+    def _after_files(self, args, many: bool):
+        if args.follow:
+            yield from self._follow(many)
+
+    def _follow(self, many: bool):
+        """
+        Outputs data appended to regular files until Ctrl-C. Size of files is checked every TAIL_FOLLOW_INTERVAL seconds,
+        file that became smaller is read again from the start
+        """
+        followed = [(path, file) for path, file in self._opened if path in self._positions]
+        last = followed[-1][0] if followed else None
+        try:
+            while followed:
+                time.sleep(cst.TAIL_FOLLOW_INTERVAL)
+                for path, file in followed:
+                    pos = self._positions[path]
+                    size = os.fstat(file.fileno()).st_size
+                    if size < pos:
+                        yield CommandOutput(stderr = f"{self.display(path)}: file truncated\n")
+                        pos = 0
+                    if size > pos:
+                        if many and path != last:
+                            yield f"\n==> {self.display(path)} <==\n"
+                            last = path
+                        yield from file_regions(file, pos, size, "replace")
+                    self._positions[path] = size
+        except KeyboardInterrupt:
+            yield CommandOutput(errcode = 130)
 
 @cmd_register.command("cp", flags = ["-r"])
-class CopyCommand(cmds.ExecutableCommand):
+class CopyCommand(cmds.UndoableCommand):
     def _parse_args(self) -> tuple[list[Path], Path, dict[str, bool]]:
         flags = self.parse_flags()
         args = self.args
-        source_dirs = [utils.create_path_obj(o, must_exist=False) for o in args[:-1]]
-        to_dir = utils.create_path_obj(args[-1], must_exist=False).expanduser()
+        source_dirs = [self.create_path_obj(o, must_exist=False) for o in args[:-1]]
+        to_dir = self.create_path_obj(args[-1], must_exist=False)
 
         return source_dirs, to_dir, flags
 
+    def _set_aside(self, path: Path):
+        """Moves path that is about to be overwritten to trash, so undo can restore it"""
+        self.transaction.move(path, trash.trash_slot(path))
+
+    def _copy(self, source: Path, to: Path) -> CommandOutput | None:
+        """
+        Copies source to exact path 'to'. Directories are merged entry by entry, so undo reverts exactly what was copied
+        """
+        if source.is_dir() and not source.is_symlink():
+            if to.is_dir() and not to.is_symlink():
+                out = CommandOutput()
+                for item in source.iterdir():
+                    res = self._copy(item, to / item.name)
+                    if res:
+                        out += res
+                return out
+            if os.path.lexists(to):
+                self._set_aside(to)
+            try:
+                shutil.copytree(source, to, symlinks=True)
+            except shutil.Error as e:
+                for arg in e.args[0]:
+                    msg = f"{arg[0]}: {arg[2]}\n"
+                    return CommandOutput(stderr = msg, errcode = 1)
+            finally:
+                # created path is recorded as taken from trash, so undo moves it back there
+                if os.path.lexists(to):
+                    self.transaction.record(trash.trash_slot(to), to)
+            return None
+
+        if to.is_dir() and not to.is_symlink():
+            msg = f"cannot overwrite directory '{self.display(to)}' with non-directory\n"
+            return CommandOutput(stderr = msg, errcode = 1)
+        if os.path.lexists(to):
+            self._set_aside(to)
+        shutil.copy2(source, to, follow_symlinks=False)
+        self.transaction.record(trash.trash_slot(to), to)
+        return None
+
     def execute(self):
         if len(self.args) < 2:
             return CommandOutput(stderr = "too few arguments\n", errcode = 4)
@@ -186,24 +685,21 @@ class CopyCommand(cmds.ExecutableCommand):
 
         @handlers.handle_all_default
         def copy(source: Path, to: Path):
+            if not os.path.lexists(source):
+                raise FileNotFoundError(2, "No such file or directory", self.display(source))
             if source.is_dir():
                 if not r:
-                    msg = f"-r option was not specified: '{source}' is ignored\n"
+                    msg = f"-r option was not specified: '{self.display(source)}' is ignored\n"
                     return CommandOutput(stderr = msg, errcode = 1)
 
-                if to_dir.resolve().is_relative_to(source_dir.resolve()):
-                    msg = f"Unable to copy '{to}' to itself\n"
+                if to.resolve().is_relative_to(source.resolve()):
+                    msg = f"Unable to copy '{self.display(to)}' to itself\n"
                     return CommandOutput(stderr = msg, errcode = 1)
-                try:
-                    shutil.copytree(source, to, dirs_exist_ok=True)
-                except shutil.Error as e:
-                    for arg in e.args[0]:
-                        msg = f"{arg[0]}: {arg[2]}\n"
-                        return CommandOutput(stderr = msg, errcode = 1)
-                return None
-
-            shutil.copy2(source, to)
-            return None
+                return self._copy(source, to)
+
+            if to.is_dir():
+                to = to / source.name
+            return self._copy(source, to)
 
         for source_dir in source_dirs:
             res = copy(source_dir, to_dir)
@@ -215,23 +711,17 @@ class CopyCommand(cmds.ExecutableCommand):
     def history(self):
         line = self.name
         no_r = utils.remove_arg("-r", self.args)
-        line+=get_resolved_line(no_r)
+        line+=get_resolved_line(no_r, self.cwd)
 
         utils.write_history(line)
 
-    def undo(self):
-        source = Path(self.args.pop())
-        for arg in self.args:
-            move_from = source / Path(arg).name
-            RemoveCommand([str(move_from)]).execute()
-
 @cmd_register.command("mv")
-class MoveCommand(cmds.ExecutableCommand):
+class MoveCommand(cmds.UndoableCommand):
     def _parse_args(self) -> tuple[list[Path], Path]:
         args = self.args
 
-        source_dirs = [utils.create_path_obj(o) for o in args[:-1]]
-        to_dir = utils.create_path_obj(args[-1], must_exist=False)
+        source_dirs = [self.create_path_obj(o) for o in args[:-1]]
+        to_dir = self.create_path_obj(args[-1], must_exist=False)
 
         return source_dirs, to_dir
 
@@ -241,29 +731,26 @@ class MoveCommand(cmds.ExecutableCommand):
         out = CommandOutput()
         for source_dir in source_dirs:
             if to_dir.resolve().is_relative_to(source_dir.resolve()):
-                out.stderr += f"unable to move '{source_dir}' to itself\n"
+                out.stderr += f"unable to move '{self.display(source_dir)}' to itself\n"
                 out.errcode = 2
                 continue
-            shutil.move(source_dir, to_dir)
+            to = to_dir / source_dir.name if to_dir.is_dir() else to_dir
+            if os.path.lexists(to):
+                if to.is_dir() and not to.is_symlink():
+                    out.stderr += f"unable to move '{self.display(source_dir)}': '{self.display(to)}' already exists\n"
+                    out.errcode = 2
+                    continue
+                # overwritten file goes to trash, so undo can restore it
+                self.transaction.move(to, trash.trash_slot(to))
+            self.transaction.move(source_dir, to)
         return out
 
     def history(self):
         line = self.name
-        line+=get_resolved_line(self.args)
+        line+=get_resolved_line(self.args, self.cwd)
 
         utils.write_history(line)
 
-    def undo(self):
-        source = Path(self.args.pop())
-
-        @handlers.handle_all_default
-        def undo_(arg: str):
-            move_from = source / Path(arg).name
-            shutil.move(move_from, arg)
-
-        for p in self.args:
-            undo_(p)
-
 
 @cmd_register.command("rm", flags = ["-r"])
 class RemoveCommand(cmds.UndoableCommand):
@@ -272,7 +759,7 @@ class RemoveCommand(cmds.UndoableCommand):
         flags = self.parse_flags()
         for arg in self.args:
             try:
-                ret.append(create_path_obj(arg, must_exist=False).resolve())
+                ret.append(self.create_path_obj(arg, must_exist=False).resolve())
             except FileNotFoundError:
                 self._log_error(f"Cannot remove '{arg}': no such file or directory")
 
@@ -281,7 +768,7 @@ class RemoveCommand(cmds.UndoableCommand):
     def history(self):
         line = self.name
         no_r = utils.remove_arg("-r", self.args)
-        line+=get_resolved_line(no_r)
+        line+=get_resolved_line(no_r, self.cwd)
 
         utils.write_history(line)
 
@@ -289,24 +776,16 @@ class RemoveCommand(cmds.UndoableCommand):
         args, flags = self._parse_args()
         r_flag = flags["-r"]
         out = CommandOutput()
-        home = os.getenv("HOME")+"/"
         @handlers.handle_all_default
         def remove(path: Path):
 
-            if path == cst.TRASH_PATH:
+            if trash.is_root(path):
                 msg = f"unable to remove '{path}' as it is a TRASH\n"
                 return CommandOutput(stderr = msg, errcode = 2)
 
-            if Path.cwd().is_relative_to(path):
+            if self.cwd.is_relative_to(path):
                 msg = f"unable to remove '{path}': it is a parent directory\n"
                 return CommandOutput(stderr = msg, errcode = 2)
-            no_home = str(path).replace(home, "")
-            parent = Path(no_home).parent
-            if str(parent)[0]=="/":
-                parent = Path(str(parent)[1:])
-            to_move = Path(cst.TRASH_PATH) / parent
-            if not to_move.exists():
-                to_move.mkdir(parents=True)
 
             if path.is_dir():
                 if not r_flag and any(path.iterdir()):
@@ -315,152 +794,291 @@ class RemoveCommand(cmds.UndoableCommand):
 
                 perm = input(f"Do you want to remove '{path}'? [y/n] ")
                 if perm.lower() == "y":
-                    if not (to_move / path.name).exists():
-                        shutil.move(path, to_move)
-                    else:
-                        shutil.rmtree(to_move)
-                        shutil.move(path, to_move)
+                    self.transaction.move(path, trash.trash_slot(path))
                 else:
                     self.logger.warning(f"'{path}' was not removed: user declined operation")
                 return CommandOutput()
 
-            else:
-                if not (to_move / path.name).exists():
-                    shutil.move(path, to_move / path.name)
-                else:
-                    (to_move/path.name).unlink()
-                    shutil.move(path, to_move / path.name)
+            self.transaction.move(path, trash.trash_slot(path))
+            return None
 
         for arg in args:
             res = remove(arg)
             if res:
                 out += res
+        # collector checks quota with new entries
+        trash.notify_collector()
         return out
 
 
-    def undo(self):
-        home = os.environ.get("HOME")+"/"
-
-        @handlers.handle_all_default
-        def undo_(arg: str):
-            no_home = str(arg).replace(home, "")
-            source = Path(cst.TRASH_PATH) / no_home
-            self.logger.info(f"undoing 'rm {arg}")
-            shutil.move(source, arg)
-
-        for p in self.args:
-            undo_(p)
-
-
-@cmd_register.command("grep", flags = ["-i", "-r", "-ir"])
+@cmd_register.command("grep", read_only = True, options = [
+    Option("-i", "--ignore-case", help = "ignore case distinctions"),
+    Option("-r", "--recursive", help = "read directories recursively"),
+    Option("-j", "--jobs", type = count_arg, default = 0,
+           help = "scan files on JOBS processes(number of CPUs by default)"),
+    Option("-a", "--text", help = "search binary files as text"),
+    Option("-I", dest = "skip_binary", help = "skip binary files"),
+    Option("-F", "--fixed-strings", help = "patterns are strings, not regular expressions"),
+    Option("-e", "--regexp", type = str, multiple = True, help = "search REGEXP(can be given many times)"),
+    Option("-f", "--file", type = str, multiple = True, help = "take patterns from FILE, one per line"),
+    Option("-v", "--invert-match", help = "select lines that do not match"),
+    Option("-w", "--word-regexp", help = "match only whole words"),
+    Option("-m", "--max-count", type = count_arg, help = "stop reading a file after MAX_COUNT selected lines"),
+    Option("-c", "--count", help = "print only number of selected lines of every file"),
+    Option("-l", "--files-with-matches", help = "print only names of files with selected lines"),
+    Option("-q", "--quiet", help = "print nothing, exit with 0 at the first selected line"),
+], positionals = [Positional("operands", str, "*")])
 class GrepCommand(cmds.ExecutableCommand):
     def _parse_args(self):
-        flags = self.parse_flags()
-        f = create_path_obj(self.args[-1], must_exist=False)
-        if flags["-ir"]:
-            flags["-i"] = flags["-r"] = True
-        return f, self.args[0], flags
+        """
+        :raise ArgumentsError: if there are no patterns
+        :return: paths, patterns, args. The first operand is pattern unless patterns are given by '-e' or '-f'
+        """
+        args = self.parse_args()
+        operands = list(args.operands)
+        patterns = list(args.regexp)
+        for name in args.file:
+            path = self.create_path_obj(name, must_exist = False)
+            patterns.extend(path.read_text(encoding = "utf-8").splitlines())
+        if not args.regexp and not args.file:
+            if not operands:
+                raise ArgumentsError("missing argument: pattern")
+            patterns.append(operands.pop(0))
+        # pattern with newlines is a list of patterns, like in GNU grep
+        patterns = [line for pattern in patterns for line in pattern.split("\n")]
+        return [self.create_path_obj(operand, must_exist = False) for operand in operands], patterns, args
 
     def execute(self):
-        if len(self.args) < 2:
+        return CommandOutput.from_stream(self.stream())
+
+    def _files(self, paths: list[Path], recursive: bool):
+        """
+        Files to scan in order of arguments, directories are walked once.
+        Arguments that can not be scanned are reported as results with errors or as CommandOutput
+        """
+        for path in paths:
+            if path.is_dir():
+                if not recursive:
+                    msg = f"'-r' flag was not specified: '{self.display(path)}' is ignored"
+                    yield CommandOutput(stderr = msg, errcode = 2)
+                    continue
+                yield from grep.walk(path)
+            elif not path.exists():
+                yield grep.FileResult(path, error = FileNotFoundError(2, "No such file or directory", str(path)))
+            else:
+                yield path
+
+    def _format(self, result: grep.FileResult, args):
+        name = self.display(result.path)
+        if result.count:
+            self._selected = True
+        if args.quiet:
+            pass
+        elif args.files_with_matches:
+            if result.count:
+                yield f"{name}\n"
+        elif args.count:
+            if result.error is None:
+                yield f"{name}\t {result.count}\n"
+        elif result.binary:
+            yield f"{name}: binary file matches\n"
+        elif result.lines:
+            yield "".join(f"{name}\t {n} {line}\n" for n, line in result.lines)
+        e = result.error
+        if e is None:
+            return
+        self._failed = True
+        if isinstance(e, OSError):
+            err_format = cst.ERROR_HANDLERS_MESSAGES_FORMATS.get(type(e))
+            msg = f"{name}: {(e.strerror or str(e)).lower()}\n"
+            yield CommandOutput(stderr = msg, errcode = err_format.errcode if err_format else 2)
+        else:
+            yield handlers.handled_output(e)
+
+    def _search(self, paths: list[Path], query: grep.Query, args):
+        """
+        Scans files and streams results in order of paths. Errors of arguments are kept in their places.
+        With '-q' search stops at the first selected line: walk stops and pending batches are cancelled
+        """
+        items = grep.search(self._files(paths, args.recursive), query, args.jobs or cst.GREP_WORKERS)
+        try:
+            for item in items:
+                if isinstance(item, CommandOutput):
+                    self._failed = True
+                    yield item
+                    continue
+                yield from self._format(item, args)
+                if args.quiet and self._selected:
+                    return
+        finally:
+            items.close()
+
+    def _search_stdin(self, stdin: Iterator[str], query: grep.Query, args):
+        count = 0
+        for line in utils.iter_lines(stdin):
+            if args.max_count is not None and count >= args.max_count:
+                break
+            if bool(query.text_searcher.search(line.rstrip("\n"))) == args.invert_match:
+                continue
+            count += 1
+            self._selected = True
+            if args.quiet or args.files_with_matches:
+                break
+            if not args.count:
+                yield line if line.endswith("\n") else line + "\n"
+        if args.quiet:
+            return
+        if args.files_with_matches:
+            if count:
+                yield "(standard input)\n"
+        elif args.count:
+            yield f"{count}\n"
+
+    @handlers.handle_all_default
+    def stream(self):
+        paths, patterns, args = self._parse_args()
+        if not paths and self.stdin is None:
             msg = "too few arguments"
-            return CommandOutput(stderr = msg, errcode = 4)
-        path_arg, regexp, flags = self._parse_args()
-        flags_re = 0
-        if flags["-i"]:
-            flags_re |= re.IGNORECASE
+            yield CommandOutput(stderr = msg, errcode = 4)
+            return
+        binary_files = "text" if args.text else "without-match" if args.skip_binary else "binary"
+        mode = "files" if args.quiet or args.files_with_matches else "count" if args.count else "lines"
         try:
-            compiled = re.compile(regexp, flags_re)
-        except re.PatternError:
-            msg = f"invalid regular expression '{regexp}'"
-            return CommandOutput(stderr = msg, errcode = 5)
+            query = grep.Query(patterns, args.fixed_strings, args.ignore_case, binary_files,
+                               args.invert_match, args.word_regexp, args.max_count, mode)
+        except re.error as e:
+            msg = f"invalid regular expression '{e.pattern}'"
+            yield CommandOutput(stderr = msg, errcode = 5)
+            return
+
+        self._selected = self._failed = False
+        if not paths and self.stdin is not None:
+            yield from self._search_stdin(self.stdin, query, args)
+        else:
+            yield from self._search(paths, query, args)
+        # like in GNU grep: 1 if no lines were selected, errors have their own codes
+        if not self._selected and not self._failed:
+            yield CommandOutput(errcode = 1)
+
+@cmd_register.command("wc", flags = ["-l", "-w", "-c"], read_only = True)
+class WcCommand(cmds.ExecutableCommand):
+    def _parse_args(self) -> tuple[list[Path], dict[str, bool]]:
+        flags = self.parse_flags()
+        if not any(flags.values()):
+            flags = dict.fromkeys(flags, True)
+        return [self.create_path_obj(arg, must_exist=False) for arg in self.args], flags
+
+    def execute(self):
+        return CommandOutput.from_stream(self.stream())
+
+    @handlers.handle_all_default
+    def stream(self):
+        paths, flags = self._parse_args()
+
+        def count(lines) -> str:
+            n_lines = n_words = n_chars = 0
+            for line in lines:
+                n_lines += line.endswith("\n")
+                n_words += len(line.split())
+                n_chars += len(line)
+            counts = [n for n, flag in zip((n_lines, n_words, n_chars), ("-l", "-w", "-c")) if flags[flag]]
+            return " ".join(f"{n:>7}" for n in counts)
+
         @handlers.handle_all_default
-        def grep(path: Path) -> CommandOutput:
-            out = CommandOutput()
+        def count_file(path: Path):
             if path.is_dir():
-                if not flags["-r"]:
-                    msg = f"'-r' flag was not specified: '{path}' is ignored"
-                    return CommandOutput(stderr = msg, errcode = 2)
-                for p in path.iterdir():
-                    out+=grep(p)
-            elif path.is_file():
-                with open(path, "r", encoding='utf-8') as f:
-                    for n, line in enumerate(f.readlines(), start = 1):
-                        match_found = bool(compiled.search(line))
-                        if match_found:
-                            line = line.rstrip('\n\r')
-                            out.stdout+=f"{str(path)}\t {n} {line}\n"
-            return out
-        output = grep(path_arg)
-        return output
-
-@cmd_register.command("history")
+                yield CommandOutput(stderr = f"{self.display(path)}: is a directory\n", errcode = 2)
+                return
+            with open(path, "r", encoding='utf-8') as file:
+                yield f"{count(file)} {self.display(path)}\n"
+
+        if not paths:
+            if self.stdin is None:
+                yield CommandOutput(stderr = "too few arguments\n", errcode = 4)
+                return
+            yield count(utils.iter_lines(self.stdin)) + "\n"
+            return
+        for path in paths:
+            yield from count_file(path)
+
+@cmd_register.command("history", read_only = True, options = [
+    Option("-s", "--search", type = str, help = "show entries containing PATTERN"),
+    Option("-d", "--delete", type = int, help = "delete entry with given number"),
+], positionals = [Positional("n", int, "?")])
 class HistoryCommand(cmds.ExecutableCommand):
-    def _parse_args(self) -> int | None:
-        if self.args:
-            try:
-                return int(self.args[0])
-            except ValueError:
-                self._log_error(f"{self.args[0]} is not an integer")
-        return None
+    def _parse_args(self):
+        return self.parse_args()
 
     def execute(self):
-        n = self._parse_args()
-        with open(cst.HISTORY_PATH, "r", encoding='utf-8') as file:
-            out = ""
-            rev = file.readlines()
-            if not n:
-                n = len(rev)
-            for num, line in enumerate(rev[-n:]):
-                out += f"{num+1} {line}"
-        return CommandOutput(stdout = out)
-
-@cmd_register.command("undo")
-class UndoCommand(cmds.ExecutableCommand):
-    def _parse_args(self) -> None:
-        return None
+        return CommandOutput.from_stream(self.stream())
+
+    @handlers.handle_all_default
+    def stream(self):
+        args = self._parse_args()
+        store = get_history()
+        if args.delete is not None:
+            if not store.delete(args.delete):
+                yield CommandOutput(stderr = f"{args.delete}: history position out of range\n", errcode = 1)
+            return
+        if args.search is not None:
+            entries = store.search(args.search)
+        elif args.n is not None:
+            entries = iter(store.tail(args.n))
+        else:
+            entries = reversed(list(store.reverse()))
+        for number, line in entries:
+            yield f"{number} {line}\n"
+
+class JournalStepCommand(cmds.ExecutableCommand):
+    """
+    Base of undo and redo: applies N steps of journal(see extra.journal)
+    """
+    def _parse_args(self) -> int:
+        return self.parse_args().n
+
+    @abstractmethod
+    def step(self, journal: Journal) -> Transaction | None:
+        """
+        Applies one step
+        :return: applied transaction or None if there is nothing to apply
+        """
 
     def execute(self):
-        cur_frame = inspect.currentframe()
-        f_back = cur_frame.f_back
-        while not getattr(f_back.f_locals["self"], 'cmd_map', None):
-            f_back = f_back.f_back
+        n = self._parse_args()
+        if n < 1:
+            return CommandOutput(stderr = f"{n}: invalid number of steps\n", errcode = 4)
+        journal = get_journal()
         out = CommandOutput()
-        caller = f_back.f_back.f_locals["self"]
-
-        undoable = list(
-            filter(
-                lambda x: bool(
-                    getattr(caller.cmd_map[x].cmd, "undo", None)
-                ), caller.cmd_map.keys()
-            )
-        )
-
-        with open(cst.HISTORY_PATH, "r", encoding='utf-8') as file:
-            history = file.readlines()
-            history_rev = history[::-1]
-        num_to_delete = None
-        for num, hist in enumerate(history_rev):
-            hist = hist[:-1]
-            name = hist.split(" ")[0]
-            if name in undoable:
-                try:
-                    args = caller.shlex_split(hist)[1:]
-                    if "--help" in args:
-                        continue
-                    cmd = caller.cmd_map[name].cmd(args)
-                    cmd.undo()
-                    num_to_delete = num
-                    break
-                except Exception as e:
-                    out.stderr +=f"{e}: {hist}\n"
-                    continue
-        if num_to_delete:
-            with open(cst.HISTORY_PATH, "w", encoding='utf-8') as file:
-                for line in history_rev[:num_to_delete]+history_rev[num_to_delete+1:]:
-                    file.write(line)
+        for i in range(n):
+            try:
+                tx = self.step(journal)
+            except JournalError as e:
+                out.stderr += f"cannot {self.name} {e.message}\n"
+                out.errcode = 1
+                break
+            if tx is None:
+                if not i:
+                    out.stderr += f"nothing to {self.name}\n"
+                    out.errcode = 1
+                break
+            for path in tx.lost:
+                out.stderr += f"cannot {self.name} '{tx.line}': {path}: removed from trash\n"
+                out.errcode = 1
+            self.logger.info(f"{self.name}: '{tx.line}'")
         return out
 
+
+@cmd_register.command("undo", positionals = [Positional("n", int, "?", 1)])
+class UndoCommand(JournalStepCommand):
+    def step(self, journal: Journal) -> Transaction | None:
+        return journal.undo()
+
+
+@cmd_register.command("redo", positionals = [Positional("n", int, "?", 1)])
+class RedoCommand(JournalStepCommand):
+    def step(self, journal: Journal) -> Transaction | None:
+        return journal.redo()
+
 @cmd_register.command("exit")
 class ExitCommand(cmds.ExecutableCommand):
     def _parse_args(self) -> int | None:
@@ -475,6 +1093,8 @@ class ExitCommand(cmds.ExecutableCommand):
     def execute(self):
         code = self._parse_args()
         if code is not None:
-            shutil.rmtree(cst.TRASH_PATH)
-            cst.TRASH_PATH.mkdir(parents=True, exist_ok=True)
+            # entries are only renamed to purge directory, collector deletes them in background
+            for trash_root in trash.all_trashes():
+                trash_root.purge()
+            get_journal().clear()
             return exit(code)
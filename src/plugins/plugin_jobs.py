@@ -0,0 +1,83 @@
+"""Plugin to manage background jobs(started with '&'): jobs, wait, fg"""
+from src.cmd_types.commands import ExecutableCommand
+from src.cmd_types.output import CommandOutput
+from src.decorators import commands_register as cmd_register
+
+__author__ = "default"
+__version__ = "1.0.0"
+
+
+class JobsControlCommand(ExecutableCommand):
+    """
+    Command class to control jobs by their ids
+    """
+    def _parse_args(self) -> list[int] | None:
+        try:
+            return [int(arg.lstrip("%")) for arg in self.args]
+        except ValueError:
+            return None
+
+    def _get_jobs(self, session) -> tuple[list, CommandOutput]:
+        """
+        Gets jobs by ids passed in args
+        :param session: session that runs jobs
+        :return: found jobs, errors for not found ones
+        """
+        ids = self._parse_args()
+        errs = CommandOutput()
+        if ids is None:
+            return [], CommandOutput(stderr = "job id must be an integer\n", errcode = 2)
+        jobs = []
+        for job_id in ids:
+            job = session.jobs.get(job_id)
+            if job:
+                jobs.append(job)
+            else:
+                errs += CommandOutput(stderr = f"%{job_id}: no such job\n", errcode = 127)
+        return jobs, errs
+
+
+@cmd_register.command("jobs", read_only = True)
+class JobsCommand(ExecutableCommand):
+    def _parse_args(self):
+        return None
+
+    def execute(self):
+        session = self.get_session()
+        out = ""
+        for job in session.jobs.list_jobs():
+            out += f"[{job.job_id}]  {job.status}\t{job.line}\n"
+        return CommandOutput(stdout = out)
+
+
+@cmd_register.command("wait")
+class WaitCommand(JobsControlCommand):
+    def execute(self):
+        session = self.get_session()
+        jobs, out = self._get_jobs(session)
+        if not self.args:
+            jobs = None
+        for job in session.jobs.wait(jobs):
+            out += job.report()
+        return out
+
+
+@cmd_register.command("fg")
+class FgCommand(JobsControlCommand):
+    def execute(self):
+        session = self.get_session()
+        if not self.args:
+            job = session.jobs.get()
+            if not job:
+                return CommandOutput(stderr = "no current job\n", errcode = 1)
+            jobs, errs = [job], CommandOutput()
+        else:
+            jobs, errs = self._get_jobs(session)
+        if errs.errcode or not jobs:
+            return errs
+        if len(jobs) > 1:
+            return CommandOutput(stderr = "too many arguments\n", errcode = 4)
+        job = session.jobs.wait(jobs)[0]
+        out = CommandOutput(stdout = f"{job.line}\n")
+        out += job.output
+        return out
@@ -1,17 +1,23 @@
 """Plugin to manage plugins"""
-import inspect
+import subprocess
+import sys
+from pathlib import Path
+
 from src.cmd_types.commands import ExecutableCommand
 from src.cmd_types.output import CommandOutput
 from src.decorators import commands_register as cmd_register
+from src.extra.plugins_loader import PluginsWatcher
+from src.extra.profiling import StartupProfile
 
 __author__ = "default"
 __version__ = "1.0.0"
 
-@cmd_register.command("plugins", flags=["-s"])
+@cmd_register.command("plugins", flags=["-s", "-j"])
 class PluginsCommand(ExecutableCommand):
     def _parse_args(self):
         flags = self.parse_flags()
         strict = flags["-s"]
+        self.json_output = flags["-j"]
         if not self.args:
             return "help", strict
 
@@ -24,20 +30,51 @@ class PluginsCommand(ExecutableCommand):
 
     @cmd_register.display_in_help()
     def reload(self, strict):
-        """Reloads plugins. --strict to raise error when failed to import"""
+        """Reloads changed plugins. --strict to raise error when failed to import"""
+        session = self.get_session()
 
-        caller_frame = inspect.currentframe().f_back
+        self.logger.debug("Reloading plugins...")
 
-        while not getattr(caller_frame.f_locals["self"], "load_modules", None):
-            caller_frame = caller_frame.f_back
+        changed = session.reload_modules(strict)
 
-        caller_obj = caller_frame.f_locals["self"]
+        self.logger.debug("Done reloading plugins")
+        if not changed:
+            return CommandOutput(stdout="No plugins changed\n")
+        return CommandOutput(stdout="".join(f"Reloaded {module}\n" for module in changed))
 
-        self.logger.debug("Reloading plugins...")
+    @cmd_register.display_in_help()
+    def watch(self, strict):
+        """Reloads changed plugins in background until 'plugins unwatch'"""
+        session = self.get_session()
+        if session.plugins_watcher is not None:
+            return CommandOutput(stderr="plugins are already watched\n", errcode=1)
+        session.plugins_watcher = PluginsWatcher(lambda: session.reload_modules(strict))
+        session.plugins_watcher.start()
+        return CommandOutput(stdout=f"Watching plugins every {session.plugins_watcher.interval}s\n")
 
-        caller_obj.load_modules(strict)
+    @cmd_register.display_in_help()
+    def unwatch(self, strict):
+        """Stops watching plugins"""
+        session = self.get_session()
+        if session.plugins_watcher is None:
+            return CommandOutput(stderr="plugins are not watched\n", errcode=1)
+        session.plugins_watcher.stop()
+        session.plugins_watcher = None
+        return CommandOutput()
 
-        self.logger.debug("Done reloading plugins")
+    @cmd_register.display_in_help()
+    def profile(self, strict):
+        """Profiles startup and plugins imports in a fresh interpreter. -j for JSON output"""
+        root = Path(__file__).resolve().parents[2]
+        proc = subprocess.run(
+            [sys.executable, "-m", "src.main", "--profile-startup", "json"],
+            cwd=root, capture_output=True, text=True
+        )
+        if proc.returncode:
+            return CommandOutput(stderr=proc.stderr or f"profiling failed with code {proc.returncode}\n", errcode=1)
+        if self.json_output:
+            return CommandOutput(stdout=proc.stdout)
+        return CommandOutput(stdout=StartupProfile.from_json(proc.stdout).to_table())
 
     def execute(self):
         action, strict = self._parse_args()
@@ -0,0 +1,71 @@
+"""Plugin to manage trash of removed files: trash ls, trash purge. Commands cover trash roots of all devices"""
+import time
+
+from src.cmd_types.commands import ExecutableCommand
+from src.cmd_types.output import CommandOutput
+from src.decorators import commands_register as cmd_register
+from src.extra import utils
+from src.extra.trash import TrashEntry, Trash, all_trashes
+
+__author__ = "default"
+__version__ = "1.0.0"
+
+@cmd_register.command("trash")
+class TrashCommand(ExecutableCommand):
+    def _parse_args(self) -> tuple[str, list[str]]:
+        if not self.args:
+            return "ls", []
+        return self.args[0], self.args[1:]
+
+    @staticmethod
+    def _entries() -> list[tuple[Trash, TrashEntry]]:
+        """Entries of all trash roots from the oldest one"""
+        entries = [(trash, entry) for trash in all_trashes() for entry in trash.entries()]
+        entries.sort(key=lambda item: item[1].time)
+        return entries
+
+    @cmd_register.display_in_help()
+    def ls(self, ids: list[str]):
+        """Lists entries of trash from the oldest one: id, size, time of removal, name"""
+        trashes = all_trashes()
+        entries = self._entries()
+        out = "".join(
+            f"{entry.id[:8]} {utils.human_size(entry.size):>6} "
+            f"{time.strftime('%b %d %H:%M', time.localtime(entry.time))} {entry.path.name}\n"
+            for _, entry in entries
+        )
+        if len(trashes) > 1:
+            out += "".join(f"root {trash.root}\n" for trash in trashes)
+        total = sum(entry.size for _, entry in entries)
+        quota = f" of {utils.human_size(trashes[0].max_bytes)} per root" if trashes[0].max_bytes else ""
+        return CommandOutput(stdout=out + f"total {utils.human_size(total)}{quota}\n")
+
+    @cmd_register.display_in_help()
+    def purge(self, ids: list[str]):
+        """Deletes entries with given ids(or prefixes of them) in background. Without ids, deletes all entries"""
+        if not ids:
+            for trash in all_trashes():
+                trash.purge()
+            return CommandOutput()
+        out = CommandOutput()
+        known = self._entries()
+        for prefix in ids:
+            found = [(trash, entry) for trash, entry in known if entry.id.startswith(prefix)]
+            if len(found) != 1:
+                reason = "no such entry" if not found else "ambiguous id"
+                out += CommandOutput(stderr=f"{prefix}: {reason}\n", errcode=1)
+                continue
+            trash, entry = found[0]
+            trash.purge([entry.id])
+        return out
+
+    def execute(self):
+        action, ids = self._parse_args()
+
+        f = getattr(self, action, None)
+
+        if getattr(f, "__display_help__", False):
+            return f(ids)
+
+        msg = f"Unknown action: {action}\n"
+        return CommandOutput(stderr=msg, errcode=1)
@@ -0,0 +1,58 @@
+import pytest
+
+from src.cmd_types.arguments import ArgumentsError, CompiledParser, Option, Positional
+
+PARSER = CompiledParser(
+    options = (
+        Option("-i", "--ignore-case"),
+        Option("-r", "--recursive"),
+        Option("-n", "--lines", type = int, default = 10),
+        Option("-e", "--regexp", type = str, multiple = True),
+    ),
+    positionals = (Positional("pattern", nargs = "?"), Positional("paths", nargs = "*")),
+)
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["-ir", "a", "b"], {"ignore_case": True, "recursive": True, "pattern": "a", "paths": ["b"]}),
+        (["a", "-n5"], {"lines": 5, "pattern": "a", "paths": []}),
+        (["-n", "5", "--lines=7"], {"lines": 7, "pattern": None}),
+        (["-e", "x", "--regexp", "y", "-ie", "z"], {"regexp": ["x", "y", "z"], "ignore_case": True}),
+        (["--", "-r", "-"], {"recursive": False, "pattern": "-r", "paths": ["-"]}),
+        (["-5", "--help"], {"pattern": "-5", "help": True}),
+    ]
+)
+def test_parse(argv, expected):
+    parsed = vars(PARSER.parse(argv))
+    assert {k: parsed[k] for k in expected} == expected
+
+@pytest.mark.parametrize(
+    "argv, message",
+    [
+        (["-x"], "invalid option -- 'x'"),
+        (["--bogus"], "unrecognized option '--bogus'"),
+        (["-n"], "option requires an argument -- 'n'"),
+        (["--lines=abc"], "invalid value for --lines: 'abc'"),
+        (["--recursive=1"], "option '--recursive' doesn't allow an argument"),
+    ]
+)
+def test_parse_errors(argv, message):
+    with pytest.raises(ArgumentsError, match=message):
+        PARSER.parse(argv)
+
+def test_positionals_count():
+    parser = CompiledParser(positionals = (Positional("n", int), Positional("rest", nargs = "+")))
+    assert vars(parser.parse(["1", "a", "b"]))["rest"] == ["a", "b"]
+    with pytest.raises(ArgumentsError, match="missing argument: rest"):
+        parser.parse(["1"])
+    with pytest.raises(ArgumentsError, match="invalid value for n"):
+        parser.parse(["x", "a"])
+
+def test_command_parse_error(session_with_file_structure):
+    session, _, _ = session_with_file_structure
+    result = session.execute_command("grep -x Hello file1.txt")
+    assert result.errcode == 4
+    assert result.stderr == "invalid option -- 'x'\n"
+    assert session.execute_command("grep -ri hello .").stdout.count("\n") == 2
@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+
+from src.command_line_session import PIPE_OPERATORS, SEQUENCE_OPERATORS
+from src.extra.completion import Completer, DirectoryCache, history_lines
+from src.extra.history import get_history
+
+
+def completer(session):
+    return Completer(session, SEQUENCE_OPERATORS + PIPE_OPERATORS)
+
+def test_complete_commands_and_flags(session):
+    c = completer(session)
+    assert c.matches("hi", 0, "hi") == ["history "]
+    assert "redo " in c.matches("ls; re", 4, "re")
+    assert c.matches("cat a | gr", 8, "gr") == ["grep "]
+    assert c.matches("ls --h", 3, "--h") == ["--help ", "--human-readable "]
+
+def test_complete_paths(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    (Path(temp_dir) / ".hidden").write_text("")
+    c = completer(session)
+    assert c.matches("cat fi", 4, "fi") == ["file1.txt", "file2.txt"]
+    assert c.matches("cd d", 3, "d") == ["dir1/", "dir2/"]
+    assert c.matches("ls dir2/s", 3, "dir2/s") == ["dir2/subdir/"]
+    assert c.matches("cat .h", 4, ".h") == [".hidden"]
+    assert c.matches("cat ", 4, "") == sorted(["dir1/", "dir2/", *structure])
+    assert c.matches(f"ls {temp_dir}/e", 3, f"{temp_dir}/e") == [f"{temp_dir}/empty.txt"]
+
+def test_directory_cache_invalidated_by_mtime(tmp_path):
+    cache = DirectoryCache(max_dirs=1)
+    (tmp_path / "a").write_text("")
+    first = cache.listing(tmp_path)
+    assert first == ["a"]
+    assert cache.listing(tmp_path) is first
+
+    (tmp_path / "b").write_text("")
+    os.utime(tmp_path, ns=(0, 1))
+    assert cache.complete(tmp_path, "") == ["a", "b"]
+
+    cache.listing(tmp_path / "missing")
+    assert cache.listing(tmp_path / "missing") == []
+    assert cache.complete(tmp_path, "b") == ["b"]
+
+def test_history_lines_capped():
+    store = get_history()
+    for i in range(5):
+        store.append(f"echo {i}")
+    assert history_lines(3) == ["echo 2", "echo 3", "echo 4"]
@@ -0,0 +1,21 @@
+from src.decorators import handlers
+
+
+def test_command_context(session_in_temp_dir):
+    session, _ = session_in_temp_dir
+    cmd = session.create_command("ls")
+    assert cmd.get_session() is session
+    assert cmd.ctx.cwd == session.cwd
+    assert cmd.ctx.logger is cmd.logger
+
+    cmd.cwd = cmd.cwd.parent
+    assert cmd.ctx.cwd == session.cwd.parent
+
+def test_handlers_without_command():
+    @handlers.handle_all_default
+    def fail(path: str):
+        raise FileNotFoundError(2, "File not found", path)
+
+    out = fail("missing")
+    assert out.errcode == 2
+    assert out.stderr == "missing: no such file or directory\n"
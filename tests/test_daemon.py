@@ -0,0 +1,45 @@
+import os
+import threading
+
+import pytest
+
+from src import client
+from src.command_line_session import CommandLineSession
+from src.daemon import ShellDaemon
+
+
+@pytest.fixture
+def daemon(temp_dir):
+    """Daemon serving on socket in tmp dir"""
+    server = ShellDaemon(CommandLineSession(), os.path.join(temp_dir, "d.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_daemon_argv(daemon, session_with_file_structure, capsys, monkeypatch):
+    session, temp_dir, structure = session_with_file_structure
+    monkeypatch.chdir(temp_dir)
+
+    errcode = client.run({"argv": ["cat", "file1.txt"]}, str(daemon.socket_path))
+    assert errcode == 0
+    assert "Hello World" in capsys.readouterr().out
+
+def test_daemon_line(daemon, session_with_file_structure, capsys, monkeypatch):
+    session, temp_dir, structure = session_with_file_structure
+    monkeypatch.chdir(temp_dir)
+
+    errcode = client.run({"line": "cat nonexistent.txt || cat file2.txt | wc -l"}, str(daemon.socket_path))
+    captured = capsys.readouterr()
+    assert errcode == 0
+    assert captured.out.strip() == "2"
+    assert "nonexistent.txt" in captured.err
+
+def test_daemon_exit_code(daemon, temp_dir, monkeypatch):
+    monkeypatch.chdir(temp_dir)
+
+    errcode = client.run({"line": "exit 3"}, str(daemon.socket_path))
+    assert errcode == 3
+    assert client.run({"argv": ["not_a_command"]}, str(daemon.socket_path)) == 127
@@ -40,7 +40,7 @@ def test_rm_parent(session_with_file_structure):
     session, temp_dir, structure = session_with_file_structure
     r_remove = session.execute_command("rm -r ..")
     assert r_remove.errcode != 0
-    assert str(Path('..').resolve()) in r_remove.stderr
+    assert str((Path(temp_dir) / '..').resolve()) in r_remove.stderr
     result = session.execute_command("ls")
     for file in structure:
         assert file in result.stdout
@@ -0,0 +1,203 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def tree(session_in_temp_dir):
+    """Session in directory with nested files, every file has one matching line"""
+    session, temp_dir = session_in_temp_dir
+    files = ["b.txt", "a/z.txt", "a/b/c.txt", "a/b/d.txt", "c/x.txt", "a.txt"]
+    for i, name in enumerate(files):
+        path = os.path.join(temp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"skip\nneedle {i}\nskip\n")
+    return session, temp_dir
+
+
+def _names(stdout: str) -> list[str]:
+    return [line.split("\t")[0] for line in stdout.splitlines()]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_grep_recursive_order(tree, monkeypatch, jobs):
+    session, temp_dir = tree
+    monkeypatch.setattr("src.constants.GREP_BATCH", 2)
+
+    res = session.execute_command(f"grep -r -j {jobs} needle .")
+    assert res.errcode == 0
+    assert _names(res.stdout) == ["a/b/c.txt", "a/b/d.txt", "a/z.txt", "a.txt", "b.txt", "c/x.txt"]
+    assert "a/b/c.txt\t 2 needle 2\n" in res.stdout
+
+
+def test_grep_pool_is_reused(tree, monkeypatch):
+    import src.extra.grep as grep
+    session, temp_dir = tree
+    monkeypatch.setattr("src.constants.GREP_BATCH", 1)
+
+    session.execute_command("grep -r -j 2 needle .")
+    pool = grep._pools[2]
+    assert _names(session.execute_command("grep -r -j 2 needle a").stdout) == ["a/b/c.txt", "a/b/d.txt", "a/z.txt"]
+    assert grep._pools[2] is pool
+
+
+def test_grep_errors_keep_their_places(tree, monkeypatch):
+    session, temp_dir = tree
+    monkeypatch.setattr("src.constants.GREP_BATCH", 1)
+
+    res = session.execute_command("grep -j 2 needle b.txt missing.txt c a.txt")
+    assert _names(res.stdout) == ["b.txt", "a.txt"]
+    assert "missing.txt: no such file or directory" in res.stderr
+    assert "'-r' flag was not specified" in res.stderr
+    assert res.errcode == 2
+
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_query_engine():
+    from src.extra.grep import Query
+
+    assert Query(["foo|ba[rz]+$"]).bytes_searcher is not None
+    for pattern in ["f.o", r"\w+", "[^a]", r"\bfoo", "привет", r"ф"]:
+        assert Query([pattern]).bytes_searcher is None
+
+
+@pytest.mark.parametrize("block", [4, 1 << 20])
+def test_grep_bytes_and_text(session_in_temp_dir, monkeypatch, block):
+    session, temp_dir = session_in_temp_dir
+    monkeypatch.setattr("src.constants.GREP_BLOCK_SIZE", block)
+    _write(os.path.join(temp_dir, "f.txt"), "abc\n\udcff hello\nпривет мир\n\nend hello\r\na \nb".encode("utf-8", "surrogateescape"))
+
+    assert session.execute_command("grep hello f.txt").stdout == "f.txt\t 2 � hello\nf.txt\t 5 end hello\n"
+    assert session.execute_command(r"grep '\w+ мир' f.txt").stdout == "f.txt\t 3 привет мир\n"
+    assert session.execute_command("grep -i ПРИВЕТ f.txt").stdout == "f.txt\t 3 привет мир\n"
+    assert session.execute_command("grep '^$' f.txt").stdout == "f.txt\t 4 \n"
+    # lines never match across newline
+    assert session.execute_command(r"grep 'a\sb' f.txt").stdout == ""
+    assert session.execute_command("grep 'a[ ]$' f.txt").stdout == "f.txt\t 6 a \n"
+
+
+def test_grep_binary(session_in_temp_dir, monkeypatch):
+    session, temp_dir = session_in_temp_dir
+    monkeypatch.setattr("src.constants.GREP_BINARY_PROBE", 8)
+    _write(os.path.join(temp_dir, "head.bin"), b"\0 hello\n")
+    _write(os.path.join(temp_dir, "late.bin"), b"hello there\n" * 3 + b"hello\0\n")
+
+    for name in ["head.bin", "late.bin"]:
+        assert session.execute_command(f"grep hello {name}").stdout == f"{name}: binary file matches\n"
+        assert session.execute_command(f"grep -I hello {name}").stdout == ""
+    assert session.execute_command("grep -a hello head.bin").stdout == "head.bin\t 1 \0 hello\n"
+    assert session.execute_command("grep nothing head.bin").stdout == ""
+
+
+def test_literals_pattern():
+    import random
+    import re
+    from src.extra.grep import literals_pattern
+
+    rng = random.Random(0)
+    needles = ["".join(rng.choices("ab.", k=rng.randint(1, 4))) for _ in range(30)] + ["a", "ab"]
+    texts = ["".join(rng.choices("ab.c", k=8)) for _ in range(300)]
+    for pattern, empty in ((literals_pattern(needles, ""), ""), (literals_pattern([n.encode() for n in needles], b""), b"")):
+        regex = re.compile(pattern)
+        for text in texts:
+            data = text if empty == "" else text.encode()
+            expected = any(needle in text for needle in needles)
+            assert bool(regex.search(data)) == expected, (pattern, text)
+
+
+def test_grep_fixed_and_many_patterns(session_in_temp_dir):
+    session, temp_dir = session_in_temp_dir
+    _write(os.path.join(temp_dir, "f.txt"), "a.b\naxb\nпривет\nHello\n".encode())
+    _write(os.path.join(temp_dir, "patterns"), "a.b\nпри\n".encode())
+
+    assert session.execute_command("grep -F a.b f.txt").stdout == "f.txt\t 1 a.b\n"
+    assert session.execute_command("grep a.b f.txt").stdout == "f.txt\t 1 a.b\nf.txt\t 2 axb\n"
+    assert session.execute_command("grep -e axb -e привет f.txt").stdout == "f.txt\t 2 axb\nf.txt\t 3 привет\n"
+    assert session.execute_command("grep -F -f patterns f.txt").stdout == "f.txt\t 1 a.b\nf.txt\t 3 привет\n"
+    assert session.execute_command("grep -Fi -e ПРИВ -e hello f.txt").stdout == "f.txt\t 3 привет\nf.txt\t 4 Hello\n"
+    assert session.execute_command("cat f.txt | grep -F -e x -e Hel").stdout == "axb\nHello\n"
+
+    _write(os.path.join(temp_dir, "empty"), b"")
+    for fixed in ["", "-F"]:
+        res = session.execute_command(f"grep {fixed} -f empty f.txt")
+        assert (res.stdout, res.errcode) == ("", 1)
+        assert session.execute_command(f"grep {fixed} -v -f empty f.txt").stdout.count("f.txt") == 4
+
+    assert session.execute_command("grep -e 'a(' -e b f.txt").stderr.strip() == "invalid regular expression 'a('"
+    assert session.execute_command("grep -f missing f.txt").errcode == 2
+    assert session.execute_command("grep").errcode == 4
+
+
+@pytest.mark.parametrize("block", [4, 1 << 20])
+def test_grep_patterns_with_groups(session_in_temp_dir, monkeypatch, block):
+    session, temp_dir = session_in_temp_dir
+    monkeypatch.setattr("src.constants.GREP_BLOCK_SIZE", block)
+    _write(os.path.join(temp_dir, "c.txt"), "xy\nbb\nab\nBB\nfoo bar\nпп\n".encode())
+
+    assert session.execute_command(r"grep -e '(x)y' -e '(b)\1' c.txt").stdout == "c.txt\t 1 xy\nc.txt\t 2 bb\n"
+    assert session.execute_command(r"grep -e '(x)y' -e '(п)\1' c.txt").stdout == "c.txt\t 1 xy\nc.txt\t 6 пп\n"
+    assert session.execute_command("grep -c -e '(?P<g>b)' -e '(?P<g>x)' c.txt").stdout == "c.txt\t 4\n"
+    assert session.execute_command("grep -w -e foo -e '(?i)BB' c.txt").stdout == \
+        "c.txt\t 2 bb\nc.txt\t 4 BB\nc.txt\t 5 foo bar\n"
+    assert session.execute_command(r"cat c.txt | grep -v -e '(x)y' -e '(b)\1'").stdout == "ab\nBB\nfoo bar\nпп\n"
+
+
+def test_any_of_finds_earliest_match():
+    import re
+    from src.extra.grep import AnyOf, matched_lines
+
+    text = "".join(f"{i} {'a' * (i % 3)}{'b' * (i % 5 == 0)}\n" for i in range(50))
+    any_of = AnyOf([re.compile(r"(a)\1", re.M), re.compile(r"(b)", re.M)])
+    joined = re.compile(r"aa|b", re.M)
+    assert list(matched_lines(text, any_of)) == list(matched_lines(text, joined))
+
+
+@pytest.fixture
+def words(session_in_temp_dir):
+    session, temp_dir = session_in_temp_dir
+    _write(os.path.join(temp_dir, "w.txt"), "foo bar\nfoobar\nbar foo\nbaz\nпривет foo\nfooп".encode())
+    _write(os.path.join(temp_dir, "n.txt"), b"nothing\n")
+    return session, temp_dir
+
+
+@pytest.mark.parametrize("fixed", ["", "-F"])
+def test_grep_word_and_invert(words, fixed):
+    session, temp_dir = words
+
+    assert session.execute_command(f"grep {fixed} -w foo w.txt").stdout == \
+        "w.txt\t 1 foo bar\nw.txt\t 3 bar foo\nw.txt\t 5 привет foo\n"
+    assert session.execute_command(f"grep {fixed} -v foo w.txt").stdout == "w.txt\t 4 baz\n"
+    assert session.execute_command(f"grep {fixed} -vw foo w.txt").stdout == "w.txt\t 2 foobar\nw.txt\t 4 baz\nw.txt\t 6 fooп\n"
+    assert session.execute_command(f"cat w.txt | grep {fixed} -w foo").stdout == "foo bar\nbar foo\nпривет foo\n"
+
+
+def test_grep_count_files_max(words):
+    session, temp_dir = words
+
+    assert session.execute_command("grep -c foo w.txt n.txt").stdout == "w.txt\t 5\nn.txt\t 0\n"
+    assert session.execute_command("grep -c -m 2 foo w.txt").stdout == "w.txt\t 2\n"
+    assert session.execute_command("grep -m 1 -v foo w.txt").stdout == "w.txt\t 4 baz\n"
+    assert session.execute_command("grep -rl bar .").stdout == "w.txt\n"
+    assert session.execute_command("cat w.txt | grep -c foo").stdout == "5\n"
+    assert session.execute_command("cat w.txt | grep -l baz").stdout == "(standard input)\n"
+
+
+def test_grep_quiet_and_status(words, monkeypatch):
+    session, temp_dir = words
+    scanned = []
+    import src.extra.grep as grep
+    scan = grep.scan
+    monkeypatch.setattr(grep, "scan", lambda path, query: scanned.append(path.name) or scan(path, query))
+
+    res = session.execute_command("grep -q foo w.txt n.txt")
+    assert (res.stdout, res.errcode) == ("", 0)
+    assert scanned == ["w.txt"]
+    assert session.execute_command("grep -q zzz w.txt").errcode == 1
+    assert session.execute_command("grep zzz w.txt").errcode == 1
+    assert session.execute_command("grep -m 0 foo w.txt").errcode == 1
+    assert session.execute_command("grep zzz missing.txt").errcode == 2
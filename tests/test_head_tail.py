@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+
+LINES = "".join(f"line {i}\n" for i in range(1, 31))
+
+
+@pytest.fixture
+def log_file(session_in_temp_dir, monkeypatch):
+    """Session and file of 30 lines. Blocks are small, so lines cross their boundaries"""
+    session, temp_dir = session_in_temp_dir
+    monkeypatch.setattr("src.constants.TAIL_BLOCK_SIZE", 7)
+    path = os.path.join(temp_dir, "log.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(LINES)
+    return session, path
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 10, 29, 30, 31])
+def test_head_tail_lines(log_file, n):
+    session, path = log_file
+    lines = LINES.splitlines(keepends=True)
+
+    assert session.execute_command(f"head -n {n} log.txt").stdout == "".join(lines[:n])
+    assert session.execute_command(f"tail -n {n} log.txt").stdout == "".join(lines[-n:] if n else [])
+    assert session.execute_command(f"cat log.txt | tail -n {n}").stdout == "".join(lines[-n:] if n else [])
+    assert session.execute_command(f"cat log.txt | head -n {n}").stdout == "".join(lines[:n])
+
+
+def test_head_tail_bytes_and_defaults(log_file):
+    session, path = log_file
+
+    assert session.execute_command("head -c 9 log.txt").stdout == LINES[:9]
+    assert session.execute_command("tail -c 9 log.txt").stdout == LINES[-9:]
+    assert session.execute_command("cat log.txt | tail -c 9").stdout == LINES[-9:]
+    assert session.execute_command("tail -c 1000 log.txt").stdout == LINES
+    assert session.execute_command("tail log.txt").stdout == "".join(LINES.splitlines(keepends=True)[-10:])
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("no newline")
+    assert session.execute_command("tail -n 2 log.txt").stdout == "line 30\nno newline"
+
+
+def test_head_tail_many_files_and_errors(log_file):
+    session, path = log_file
+    with open(os.path.join(os.path.dirname(path), "short.txt"), "w", encoding="utf-8") as f:
+        f.write("only\n")
+
+    res = session.execute_command("tail -n 1 log.txt short.txt")
+    assert res.stdout == "==> log.txt <==\nline 30\n\n==> short.txt <==\nonly\n"
+
+    res = session.execute_command("head nope.txt")
+    assert res.errcode == 2 and "nope.txt" in res.stderr
+    assert session.execute_command("tail -n -1 log.txt").errcode == 4
+    assert session.execute_command("tail").errcode == 4
+
+
+def test_tail_follow(log_file, monkeypatch):
+    session, path = log_file
+    steps = iter([
+        lambda: open(path, "a", encoding="utf-8").close(),
+        lambda: _write(path, "a", "appended\n"),
+        lambda: _write(path, "w", "new\n"),
+    ])
+
+    def sleep(_):
+        step = next(steps, None)
+        if step is None:
+            raise KeyboardInterrupt
+        step()
+
+    monkeypatch.setattr("src.plugins.plugin_default.time.sleep", sleep)
+
+    res = session.execute_command("tail -n 1 -f log.txt")
+    assert res.stdout == "line 30\nappended\nnew\n"
+    assert "file truncated" in res.stderr
+    assert res.errcode == 130
+
+
+def test_interrupt_does_not_stop_session(session, monkeypatch):
+    def interrupted(cmd):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(session, "execute_command", interrupted)
+    assert session.run_line("tail -f log.txt") == 130
+
+
+def _write(path, mode, text):
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
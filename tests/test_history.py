@@ -0,0 +1,50 @@
+from src.extra.history import HistoryStore
+
+
+def test_group_commit_and_tail(tmp_path):
+    store = HistoryStore(tmp_path / "history", flush_entries=3, flush_interval=60)
+    store.append("ls")
+    store.append("cd dir")
+    assert not (tmp_path / "history").exists() or (tmp_path / "history").read_text() == ""
+    store.append("cat a")
+    assert (tmp_path / "history").read_text() == "ls\ncd dir\ncat a\n"
+
+    store.append("grep a b")
+    assert store.tail(2) == [(3, "cat a"), (4, "grep a b")]
+    assert store.get(2) == "cd dir"
+    assert len(store) == 4
+
+def test_tombstones_and_search(tmp_path):
+    store = HistoryStore(tmp_path / "history", flush_entries=1)
+    for line in ("rm a", "ls", "rm b", "ls -l"):
+        store.append(line)
+    assert store.delete(3)
+    assert not store.delete(3)
+    assert not store.delete(10)
+
+    assert (tmp_path / "history").read_text() == "rm a\nls\nrm b\nls -l\n"
+    assert store.tail(3) == [(1, "rm a"), (2, "ls"), (4, "ls -l")]
+    assert list(store.search("rm")) == [(1, "rm a")]
+    assert list(store.search("ls")) == [(2, "ls"), (4, "ls -l")]
+    assert store.get(3) is None
+
+def test_index_catches_up(tmp_path):
+    path = tmp_path / "history"
+    path.write_text("old 1\nold 2\n")
+    store = HistoryStore(path, flush_entries=1)
+    store.append("new")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("other session\n")
+
+    assert store.tail(10) == [(1, "old 1"), (2, "old 2"), (3, "new"), (4, "other session")]
+    assert HistoryStore(path).get(4) == "other session"
+
+def test_history_command(session_in_temp_dir):
+    session, _ = session_in_temp_dir
+    session.execute_command("ls")
+    out = session.execute_command("history 2").stdout.splitlines()
+    assert [line.split(" ", 1)[1] for line in out] == ["ls", "history 2"]
+
+    number = out[0].split(" ")[0]
+    session.execute_command(f"history -d {number}")
+    assert "ls" not in [line.split(" ", 1)[1] for line in session.execute_command("history 3").stdout.splitlines()]
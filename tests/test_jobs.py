@@ -0,0 +1,45 @@
+def test_background_job(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    session.run_line("cat file1.txt &")
+    assert "[1] cat file1.txt" in capsys.readouterr().out
+
+    result = session.execute_command("wait")
+    assert "Done" in result.stdout
+    assert "Hello World" in result.stdout
+    assert not session.jobs.list_jobs()
+
+def test_background_sequence(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    session.run_line("cat nonexistent.txt || cat file2.txt & cat file1.txt")
+    out = capsys.readouterr().out
+    assert "Hello World" in out
+    assert session.errcode == 0
+
+    result = session.execute_command("fg")
+    assert "Another file" in result.stdout
+    assert "cat: nonexistent.txt" in result.stderr
+
+def test_background_job_errcode(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    assert session.run_line("cat nonexistent.txt") != 0
+    assert session.run_line("cat nonexistent.txt &") == 0
+    assert "[1] cat nonexistent.txt" in capsys.readouterr().out
+    session.execute_command("wait")
+
+def test_report_jobs(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    session.run_line("cat nonexistent.txt &")
+    for job in session.jobs.list_jobs():
+        job.future.result()
+    session.report_jobs()
+    captured = capsys.readouterr()
+    assert "Exit 2" in captured.out
+    assert "cat: nonexistent.txt" in captured.err
+
+def test_wait_unknown_job(session):
+    result = session.execute_command("wait 42")
+    assert result.errcode == 127
@@ -1,7 +1,11 @@
+import os
 import pathlib as pl
+import threading
 
 import pytest
 
+from src.command_line_session import CommandLineSession
+
 
 def test_ls_basic(session_with_file_structure):
     session, temp_dir, structure = session_with_file_structure
@@ -22,7 +26,7 @@ def test_cd_absolute_path(session_with_file_structure):
     session, temp_dir, structure = session_with_file_structure
     path = f"{temp_dir}/dir1"
     result = session.execute_command(f"cd {path}")
-    assert pl.Path(path) == pl.Path.cwd()
+    assert pl.Path(path).resolve() == session.cwd
     assert result.errcode == 0
 
 def test_cd_relative_path(session_with_file_structure):
@@ -61,3 +65,97 @@ def test_cat_nonexistent(session_with_file_structure):
     f = "jgjeogkdgsdnaf.txt"
     result = session.execute_command(f"cat {f}")
     assert f in result.stderr
+
+def test_sessions_have_own_cwd(temp_dir):
+    sessions = []
+    for name in ("a", "b"):
+        os.makedirs(os.path.join(temp_dir, name, f"only_in_{name}"))
+        session = CommandLineSession()
+        session.load_modules()
+        session.execute_command(f"cd {temp_dir}/{name}")
+        sessions.append(session)
+    results: dict[str, list[str]] = {"a": [], "b": []}
+
+    def run(session, name):
+        for _ in range(50):
+            results[name].append(session.execute_command("ls").stdout)
+
+    threads = [threading.Thread(target=run, args=(s, n)) for s, n in zip(sessions, ("a", "b"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all("only_in_a" in out for out in results["a"])
+    assert all("only_in_b" in out for out in results["b"])
+
+def test_ls_long(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    (pl.Path(temp_dir) / "with space").write_text("abc")
+
+    lines = session.execute_command("ls -l").stdout.splitlines()
+    assert len(lines) == len(structure) + 3
+    line = next(line for line in lines if "with space" in line)
+    fields = line.split()
+    assert fields[0].startswith("-rw")
+    assert fields[4] == "3"
+    assert line.endswith('"with space" ')
+
+def test_ls_skips_hidden_and_reports_missing(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    (pl.Path(temp_dir) / ".hidden").write_text("")
+
+    assert ".hidden" not in session.execute_command("ls").stdout
+    result = session.execute_command("ls missing")
+    assert result.errcode == 2
+    assert "missing" in result.stderr
+
+def test_ls_recursive_and_all(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    (pl.Path(temp_dir) / "dir2" / ".hidden").write_text("")
+
+    out = session.execute_command("ls -R").stdout
+    assert out.index("dir1:") < out.index("dir2:") < out.index("subdir:") or \
+        out.index("dir2:") < out.index("subdir:") < out.index("dir1:")
+    assert ".hidden" not in out
+    assert ".hidden" in session.execute_command("ls -a dir2").stdout
+
+def test_ls_sort_and_human(session_with_file_structure, monkeypatch):
+    session, temp_dir, structure = session_with_file_structure
+    root = pl.Path(temp_dir)
+    (root / "big").write_bytes(b"x" * 10000)
+    os.utime(root / "empty.txt", (1, 1))
+
+    for workers in (1, 4):
+        monkeypatch.setattr("src.constants.LS_STAT_WORKERS", workers)
+        assert session.execute_command("ls -S").stdout.split()[0] == "big"
+        assert session.execute_command("ls -t").stdout.split()[-1] == "empty.txt"
+    line = next(line for line in session.execute_command("ls -lh").stdout.splitlines() if line.endswith("big "))
+    assert line.split()[4] == "9.8K"
+
+def test_cat_binary_and_errors(session_with_file_structure, monkeypatch):
+    session, temp_dir, structure = session_with_file_structure
+    monkeypatch.setattr("src.constants.CAT_CHUNK_SIZE", 3)
+    (pl.Path(temp_dir) / "bin").write_bytes("zé\n".encode() * 3 + b"\xff\n")
+
+    assert session.execute_command("cat bin").stdout == "zé\n" * 3 + "�\n"
+    assert session.execute_command("cat --errors=ignore bin").stdout == "zé\n" * 3 + "\n"
+    assert session.execute_command("cat --errors=strict bin").errcode == 3
+    assert session.execute_command("cat --errors=nope bin").errcode == 4
+
+def test_cat_number(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    result = session.execute_command("cat -n file1.txt empty.txt file2.txt")
+    lines = result.stdout.splitlines()
+    assert lines[0] == "     1\tHello World"
+    assert lines[2] == "     3\tAnother lineAnother file"
+    assert lines[-1] == "     5\tHello again"
+    assert session.execute_command("cat file1.txt | cat -n").stdout.splitlines()[1] == "     2\tThis is test file"
+
+def test_cat_sends_file_to_descriptor(session_with_file_structure, tmp_path):
+    session, temp_dir, structure = session_with_file_structure
+    data = bytes(range(256)) * 10
+    (pl.Path(temp_dir) / "bin").write_bytes(data)
+    with open(tmp_path / "out", "w", encoding="utf-8") as out:
+        session.output = out
+        session.run_line("cat bin")
+    assert (tmp_path / "out").read_bytes() == data + b"\n"
@@ -0,0 +1,42 @@
+from src.cmd_types.output import CommandOutput
+
+
+def test_output_append():
+    out = CommandOutput()
+    for i in range(1000):
+        out += CommandOutput(stdout=f"{i}\n")
+    out += CommandOutput(stderr="err\n", errcode=2)
+    assert out.stdout.count("\n") == 1000
+    assert out.stderr == "err\n"
+    assert out.errcode == 2
+
+def test_output_lazy():
+    produced = []
+
+    def chunks():
+        for i in range(3):
+            produced.append(i)
+            yield f"{i}\n"
+        yield CommandOutput(stderr="err\n", errcode=3)
+
+    out = CommandOutput.from_stream(chunks())
+    assert not produced
+    consumed = out.consume()
+    assert next(consumed) == ("stdout", "0\n")
+    assert produced == [0]
+    assert list(consumed) == [("stdout", "1\n"), ("stdout", "2\n"), ("stderr", "err\n")]
+    assert out.errcode == 3
+    assert out.stdout == ""
+
+def test_output_materialize():
+    out = CommandOutput(stdout="a\n") + CommandOutput.from_stream(iter(["b\n", "c\n"]))
+    out += "d\n"
+    assert out.stdout == "a\nb\nc\nd\n"
+
+def test_session_streams_output(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+    with open(f"{temp_dir}/big.txt", "w", encoding="utf-8") as f:
+        f.write("line\n" * 1000)
+
+    session.run_line("cat big.txt")
+    assert capsys.readouterr().out == "line\n" * 1000
@@ -1,4 +1,5 @@
 import pytest
+from src.extra.utils import split_operators
 
 @pytest.mark.parametrize(
     "line, parsed",
@@ -35,3 +36,16 @@ def test_name_args_parse(session, args, cmd_name_and_args):
 )
 def test_full_parse(session, line, full_parsed):
     assert session.parse_line(line) == full_parsed
+
+@pytest.mark.parametrize(
+    "line, parts",
+    [
+        ("ls", [("ls", None)]),
+        ("ls; cd a", [("ls", ";"), (" cd a", None)]),
+        ("cd a && ls || cat b", [("cd a ", "&&"), (" ls ", "||"), (" cat b", None)]),
+        ("grep 'a;b' x; ls", [("grep 'a;b' x", ";"), (" ls", None)]),
+        (r'grep "a && b" x\;y', [(r'grep "a && b" x\;y', None)]),
+    ]
+)
+def test_split_operators(line, parts):
+    assert split_operators(line, (";", "&&", "||")) == parts
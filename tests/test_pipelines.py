@@ -0,0 +1,53 @@
+import pytest
+
+
+def test_pipe_cat_grep(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+
+    result = session.execute_command("cat file1.txt file2.txt | grep Hello")
+    assert result.stdout.splitlines() == ["Hello World", "Hello again"]
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("cat file1.txt | wc -l", "2"),
+        ("cat file1.txt file2.txt | grep -i hello | wc -l", "2"),
+        ("cat file1.txt | grep nothing | wc -l", "0"),
+        ("cat file1.txt | cat | cat | wc -w", "8"),
+    ]
+)
+def test_pipe_counts(session_with_file_structure, line, expected):
+    session, temp_dir, structure = session_with_file_structure
+
+    result = session.execute_command(line)
+    assert result.stdout.strip() == expected
+
+def test_pipe_is_lazy(session_with_file_structure, temp_dir, monkeypatch):
+    session, temp_dir, structure = session_with_file_structure
+    monkeypatch.setattr("src.constants.CAT_CHUNK_SIZE", 10)
+    with open(f"{temp_dir}/big.txt", "w", encoding="utf-8") as f:
+        f.write("line\n" * 10000)
+
+    cmd_obj = session.create_command("cat big.txt")
+    stream = cmd_obj.stream()
+    assert next(stream).decode() == "line\n" * 2
+    stream.close()
+
+def test_pipe_upstream_error(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+
+    result = session.execute_command("cat nonexistent.txt file1.txt | wc -l")
+    assert result.stdout.strip() == "2"
+    assert "cat: nonexistent.txt" in result.stderr
+    # errcode of pipeline is errcode of the last command, like in bash without pipefail
+    assert result.errcode == 0
+
+    assert session.execute_command("cat file1.txt | grep zzz").errcode == 1
+    assert session.execute_command("cat nonexistent.txt | grep zzz").errcode == 1
+    assert session.run_line("grep zzz file1.txt | wc -l && cat file1.txt | grep -q Hello") == 0
+
+def test_pipe_syntax_error(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+
+    assert session.execute_command("cat file1.txt |") is None
+    assert session.errcode == 2
@@ -0,0 +1,194 @@
+import os
+import sys
+
+import pytest
+
+import src.constants as cst
+from src.command_line_session import CommandLineSession
+from src.extra.plugins_loader import PluginLoader
+
+PLUGIN_SOURCE = '''
+from src.cmd_types.commands import ExecutableCommand
+from src.cmd_types.output import CommandOutput
+from src.decorators import commands_register as cmd_register
+
+__author__ = "default"
+__version__ = "1.0.0"
+
+@cmd_register.command("hello")
+class HelloCommand(ExecutableCommand):
+    def _parse_args(self):
+        return None
+
+    def execute(self):
+        return CommandOutput(stdout="hello")
+'''
+
+
+@pytest.fixture
+def plugins_pkg(tmp_path, monkeypatch):
+    """Package with plugins that were not imported yet"""
+    name = f"lazy_plugins_{tmp_path.name}"
+    pkg = tmp_path / name
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "plugin_hello.py").write_text(PLUGIN_SOURCE)
+    (pkg / "plugin_broken.py").write_text(PLUGIN_SOURCE.replace('"hello"', '"broken"') + "\nraise RuntimeError('boom')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(cst, "PLUGINS_MANIFEST", tmp_path / "manifest.json")
+    yield name, pkg
+    for module in [m for m in sys.modules if m.startswith(name)]:
+        del sys.modules[module]
+
+
+def test_lazy_loading(plugins_pkg):
+    name, pkg = plugins_pkg
+    loader = PluginLoader(name)
+    loader.load_plugins()
+
+    assert set(loader.commands) == {"hello", "broken"}
+    assert f"{name}.plugin_hello" not in sys.modules
+    assert loader.commands["hello"].cmd([]).execute().stdout == "hello"
+    assert f"{name}.plugin_hello" in sys.modules
+    with pytest.raises(ImportError):
+        _ = loader.commands["broken"].cmd
+
+UNDECORATED_SOURCE = '''
+from src.cmd_types.commands import ExecutableCommand
+from src.cmd_types.output import CommandOutput
+
+__author__ = "default"
+
+class HelloCommand(ExecutableCommand):
+    name = "plain"
+
+    def _parse_args(self):
+        return None
+
+    def execute(self):
+        return CommandOutput(stdout="plain")
+'''
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_undecorated_command_does_not_depend_on_strict(plugins_pkg, strict):
+    name, pkg = plugins_pkg
+    (pkg / "plugin_broken.py").unlink()
+    (pkg / "plugin_plain.py").write_text(UNDECORATED_SOURCE)
+    loader = PluginLoader(name, strict=strict)
+    loader.load_plugins()
+    assert set(loader.commands) == {"hello", "plain"}
+
+
+@pytest.mark.parametrize("source, dynamic", [
+    (PLUGIN_SOURCE, False),
+    (UNDECORATED_SOURCE, True),
+    (PLUGIN_SOURCE + "\nclass Other(HelloCommand):\n    pass\n", True),
+    (PLUGIN_SOURCE + "\nclass Base(ExecutableCommand):\n    pass\n", False),
+    (PLUGIN_SOURCE + "\nfrom other_plugins.plugin_x import XCommand\n", True),
+    (PLUGIN_SOURCE + "\nfrom .plugin_x import XCommand\n", True),
+    (PLUGIN_SOURCE + "\nfrom pathlib import Path\nfrom src.extra.utils import iter_lines\n", False),
+])
+def test_manifest_dynamic(tmp_path, source, dynamic):
+    from src.extra.plugins_manifest import scan_source
+
+    path = tmp_path / "plugin_x.py"
+    path.write_text(source)
+    assert scan_source(path, "plugins.plugin_x").dynamic is dynamic
+
+
+def test_manifest_cache(plugins_pkg):
+    name, pkg = plugins_pkg
+    PluginLoader(name).load_plugins()
+    assert cst.PLUGINS_MANIFEST.exists()
+
+    (pkg / "plugin_hello.py").write_text(PLUGIN_SOURCE.replace('"hello"', '"hi"'))
+    loader = PluginLoader(name)
+    loader.load_plugins()
+    assert "hi" in loader.commands
+    assert "hello" not in loader.commands
+
+def test_broken_plugin_in_session(plugins_pkg):
+    name, pkg = plugins_pkg
+    session = CommandLineSession(plugins_dir=name)
+    session.load_modules()
+
+    assert session.execute_command("broken") is None
+    assert session.errcode == 126
+    assert session.execute_command("hello").stdout == "hello"
+
+def test_reload_only_changed(plugins_pkg):
+    name, pkg = plugins_pkg
+    session = CommandLineSession(plugins_dir=name)
+    session.load_modules()
+    old_map = session.cmd_map
+    hello_meta = session.cmd_map["hello"]
+
+    assert session.reload_modules() == []
+    (pkg / "plugin_broken.py").write_text((pkg / "plugin_broken.py").read_text())
+    assert session.reload_modules() == []
+
+    (pkg / "plugin_broken.py").write_text(PLUGIN_SOURCE.replace('"hello"', '"fixed"'))
+    (pkg / "plugin_new.py").write_text(PLUGIN_SOURCE.replace('"hello"', '"new"'))
+    assert sorted(session.reload_modules()) == [f"{name}.plugin_broken", f"{name}.plugin_new"]
+    assert set(session.cmd_map) == {"hello", "fixed", "new"}
+    assert session.cmd_map["hello"] is hello_meta
+    assert set(old_map) == {"hello", "broken"}
+
+    (pkg / "plugin_new.py").unlink()
+    assert session.reload_modules() == [f"{name}.plugin_new"]
+    assert "new" not in session.cmd_map
+
+def test_reload_non_default_many_times(plugins_pkg):
+    name, pkg = plugins_pkg
+    source = PLUGIN_SOURCE.replace('"default"', '"someone"').replace('command("hello")', 'command("other")')
+    (pkg / "plugin_other.py").write_text(source)
+    session = CommandLineSession(plugins_dir=name)
+    session.load_modules()
+    assert session.cmd_map["other"].plugin_name == "plugin_other"
+
+    for version in range(2, 5):
+        path = pkg / "plugin_other.py"
+        path.write_text(source.replace('stdout="hello"', f'stdout="v{version}"'))
+        # sources have the same size, so mtime must differ for the change to be noticed
+        os.utime(path, ns=(version, version))
+        assert session.reload_modules() == [f"{name}.plugin_other"]
+        assert session.execute_command("other").stdout == f"v{version}"
+
+def test_reloads_are_serialized(plugins_pkg, monkeypatch):
+    import threading
+    import time
+
+    name, pkg = plugins_pkg
+    session = CommandLineSession(plugins_dir=name)
+    session.load_modules()
+    loader = session.plugins_loader
+    reload = loader._reload
+    active = []
+    overlapped = []
+
+    def slow_reload(strict):
+        active.append(strict)
+        overlapped.append(len(active) > 1)
+        time.sleep(0.01)
+        try:
+            return reload(strict)
+        finally:
+            active.pop()
+
+    monkeypatch.setattr(loader, "_reload", slow_reload)
+    threads = [threading.Thread(target=session.reload_modules, args=(i % 2 == 0,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlapped == [False] * 4
+    assert loader.strict is False
+
+def test_loader_handlers_attached_once(plugins_pkg):
+    name, pkg = plugins_pkg
+    logger = PluginLoader(name).logger
+    handlers = list(logger.handlers)
+    loaders = [PluginLoader(name) for _ in range(3)]
+    assert all(loader.logger is logger for loader in loaders)
+    assert logger.handlers == handlers
@@ -0,0 +1,23 @@
+import json
+
+from src.extra.profiling import ImportRecord, StartupProfile
+from src.main import main
+
+
+def test_profile_startup_json(capsys):
+    main(["--profile-startup", "json"])
+    report = json.loads(capsys.readouterr().out)
+
+    assert report["commands"] > 0
+    assert {"logging.basicConfig", "register plugins"} <= set(report["phases"])
+    assert "src.plugins.plugin_default" in {record["module"] for record in report["imports"]}
+    assert report["total"] >= sum(record["seconds"] for record in report["imports"])
+
+def test_profile_table():
+    profile = StartupProfile(phases={"load": 0.5}, imports=[ImportRecord("mod", 0.25, 3)], commands=7)
+    table = profile.to_table()
+
+    assert "500.00" in table
+    assert "mod" in table and "250.00" in table
+    assert table.splitlines()[-1].split() == ["commands", "registered", "7"]
+    assert StartupProfile.from_json(profile.to_json()) == profile
@@ -0,0 +1,40 @@
+from src.cmd_types.meta import CommandMetadata, LazyCommandMetadata
+from src.cmd_types.registry import CommandRegistry
+from src.plugins.plugin_default import LsCommand, RemoveCommand
+
+
+def meta(name, cmd):
+    return CommandMetadata(name, "plugin_default", "default", "1.0.0", cmd)
+
+
+def test_registry_indexes(session):
+    registry = session.cmd_map
+    assert isinstance(registry, CommandRegistry)
+    assert registry.names == sorted(registry)
+    assert registry.help_text == "".join(f"{name}\n" for name in sorted(registry))
+    assert registry.flags("ls")[:3] == ("-l", "-a", "--all")
+    assert registry.is_read_only("cat")
+    assert not registry.is_read_only("rm")
+    assert registry.is_undoable("rm")
+    assert not registry.is_undoable("ls")
+    assert not registry.is_undoable("missing")
+
+def test_registry_patched():
+    ls_meta = meta("ls", LsCommand)
+    registry = CommandRegistry({"ls": ls_meta, "rm": meta("rm", RemoveCommand)})
+    lazy = LazyCommandMetadata("cat", "plugin_default", "default", "1.0.0", "src.plugins.plugin_default", "CatCommand",
+                               read_only=True)
+    patched = registry.patched({"ls": ls_meta, "cat": lazy})
+
+    assert patched.names == ["cat", "ls"]
+    assert registry.names == ["ls", "rm"]
+    assert patched.info("ls") is registry.info("ls")
+    assert patched.is_read_only("cat")
+    assert patched.info("cat").undoable is None
+    assert not patched.is_undoable("cat")
+    assert patched["cat"].loaded
+
+def test_help_table_cached():
+    assert "--help" in LsCommand.help_table()
+    assert LsCommand.help_table() is LsCommand.__dict__["__help_table__"]
+    assert LsCommand([]).help().stdout.startswith(LsCommand.help_table())
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+
+def test_run_line_sequence(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    errcode = session.run_line("cd dir1; ls")
+    assert errcode == 0
+    assert "file" in capsys.readouterr().out
+
+def test_run_line_and(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    errcode = session.run_line("cat nonexistent.txt && cat file1.txt")
+    assert errcode != 0
+    assert "Hello World" not in capsys.readouterr().out
+
+def test_run_line_or(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    errcode = session.run_line("cat nonexistent.txt || cat file1.txt")
+    assert errcode == 0
+    assert "Hello World" in capsys.readouterr().out
+
+def test_run_line_not_found(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+
+    assert session.run_line("not_a_command") == 127
+
+def test_run_line_trailing_operator(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+
+    for line in ["cat file1.txt &&", "cat file1.txt ||"]:
+        assert session.run_line(line) == 2
+        captured = capsys.readouterr()
+        assert "Hello World" not in captured.out
+        assert "syntax error near unexpected token" in captured.err
+
+def test_run_script(session_with_file_structure, capsys):
+    session, temp_dir, structure = session_with_file_structure
+    session.default_wd = temp_dir
+    lines = ["# comment", "", "cat file1.txt", "cd dir2 && ls", "cd .."] * 100
+
+    errcode = session.run_script(lines)
+    assert errcode == 0
+    out = capsys.readouterr().out
+    assert "Hello World" in out
+    assert out.count("subdir") == 100
+    assert session.cwd == Path(temp_dir)
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+import src.constants as cst
+from src.extra import trash as trash_mod
+from src.extra.trash import Trash, PURGE_DIR
+
+
+@pytest.fixture(autouse=True)
+def trash_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cst, "JOURNAL_PATH", tmp_path / "journal")
+    monkeypatch.setattr(cst, "TRASH_PATH", tmp_path / "trash")
+    return tmp_path / "trash"
+
+def put(trash: Trash, name: str, size: int, age: float = 0) -> str:
+    slot = trash.slot(name)
+    slot.parent.mkdir(parents=True)
+    slot.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(slot.parent, (mtime, mtime))
+    return slot.parent.name
+
+def test_quota_evicts_oldest(trash_dir, monkeypatch):
+    monkeypatch.setattr(cst, "TRASH_EVICT_GRACE", 5)
+    trash = Trash(trash_dir, max_bytes=250, max_age=0)
+    oldest = put(trash, "a", 100, age=30)
+    middle = put(trash, "b", 100, age=20)
+    newest = put(trash, "c", 100, age=10)
+
+    assert trash.collect() == [oldest]
+    assert [entry.id for entry in trash.entries()] == [middle, newest]
+    assert not (trash_dir / PURGE_DIR / oldest).exists()
+
+def test_quota_keeps_recent_and_newest(trash_dir, monkeypatch):
+    monkeypatch.setattr(cst, "TRASH_EVICT_GRACE", 60)
+    trash = Trash(trash_dir, max_bytes=50, max_age=0)
+    old = put(trash, "a", 100, age=120)
+    newest_old = put(trash, "b", 100, age=90)
+    assert trash.collect() == [old]
+    assert trash.collect() == []
+
+    recent = put(trash, "c", 100, age=10)
+    assert trash.collect() == [newest_old]
+    assert [entry.id for entry in trash.entries()] == [recent]
+
+def test_rm_over_quota_can_be_undone(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    session.execute_command("rm file1.txt")
+    assert Trash(cst.TRASH_PATH, max_bytes=1, max_age=0).collect() == []
+
+    assert session.execute_command("undo").errcode == 0
+    assert (Path(temp_dir) / "file1.txt").read_text() == structure["file1.txt"]
+
+def test_age_evicts_expired(trash_dir):
+    trash = Trash(trash_dir, max_bytes=0, max_age=60)
+    old = put(trash, "a", 1, age=120)
+    put(trash, "b", 1)
+    assert trash.collect() == [old]
+    assert len(trash.entries()) == 1
+
+def test_collector_purges_in_background(trash_dir):
+    trash = trash_mod.get_trash(trash_dir)
+    put(trash, "a", 10)
+    assert len(trash.purge()) == 1
+    assert trash.entries() == []
+    trash_mod.start_collector()
+    try:
+        for _ in range(100):
+            if not any((trash_dir / PURGE_DIR).iterdir()):
+                break
+            time.sleep(0.01)
+        assert not any((trash_dir / PURGE_DIR).iterdir())
+    finally:
+        trash_mod.stop_collector()
+
+def test_trash_command(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    session.execute_command("rm file1.txt file2.txt")
+
+    listed = session.execute_command("trash ls").stdout.splitlines()
+    assert len(listed) == 3
+    assert listed[0].endswith("file1.txt")
+    assert listed[-1].startswith("total 84")
+
+    slot_id = listed[0].split()[0]
+    assert session.execute_command(f"trash purge {slot_id}").errcode == 0
+    assert "file1.txt" not in session.execute_command("trash ls").stdout
+    assert session.execute_command("trash purge nope").stderr == "nope: no such entry\n"
+
+    # purged entry is pruned from transaction, other removed files are still restored
+    result = session.execute_command("undo")
+    assert result.errcode == 1
+    assert result.stderr.endswith("file1.txt: removed from trash\n")
+    assert (Path(temp_dir) / "file2.txt").read_text() == structure["file2.txt"]
+    assert session.execute_command("undo").stderr == "nothing to undo\n"
+
+    assert session.execute_command("redo").errcode == 0
+    assert not (Path(temp_dir) / "file2.txt").exists()
+    assert session.execute_command("trash purge").errcode == 0
+    result = session.execute_command("undo")
+    assert "file2.txt: removed from trash" in result.stderr
+    assert session.execute_command("undo").stderr == "nothing to undo\n"
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm") or os.stat("/dev/shm").st_dev == os.stat(Path.home()).st_dev,
+                    reason="needs directory on another device")
+def test_rm_uses_trash_on_same_device(session, trash_dir):
+    other = Path(tempfile.mkdtemp(dir="/dev/shm"))
+    root = Path("/dev/shm") / f".Trash-{os.getuid()}"
+    try:
+        (other / "file").write_text("data")
+        session.execute_command(f"cd {other}")
+        session.execute_command("rm file")
+
+        trashed = list(root.glob("*/file"))
+        assert len(trashed) == 1
+        assert trashed[0].stat().st_dev == other.stat().st_dev
+        assert root in trash_mod.known_roots()
+        assert "file" in session.execute_command("trash ls").stdout
+
+        session.execute_command("undo")
+        assert (other / "file").read_text() == "data"
+    finally:
+        shutil.rmtree(other, ignore_errors=True)
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,140 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import src.constants as cst
+from src.extra.journal import Journal, JournalError, Transaction
+
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cst, "JOURNAL_PATH", tmp_path / "journal")
+    monkeypatch.setattr(cst, "TRASH_PATH", tmp_path / "trash")
+    return tmp_path
+
+def test_undo_rm_multiple_files_at_once(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    session.execute_command("rm file1.txt file2.txt")
+    assert not (Path(temp_dir) / "file1.txt").exists()
+
+    result = session.execute_command("undo")
+    assert result.errcode == 0
+    assert (Path(temp_dir) / "file1.txt").read_text() == structure["file1.txt"]
+    assert (Path(temp_dir) / "file2.txt").read_text() == structure["file2.txt"]
+
+def test_rm_same_name_twice(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    session.execute_command("rm file1.txt")
+    (Path(temp_dir) / "file1.txt").write_text("second")
+    session.execute_command("rm file1.txt")
+
+    session.execute_command("undo")
+    assert (Path(temp_dir) / "file1.txt").read_text() == "second"
+    result = session.execute_command("undo")
+    assert result.errcode == 1
+    assert "exists" in result.stderr
+
+def test_undo_n_and_redo(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    root = Path(temp_dir)
+    session.execute_command("mv file1.txt renamed.txt")
+    session.execute_command("cp file2.txt dir1")
+    with patch("builtins.input", return_value="y"):
+        session.execute_command("rm -r dir2")
+
+    session.execute_command("undo 3")
+    assert (root / "file1.txt").exists() and not (root / "renamed.txt").exists()
+    assert not (root / "dir1" / "file2.txt").exists()
+    assert (root / "dir2" / "subdir").is_dir()
+
+    session.execute_command("redo 2")
+    assert (root / "renamed.txt").exists()
+    assert (root / "dir1" / "file2.txt").exists()
+    assert (root / "dir2").exists()
+
+    result = session.execute_command("redo 5")
+    assert result.errcode == 0
+    assert not (root / "dir2").exists()
+    assert session.execute_command("redo").stderr == "nothing to redo\n"
+
+def test_new_command_clears_redo(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    session.execute_command("rm file1.txt")
+    session.execute_command("undo")
+    session.execute_command("rm file2.txt")
+    assert session.execute_command("redo").errcode == 1
+    assert (Path(temp_dir) / "file1.txt").exists()
+
+def test_undo_cp_restores_overwritten(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    root = Path(temp_dir)
+    session.execute_command("cp file1.txt file2.txt")
+    assert (root / "file2.txt").read_text() == structure["file1.txt"]
+
+    session.execute_command("undo")
+    assert (root / "file2.txt").read_text() == structure["file2.txt"]
+
+def test_undo_cp_merge_keeps_existing(session_with_file_structure):
+    session, temp_dir, structure = session_with_file_structure
+    root = Path(temp_dir)
+    (root / "dir2" / "new").write_text("new")
+    session.execute_command("cp -r dir2 dir1")
+    assert (root / "dir1" / "new").exists() and (root / "dir1" / "subdir").is_dir()
+
+    session.execute_command("undo")
+    assert sorted(p.name for p in (root / "dir1").iterdir()) == ["file"]
+
+def test_failed_undo_is_atomic(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_text("a")
+    b.write_text("b")
+    tx = Transaction("rm a b")
+    tx.move(a, tmp_path / "trash" / "a")
+    tx.move(b, tmp_path / "trash" / "b")
+    journal = Journal(tmp_path / "journal")
+    journal.commit(tx)
+    b.write_text("new b")
+
+    with pytest.raises(JournalError):
+        journal.undo()
+    assert not a.exists()
+    b.unlink()
+    assert journal.undo().line == "rm a b"
+    assert a.read_text() == "a" and b.read_text() == "b"
+    assert journal.undo() is None
+
+def test_failed_rollback_names_left_paths(tmp_path):
+    import src.extra.journal as journal_mod
+
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_text("a")
+    b.write_text("b")
+    tx = Transaction("rm a b")
+    tx.move(a, tmp_path / "trash" / "a")
+    tx.move(b, tmp_path / "trash" / "b")
+    a.write_text("new a")
+    move = journal_mod.move
+
+    def failing_rollback(src, dst):
+        if src == b:
+            raise PermissionError(13, "Permission denied", str(src))
+        move(src, dst)
+
+    with patch.object(journal_mod, "move", failing_rollback), pytest.raises(JournalError) as e:
+        tx.undo()
+    assert e.value.message.endswith(f"rollback failed, left in place: {b}")
+    assert not e.value.discard
+
+def test_corrupted_entry_is_discarded(tmp_path):
+    journal = Journal(tmp_path / "journal")
+    journal.commit(Transaction("mv a b", [(str(tmp_path / "a"), str(tmp_path / "b"))]))
+    (tmp_path / "b").write_text("b")
+    with open(tmp_path / "journal" / "undo", "ab") as f:
+        f.write(b'{"line": "rm c", "ops": [["/c", ')
+
+    with pytest.raises(JournalError) as e:
+        journal.undo()
+    assert e.value.discard
+    assert journal.undo().line == "mv a b"
+    assert (tmp_path / "a").read_text() == "b"